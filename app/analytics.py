@@ -0,0 +1,198 @@
+# app/analytics.py
+import argparse, json, sys
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from .storage import columnar
+from .storage.columnar import SCORES, TRANSFERS, ColumnarUnavailable, arrow
+from .risk_engine.transfers import DUST_MICRO_USDT, DUST_SMALL_USDT, MICRO
+
+# Consultas agregadas sobre el dataset columnar: todo el cómputo es vectorizado
+# (pyarrow.compute), nunca se materializan filas como dicts de Python.
+_DUST_MICRO = int(DUST_MICRO_USDT * MICRO)
+_DUST_SMALL = int(DUST_SMALL_USDT * MICRO)
+
+router = APIRouter()
+
+
+def _first_per(table, key: str, order: str):
+    # última fila por `key` según `order` (desc): ordena y se queda con el primer elemento de cada grupo
+    pa, pc, _ = arrow()
+    if table.num_rows == 0:
+        return table
+    table = table.take(pc.sort_indices(table, sort_keys=[(key, "ascending"), (order, "descending")]))
+    k = table[key].combine_chunks()
+    keep = pa.concat_arrays([pa.array([True]), pc.not_equal(k[1:], k[:-1])])
+    return table.filter(keep)
+
+
+def _counts(values, limit: Optional[int] = None, key: str = "value") -> List[dict]:
+    pa, pc, _ = arrow()
+    vc = pc.value_counts(values)
+    if len(vc) == 0:
+        return []
+    order = pc.array_sort_indices(vc.field("counts"), order="descending")
+    if limit:
+        order = order[:limit]
+    vc = vc.take(order)
+    return [{key: v, "count": c} for v, c in zip(vc.field("values").to_pylist(), vc.field("counts").to_pylist())]
+
+
+def score_distribution(start: Optional[str] = None, end: Optional[str] = None, bins: int = 10,
+                       latest: bool = True) -> dict:
+    """Distribución de risk_score. latest=True toma solo el score más reciente de cada dirección."""
+    pa, pc, _ = arrow()
+    bins = max(1, min(int(bins), 100))
+    t = columnar.read(SCORES, ["address", "scored_at", "risk_score", "risk_level", "partial"], start, end)
+    if t is None or t.num_rows == 0:
+        return {"count": 0, "addresses": 0, "levels": {}, "histogram": []}
+    addresses = pc.count_distinct(t["address"]).as_py()
+    if latest:
+        t = _first_per(t, "address", "scored_at")
+    s = pc.cast(t["risk_score"], pa.int32())
+    q = pc.quantile(s, q=[0.5, 0.9, 0.99]).to_pylist()
+    b = pc.min_element_wise(pc.divide(pc.multiply(s, bins), 100), bins - 1)
+    hist = dict((r["value"], r["count"]) for r in _counts(b))
+    width = 100 / bins
+    return {
+        "count": t.num_rows,
+        "addresses": addresses,
+        "mean": round(pc.mean(s).as_py(), 2),
+        "p50": q[0], "p90": q[1], "p99": q[2],
+        "partial_share": round(pc.mean(pc.cast(t["partial"], pa.int8())).as_py(), 4),
+        "levels": {r["value"]: r["count"] for r in _counts(t["risk_level"])},
+        "histogram": [{"from": round(i * width, 2), "to": round((i + 1) * width, 2), "count": hist.get(i, 0)}
+                      for i in range(bins)],
+    }
+
+
+def top_risky_counterparties(start: Optional[str] = None, end: Optional[str] = None, limit: int = 20,
+                             latest: bool = True) -> dict:
+    """Contrapartes riesgosas más frecuentes: en cuántas wallets scoreadas aparecen."""
+    pa, pc, _ = arrow()
+    t = columnar.read(SCORES, ["address", "scored_at", "risky"], start, end)
+    if t is None or t.num_rows == 0:
+        return {"wallets": 0, "counterparties": []}
+    t = t.filter(pc.is_valid(t["risky"]))
+    if latest:
+        t = _first_per(t, "address", "scored_at")
+    flat = pc.list_flatten(t["risky"])
+    return {
+        "wallets": t.num_rows,
+        "distinct": pc.count_distinct(flat).as_py() if len(flat) else 0,
+        "counterparties": [{"address": r["address"], "wallets": r["count"]}
+                           for r in _counts(flat, limit, key="address")],
+    }
+
+
+def dust_patterns(start: Optional[str] = None, end: Optional[str] = None, limit: int = 20) -> dict:
+    """Transferencias dust (USDT ≤ DUST_SMALL_USDT) por día, principales emisores
+    (dust hacia muchas wallets distintas: típico address poisoning) y montos repetidos."""
+    pa, pc, ds = arrow()
+    usdt = ds.field("usdt")
+    t = columnar.read(TRANSFERS, ["date", "wallet", "ts", "frm", "to", "usdt", "tx"], start, end,
+                      filter=(usdt > 0) & (usdt <= _DUST_SMALL))
+    if t is None or t.num_rows == 0:
+        return {"events": 0, "by_day": [], "top_sources": [], "top_amounts": []}
+    # una wallet re-scoreada completa vuelve a exportar sus transferencias: deduplicar
+    t = t.group_by(["date", "wallet", "ts", "frm", "to", "usdt", "tx"], use_threads=False).aggregate([])
+    t = t.append_column("micro", pc.cast(pc.less_equal(t["usdt"], _DUST_MICRO), pa.int32()))
+    t = t.append_column("inbound", pc.equal(t["to"], t["wallet"]))
+
+    day = t.group_by("date").aggregate([("usdt", "count"), ("micro", "sum"), ("wallet", "count_distinct")])
+    day = day.sort_by("date")
+    by_day = [{"date": d, "events": n, "micro": m, "small": n - m, "wallets": w} for d, n, m, w in zip(
+        day["date"].to_pylist(), day["usdt_count"].to_pylist(), day["micro_sum"].to_pylist(),
+        day["wallet_count_distinct"].to_pylist())]
+
+    inbound = t.filter(t["inbound"])
+    src = inbound.group_by("frm").aggregate([("wallet", "count_distinct"), ("usdt", "count"), ("usdt", "sum")])
+    src = src.sort_by([("wallet_count_distinct", "descending"), ("usdt_count", "descending")]).slice(0, limit)
+    top_sources = [{"address": a, "wallets": w, "events": n, "usdt": round(s / MICRO, 6)} for a, w, n, s in zip(
+        src["frm"].to_pylist(), src["wallet_count_distinct"].to_pylist(), src["usdt_count"].to_pylist(),
+        src["usdt_sum"].to_pylist())]
+
+    return {
+        "events": t.num_rows,
+        "micro": pc.sum(t["micro"]).as_py(),
+        "inbound": inbound.num_rows,
+        "wallets": pc.count_distinct(t["wallet"]).as_py(),
+        "by_day": by_day,
+        "top_sources": top_sources,
+        "top_amounts": [{"usdt": r["value"] / MICRO, "count": r["count"]} for r in _counts(inbound["usdt"], limit)],
+    }
+
+
+def export() -> dict:
+    # backfill desde snapshots + vuelco del buffer en vivo
+    return {"snapshots": columnar.export_snapshots(), "flushed": columnar.sink.flush()}
+
+
+def _call(fn, *args, **kw):
+    try:
+        return fn(*args, **kw)
+    except ColumnarUnavailable as e:
+        raise HTTPException(503, detail=str(e))
+
+
+# handlers sync: FastAPI los corre en el threadpool (lectura de Parquet + cómputo fuera del event loop)
+@router.get("/analytics/scores")
+def analytics_scores(start: Optional[str] = None, end: Optional[str] = None, bins: int = 10, latest: bool = True):
+    return _call(score_distribution, start, end, bins, latest)
+
+
+@router.get("/analytics/counterparties")
+def analytics_counterparties(start: Optional[str] = None, end: Optional[str] = None, limit: int = 20,
+                             latest: bool = True):
+    return _call(top_risky_counterparties, start, end, limit, latest)
+
+
+@router.get("/analytics/dust")
+def analytics_dust(start: Optional[str] = None, end: Optional[str] = None, limit: int = 20):
+    return _call(dust_patterns, start, end, limit)
+
+
+@router.post("/analytics/export")
+def analytics_export():
+    return _call(export)
+
+
+# ------------------- CLI -------------------
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.analytics", description="Export columnar y analítica agregada.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("export", help="exporta los snapshots nuevos al dataset columnar")
+    sub.add_parser("compact", help="une los archivos chicos de cada partición (días cerrados)")
+    for name in ("scores", "counterparties", "dust"):
+        q = sub.add_parser(name)
+        q.add_argument("--start", help="YYYY-MM-DD")
+        q.add_argument("--end", help="YYYY-MM-DD")
+        if name == "scores":
+            q.add_argument("--bins", type=int, default=10)
+        else:
+            q.add_argument("--limit", type=int, default=20)
+        if name != "dust":
+            q.add_argument("--all", action="store_true", help="todos los scores, no solo el último por dirección")
+    args = p.parse_args(argv)
+
+    try:
+        if args.cmd == "export":
+            out = export()
+        elif args.cmd == "compact":
+            out = {n: columnar.compact(n) for n in (SCORES, TRANSFERS)}
+        elif args.cmd == "scores":
+            out = score_distribution(args.start, args.end, args.bins, not args.all)
+        elif args.cmd == "counterparties":
+            out = top_risky_counterparties(args.start, args.end, args.limit, not args.all)
+        else:
+            out = dust_patterns(args.start, args.end, args.limit)
+    except ColumnarUnavailable as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+# app/batch.py
+import argparse, asyncio, csv, io, json, os, sys, time
+from typing import AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from .risk_engine.core import extract_features, features_cache, render
+from .storage.jobs import JobStore
+from .storage.snapshots import save_snapshots
+from .utils.address import canonical_address
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ADDRESSES = int(os.getenv("BATCH_MAX_ADDRESSES", "100000"))
+BATCH_SNAPSHOT_FLUSH = int(os.getenv("BATCH_SNAPSHOT_FLUSH", "50"))
+# un job "running" sin heartbeat por este tiempo se considera huérfano (worker caído) y se reanuda
+BATCH_STALE_S = float(os.getenv("BATCH_STALE_SECONDS", "60"))
+
+router = APIRouter()
+
+_store: Optional[JobStore] = None
+_tasks: Dict[str, asyncio.Task] = {}
+_progress: Dict[str, asyncio.Event] = {}
+
+
+def job_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore()
+    return _store
+
+
+# ------------------- entrada -------------------
+def parse_addresses(body: bytes, content_type: str = "") -> List[str]:
+    """Lista de direcciones desde JSON (lista o {"addresses": [...]}), JSONL, CSV o texto plano."""
+    text = body.decode("utf-8-sig", errors="replace").strip()
+    ct = (content_type or "").lower()
+    out: List[str] = []
+    if not text:
+        return out
+    if "csv" in ct:
+        rows = list(csv.reader(io.StringIO(text)))
+        col = 0
+        if rows and any(c.strip().lower() == "address" for c in rows[0]):
+            col = [c.strip().lower() for c in rows[0]].index("address")
+            rows = rows[1:]
+        out = [r[col] for r in rows if len(r) > col]
+    elif text[0] in "[{" and "ndjson" not in ct and "jsonl" not in ct:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if data is not None:
+            if isinstance(data, dict):
+                data = data.get("addresses") or []
+            out = [d.get("address", "") if isinstance(d, dict) else str(d) for d in data]
+        else:
+            return parse_addresses(body, "application/x-ndjson")
+    else:
+        # JSONL / NDJSON o una dirección por línea
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] in "{\"":
+                try:
+                    d = json.loads(line)
+                    line = d.get("address", "") if isinstance(d, dict) else str(d)
+                except ValueError:
+                    pass
+            out.append(line)
+    # forma canónica y dedup conservando el orden (hex y base58 de la misma cuenta cuentan una vez)
+    seen, uniq = set(), []
+    for a in out:
+        a = canonical_address(a or "")
+        if a and a not in seen:
+            seen.add(a); uniq.append(a)
+    return uniq
+
+
+# ------------------- ejecución -------------------
+def _notify(job_id: str) -> None:
+    ev = _progress.pop(job_id, None)
+    if ev is not None:
+        ev.set()
+
+
+def _progress_event(job_id: str) -> asyncio.Event:
+    ev = _progress.get(job_id)
+    if ev is None:
+        ev = _progress[job_id] = asyncio.Event()
+    return ev
+
+
+def _running_elsewhere(job: Optional[dict]) -> bool:
+    # con varios workers (app.serve) el job puede estar corriendo en otro proceso
+    return (bool(job) and job["job_id"] not in _tasks and job["status"] == "running"
+            and time.time() - job["updated_at"] < BATCH_STALE_S)
+
+
+async def _heartbeat(store: JobStore, job_id: str) -> None:
+    while True:
+        await asyncio.sleep(BATCH_STALE_S / 3)
+        store.heartbeat(job_id)
+
+
+async def run_job(job_id: str, concurrency: int = BATCH_CONCURRENCY) -> None:
+    """Procesa los ítems pendientes del job (los ya terminados se saltan: reanudable)."""
+    store = job_store()
+    store.set_status(job_id, "running")
+    queue = iter(store.pending_items(job_id))
+    buffer: list = []
+
+    def flush():
+        if buffer:
+            try: save_snapshots(buffer)
+            except Exception: pass
+            buffer.clear()
+
+    async def worker():
+        for idx, address in queue:
+            try:
+                features, error = await extract_features(address), None
+                result = render(features)
+            except Exception as e:
+                features, result, error = None, None, str(e) or type(e).__name__
+            store.finish_item(job_id, idx, result, error)
+            if features is not None:
+                features_cache.set(features.address, features)
+                buffer.append((features.address, features.to_dict()))
+                if len(buffer) >= BATCH_SNAPSHOT_FLUSH:
+                    flush()
+            _notify(job_id)
+
+    beat = asyncio.ensure_future(_heartbeat(store, job_id))
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        store.set_status(job_id, "done")
+    except asyncio.CancelledError:
+        store.set_status(job_id, "interrupted")
+        raise
+    finally:
+        beat.cancel()
+        flush()
+        _notify(job_id)
+
+
+def start_job(job_id: str, concurrency: int = BATCH_CONCURRENCY) -> asyncio.Task:
+    task = _tasks.get(job_id)
+    if task is None or task.done():
+        task = asyncio.ensure_future(run_job(job_id, concurrency))
+        _tasks[job_id] = task
+        task.add_done_callback(lambda t, j=job_id: _tasks.pop(j, None) if _tasks.get(j) is t else None)
+    return task
+
+
+async def stream_job(job_id: str, after_seq: int = 0) -> AsyncIterator[str]:
+    """NDJSON: una línea por dirección terminada (en orden de finalización) y una línea final."""
+    store = job_store()
+    job = store.get_job(job_id)
+    total = job["total"] if job else 0
+    seq = after_seq
+    remote = False
+    yield json.dumps({"job_id": job_id, "event": "accepted", "total": total, "after": after_seq}) + "\n"
+    while True:
+        ev = _progress_event(job_id)
+        rows = store.items_since(job_id, seq)
+        for r in rows:
+            seq = r["seq"]
+            line = {"job_id": job_id, "seq": seq, "done": seq, "total": total,
+                    "index": r["index"], "address": r["address"], "status": r["status"]}
+            if r["status"] == "error":
+                line["error"] = r["error"]
+            else:
+                line["result"] = r["result"]
+            yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        if rows:
+            continue
+        was_remote, remote = remote, False
+        if job_id not in _tasks:
+            if store.items_since(job_id, seq, limit=1):
+                continue
+            job = store.get_job(job_id)
+            remote = _running_elsewhere(job)
+            if was_remote and not remote and job["status"] == "running":
+                # el worker que lo corría dejó de dar heartbeat: se reanuda acá
+                start_job(job_id)
+                continue
+            if not remote:
+                _progress.pop(job_id, None)
+                yield json.dumps({"job_id": job_id, "event": "end", **(job or {})}) + "\n"
+                return
+        try:
+            # el progreso de otro proceso no dispara el evento local: se sondea la base
+            await asyncio.wait_for(ev.wait(), timeout=1 if remote else 5)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ------------------- API -------------------
+@router.post("/risk/batch")
+async def risk_batch(request: Request):
+    addresses = parse_addresses(await request.body(), request.headers.get("content-type", ""))
+    if not addresses:
+        raise HTTPException(400, detail="No se recibieron direcciones.")
+    if len(addresses) > BATCH_MAX_ADDRESSES:
+        raise HTTPException(413, detail=f"Máximo {BATCH_MAX_ADDRESSES} direcciones por job.")
+    job_id = job_store().create_job(addresses)
+    start_job(job_id)
+    return StreamingResponse(stream_job(job_id), media_type="application/x-ndjson", headers={"X-Job-Id": job_id})
+
+
+@router.get("/risk/batch/{job_id}")
+async def risk_batch_stream(job_id: str, after: int = 0):
+    # re-emite desde `after` y reanuda el job si quedó a medias (p.ej. tras un crash)
+    job = job_store().get_job(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job inexistente.")
+    if job["status"] != "done" and job["done"] + job["errors"] < job["total"] and not _running_elsewhere(job):
+        start_job(job_id)
+    return StreamingResponse(stream_job(job_id, after), media_type="application/x-ndjson", headers={"X-Job-Id": job_id})
+
+
+@router.get("/risk/batch/{job_id}/status")
+async def risk_batch_status(job_id: str):
+    job = job_store().get_job(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job inexistente.")
+    return job
+
+
+# ------------------- CLI -------------------
+def _content_type(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return {".csv": "text/csv", ".json": "application/json",
+            ".jsonl": "application/x-ndjson", ".ndjson": "application/x-ndjson"}.get(ext, "text/plain")
+
+
+async def _cli(args) -> int:
+    from .sources.http import close_clients
+    store = job_store()
+    if args.resume:
+        job_id = args.resume
+        if store.get_job(job_id) is None:
+            print(f"Job inexistente: {job_id}", file=sys.stderr)
+            return 1
+    else:
+        with open(args.input, "rb") as f:
+            addresses = parse_addresses(f.read(), _content_type(args.input))
+        job_id = store.create_job(addresses)
+    print(f"job_id={job_id}", file=sys.stderr)
+    out = open(args.out, "a", encoding="utf-8") if args.out else sys.stdout
+    try:
+        start_job(job_id, args.concurrency)
+        async for line in stream_job(job_id, args.after):
+            out.write(line)
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        await close_clients()
+    return 0
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.batch", description="Scoring por lotes (salida NDJSON).")
+    p.add_argument("input", nargs="?", help="archivo .csv/.json/.jsonl/.txt con direcciones")
+    p.add_argument("--out", help="archivo NDJSON de salida (se agrega al final); por defecto stdout")
+    p.add_argument("--resume", metavar="JOB_ID", help="reanuda un job existente")
+    p.add_argument("--after", type=int, default=0, help="al reanudar, omite resultados con seq <= AFTER")
+    p.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = p.parse_args(argv)
+    if not args.input and not args.resume:
+        p.error("indica un archivo de entrada o --resume JOB_ID")
+    return asyncio.run(_cli(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,93 @@
 # app/main.py
-import os
-from fastapi import FastAPI, HTTPException, Request, Response
+import asyncio, os, time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from tempfile import mkstemp
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from .risk_engine.core import score_wallet
-from .pdf_report.build import build_pdf
+from .risk_engine.core import score_and_save, score_inflight, load_result, render_payload, features_cache, warm_features
+from .pdf_report.render import render_pdf, prerender, shutdown_pool, pdf_cache, warmup as pdf_warmup
 from .web_ui import router as web_ui_router
-from .storage.snapshots import save_snapshot, load_snapshot, clear_snapshot
+from .batch import router as batch_router
+from .monitor import router as monitor_router, start_monitor, stop_monitor, touch
+from .analytics import router as analytics_router
+from .storage.snapshots import SNAPSHOT_DIR, snapshot_history, start_sweeper, stop_sweeper
+from .storage.columnar import start_exporter, stop_exporter
+from .sources.http import close_clients, get_client
+from .sources import resilience
+from .sources.blacklist_mirror import start_mirror_sync, stop_mirror_sync
+from .sources.trongrid import TRONGRID
+from .sources.tronscan import TRONSCAN_BASE
+from .risk_engine.verdicts import cache_stats
+from .risk_engine.graph import _expansions
+from . import metrics
+from .utils.address import parse_address
+from .utils.leader import LeaderLock
 
-app = FastAPI(title="TRON Risk API", version="0.1")
+WARMUP = os.getenv("WARMUP", "1") not in ("0", "false", "False", "")
+WARMUP_FEATURES = int(os.getenv("WARMUP_FEATURES", "1000"))
+PDF_WARMUP_DELAY_S = float(os.getenv("PDF_WARMUP_DELAY_SECONDS", "5"))
+LEADER_RETRY_S = float(os.getenv("LEADER_RETRY_SECONDS", "30"))
+
+# con varios workers (python -m app.serve) las tareas de fondo únicas corren en un solo proceso
+leader = LeaderLock(SNAPSHOT_DIR / "leader.lock")
+worker_info = {"pid": os.getpid(), "leader": False, "warmup_ms": None}
+
+def _start_singletons() -> None:
+    worker_info["leader"] = True
+    start_sweeper()
+    start_mirror_sync()
+    start_monitor()
+
+async def _await_leadership() -> None:
+    # si el líder muere el SO libera el lock y otro worker lo toma
+    while not leader.acquire():
+        await asyncio.sleep(LEADER_RETRY_S)
+    await stop_mirror_sync()
+    _start_singletons()
+
+def _warmup() -> Optional[asyncio.TimerHandle]:
+    # lo barato se hace antes de aceptar tráfico. El pool de PDF (un proceso hijo con ReportLab)
+    # solo lo precalienta el líder y después del arranque, para no competir por CPU con los
+    # otros workers; en el resto se crea con el primer /report o pre-render
+    t0 = time.perf_counter()
+    get_client(TRONGRID)
+    get_client(TRONSCAN_BASE)
+    warm_features(WARMUP_FEATURES)
+    pdf = asyncio.get_running_loop().call_later(PDF_WARMUP_DELAY_S, pdf_warmup) if worker_info["leader"] else None
+    worker_info["warmup_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return pdf
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    follower = pdf = None
+    if leader.acquire():
+        _start_singletons()
+    else:
+        start_mirror_sync(sync=False)
+        follower = asyncio.ensure_future(_await_leadership())
+    start_exporter()
+    if WARMUP:
+        pdf = _warmup()
+    yield
+    if follower is not None:
+        follower.cancel()
+    if pdf is not None:
+        pdf.cancel()
+    await stop_monitor()
+    await stop_mirror_sync()
+    stop_sweeper()
+    stop_exporter()
+    shutdown_pool()
+    leader.release()
+    # cierra los pools HTTP compartidos (keep-alive) al apagar
+    await close_clients()
+
+app = FastAPI(title="TRON Risk API", version="0.1", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +97,16 @@ app.add_middleware(
 )
 
 app.include_router(web_ui_router)
+app.include_router(batch_router)
+app.include_router(monitor_router)
+app.include_router(analytics_router)
+
+def _canonical_or_400(address: str) -> str:
+    # validación temprana: una dirección inválida no consume cuota upstream
+    try:
+        return parse_address(address).base58
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
 
 @app.api_route("/health", methods=["GET", "HEAD"])
 async def health(request: Request):
@@ -30,25 +114,71 @@ async def health(request: Request):
         return Response(status_code=200)
     return {"ok": True}
 
+@app.get("/stats")
+async def stats():
+    # por worker: con app.serve cada proceso tiene sus propios caches y contadores
+    return {"worker": worker_info, "verdict_cache": cache_stats(), "score_inflight": score_inflight.stats(),
+            "features": features_cache.stats(), "upstream": resilience.stats()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(404, detail="Métricas deshabilitadas (METRICS_ENABLED=0).")
+    # hit ratios de caches: se leen al momento del scrape
+    metrics.set_cache_stats({**cache_stats(), "pdf": pdf_cache.stats(), "graph_expansions": _expansions.stats(),
+                             "score_inflight": score_inflight.stats(), "features": features_cache.stats()})
+    metrics.set_breaker_stats(resilience.stats()["breakers"])
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _trace_requested(request: Request, trace: bool) -> bool:
+    # trazas opt-in: ?trace=1 o header X-Trace: 1
+    return trace or request.headers.get("x-trace", "").lower() in ("1", "true", "yes")
+
 @app.get("/risk/{address}")
-async def risk(address: str):
+async def risk(address: str, request: Request, trace: bool = False, refresh: bool = Query(False)):
+    address = _canonical_or_400(address)
+    token = metrics.start_trace() if _trace_requested(request, trace) else None
     try:
-        result = await score_wallet(address)
-        save_snapshot(address, result)
+        # resultado vigente (features en memoria o snapshot) sin re-scorear; si falta, venció o
+        # se pide ?refresh=1, los requests concurrentes por la misma dirección comparten un solo scoring
+        result = None if refresh else load_result(address)
+        if result is None:
+            result = await score_and_save(address)
+            prerender(address, result)
+        touch(address)
+        if token is not None:
+            # la traza va solo en la respuesta, no en el snapshot
+            result = {**result, "trace": metrics.end_trace(token)}
+            token = None
         return result
     except IndexError:
         raise HTTPException(400, detail="Respuesta de la API vacía o inesperada (IndexError).")
     except Exception as e:
         raise HTTPException(400, detail=str(e))
+    finally:
+        if token is not None:
+            metrics.end_trace(token)
+
+@app.get("/risk/{address}/history")
+async def risk_history(address: str, limit: int = 20):
+    address = _canonical_or_400(address)
+    history = [{**h, "result": render_payload(h["result"])} for h in snapshot_history(address, limit)]
+    return {"address": address, "history": history}
 
 @app.get("/report/{address}")
-async def report(address: str):
-    snap = load_snapshot(address)
-    if snap is None:
-        snap = await score_wallet(address)
-        save_snapshot(address, snap)
-    path = mkstemp(suffix=".pdf")[1]
-    build_pdf(address, snap, path)
-    pdf = FileResponse(path, media_type="application/pdf", filename=f"tron-risk-{address}.pdf")
-    clear_snapshot(address)
-    return pdf
\ No newline at end of file
+async def report(address: str, request: Request, trace: bool = False):
+    address = _canonical_or_400(address)
+    token = metrics.start_trace() if _trace_requested(request, trace) else None
+    try:
+        # el snapshot vigente se reutiliza (no se borra tras la descarga)
+        snap = load_result(address)
+        if snap is None:
+            snap = await score_and_save(address)
+        pdf = await render_pdf(address, snap)
+    finally:
+        spans = metrics.end_trace(token) if token is not None else None
+    headers = {"Content-Disposition": f'attachment; filename="tron-risk-{address}.pdf"'}
+    if spans:
+        # en el PDF la traza viaja como Server-Timing (sin spans, p.ej. PDF cacheado, no hay header)
+        headers["Server-Timing"] = metrics.server_timing(spans)
+    return Response(pdf, media_type="application/pdf", headers=headers)
\ No newline at end of file
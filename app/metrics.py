@@ -0,0 +1,168 @@
+# app/metrics.py
+import os, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Métricas estilo Prometheus (texto 0.0.4) y trazas por request, sin dependencias.
+# Con METRICS_ENABLED=0 todas las llamadas retornan de inmediato.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False", "")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+_INF = 'le="+Inf"'
+
+
+def _fmt_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        if METRICS_ENABLED:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = super().render()
+        out += [f"{self.name}{_fmt_labels(self.labels, k)} {v:g}" for k, v in sorted(self._values.items())]
+        return out
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float) -> None:
+        if METRICS_ENABLED:
+            self._values[labels] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple, list] = {}  # labels -> [conteo por bucket..., +Inf, suma]
+
+    def observe(self, *labels, value: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        v = self._values.get(labels)
+        if v is None:
+            v = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        v[bisect_left(self.buckets, value)] += 1
+        v[-1] += value
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for k, v in sorted(self._values.items()):
+            acc = 0
+            for b, c in zip(self.buckets, v):
+                acc += c
+                le = 'le="%g"' % b
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {acc}")
+            acc += v[len(self.buckets)]
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, _INF)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {v[-1]:g}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {acc}")
+        return out
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in _registry:
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+
+# ------------------- métricas del servicio -------------------
+UPSTREAM_SECONDS = Histogram("tron_risk_upstream_request_seconds", "Latencia de llamadas upstream", ("endpoint",))
+UPSTREAM_RESPONSES = Counter("tron_risk_upstream_responses_total", "Respuestas upstream por status", ("endpoint", "status"))
+UPSTREAM_ERRORS = Counter("tron_risk_upstream_errors_total", "Errores upstream (HTTP >= 400 o de red)", ("endpoint",))
+UPSTREAM_429 = Counter("tron_risk_upstream_429_total", "Respuestas 429 (rate limit) upstream", ("endpoint",))
+UPSTREAM_RETRIES = Counter("tron_risk_upstream_retries_total", "Reintentos upstream", ("endpoint",))
+UPSTREAM_HEDGES = Counter("tron_risk_upstream_hedges_total", "Requests duplicados por hedging", ("endpoint",))
+UPSTREAM_REJECTED = Counter("tron_risk_upstream_rejected_total", "Llamadas rechazadas por circuito abierto", ("endpoint",))
+BREAKER_STATE = Gauge("tron_risk_breaker_state", "Circuit breaker por host (0=closed, 1=half_open, 2=open)", ("host",))
+STAGE_SECONDS = Histogram("tron_risk_score_stage_seconds", "Duración por etapa del scoring", ("stage",))
+FANOUT_SIZE = Histogram("tron_risk_counterparty_fanout_size", "Contrapartes consultadas por score", (),
+                        buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000))
+PDF_SECONDS = Histogram("tron_risk_pdf_render_seconds", "Duración del render de PDF (sin cache)", ())
+CACHE_HIT_RATIO = Gauge("tron_risk_cache_hit_ratio", "Hit ratio por cache", ("cache",))
+CACHE_SIZE = Gauge("tron_risk_cache_entries", "Entradas por cache", ("cache",))
+
+
+def observe_upstream(endpoint: str, seconds: float, status) -> None:
+    if not METRICS_ENABLED:
+        return
+    UPSTREAM_RESPONSES.inc(endpoint, str(status))
+    if status == "cancelled":
+        # cortado a mitad de camino: ni latencia ni error
+        return
+    UPSTREAM_SECONDS.observe(endpoint, value=seconds)
+    if status == "error" or (isinstance(status, int) and status >= 400):
+        UPSTREAM_ERRORS.inc(endpoint)
+    if status == 429:
+        UPSTREAM_429.inc(endpoint)
+
+
+def set_breaker_stats(breakers: Dict[str, dict]) -> None:
+    for host, b in breakers.items():
+        BREAKER_STATE.set(host, value={"closed": 0, "half_open": 1, "open": 2}[b["state"]])
+
+
+def set_cache_stats(stats: Dict[str, dict]) -> None:
+    for name, s in stats.items():
+        if "hit_ratio" in s:
+            CACHE_HIT_RATIO.set(name, value=s["hit_ratio"])
+        if "size" in s:
+            CACHE_SIZE.set(name, value=s["size"])
+
+
+# ------------------- trazas por request (opt-in) -------------------
+_trace: ContextVar[Optional[dict]] = ContextVar("tron_risk_trace", default=None)
+
+
+def start_trace():
+    return _trace.set({"t0": time.perf_counter(), "spans": []})
+
+
+def end_trace(token) -> List[dict]:
+    tr = _trace.get()
+    _trace.reset(token)
+    return sorted(tr["spans"], key=lambda s: s["start_ms"]) if tr else []
+
+
+def record_span(name: str, started: float, seconds: float, **attrs) -> None:
+    # started = time.perf_counter() al inicio del span; sin traza activa no hace nada
+    tr = _trace.get()
+    if tr is None:
+        return
+    span = {"name": name, "start_ms": round((started - tr["t0"]) * 1000, 1), "duration_ms": round(seconds * 1000, 1)}
+    if attrs:
+        span.update(attrs)
+    tr["spans"].append(span)
+
+
+def server_timing(spans: List[dict]) -> str:
+    return ", ".join(f'{i}-{s["name"]};dur={s["duration_ms"]}' for i, s in enumerate(spans))
@@ -0,0 +1,346 @@
+# app/monitor.py
+import argparse, asyncio, inspect, itertools, os, sys, time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+
+from . import metrics
+from .risk_engine.core import score_and_save
+from .sources.ratelimit import TokenBucket
+from .storage.snapshots import TTL_MIN, load_snapshot, snapshot_saved_at
+from .storage.watchlist import WatchlistStore
+from .utils.address import parse_address
+
+# Re-scoring en segundo plano: watchlists programadas y pre-calentado de
+# direcciones consultadas hace poco, dentro de un presupuesto de llamadas upstream.
+MONITOR_ENABLED = os.getenv("MONITOR_ENABLED", "1") not in ("0", "false", "False", "")
+MONITOR_WORKERS = int(os.getenv("MONITOR_WORKERS", "2"))
+MONITOR_TICK_S = float(os.getenv("MONITOR_TICK_SECONDS", "30"))
+MONITOR_BUDGET_PER_MIN = float(os.getenv("MONITOR_UPSTREAM_BUDGET_PER_MINUTE", "300"))  # 0 = sin límite
+MONITOR_INTERVAL_MIN = float(os.getenv("MONITOR_DEFAULT_INTERVAL_MINUTES", "1440"))
+MONITOR_RETRY_S = float(os.getenv("MONITOR_RETRY_SECONDS", "300"))
+MONITOR_RECENT_HOURS = float(os.getenv("MONITOR_RECENT_HOURS", "24"))
+MONITOR_PREWARM = os.getenv("MONITOR_PREWARM", "1") not in ("0", "false", "False", "")
+MONITOR_PREWARM_MARGIN_MIN = float(os.getenv("MONITOR_PREWARM_MARGIN_MINUTES", "15"))
+MONITOR_QUEUE_MAX = int(os.getenv("MONITOR_QUEUE_MAX", "10000"))
+MONITOR_WEBHOOK_URL = os.getenv("MONITOR_WEBHOOK_URL", "")
+MONITOR_WEBHOOK_TIMEOUT_S = float(os.getenv("MONITOR_WEBHOOK_TIMEOUT_SECONDS", "10"))
+
+# menor = antes
+PRIORITY_RECENT_WATCH = 0  # en watchlist y consultada hace poco
+PRIORITY_WATCH = 1
+PRIORITY_PREWARM = 2
+
+router = APIRouter()
+
+
+class JobQueue:
+    """Cola de prioridad con dedup por dirección: si se re-encola con mejor prioridad, gana la mejor."""
+
+    def __init__(self, maxsize: int = MONITOR_QUEUE_MAX):
+        self.maxsize = maxsize
+        self._heap: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._best: Dict[str, int] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def push(self, address: str, priority: int, reason: str) -> bool:
+        cur = self._best.get(address)
+        if cur is not None and cur <= priority:
+            return False
+        if cur is None and len(self._best) >= self.maxsize:
+            return False
+        self._best[address] = priority
+        self._heap.put_nowait((priority, next(self._seq), address, reason))
+        return True
+
+    async def pop(self) -> Tuple[str, int, str]:
+        while True:
+            priority, _, address, reason = await self._heap.get()
+            if self._best.get(address) == priority:  # las entradas superadas se descartan
+                del self._best[address]
+                return address, priority, reason
+
+    def by_priority(self) -> Dict[int, int]:
+        out: Dict[int, int] = {}
+        for p in self._best.values():
+            out[p] = out.get(p, 0) + 1
+        return out
+
+
+class Monitor:
+    def __init__(self, store: Optional[WatchlistStore] = None, budget_per_min: float = MONITOR_BUDGET_PER_MIN,
+                 workers: int = MONITOR_WORKERS):
+        self.store = store or WatchlistStore()
+        self.queue = JobQueue()
+        self.budget_per_min = budget_per_min
+        self.budget = TokenBucket(budget_per_min / 60, int(budget_per_min)) if budget_per_min > 0 else TokenBucket(0)
+        self.workers = max(1, workers)
+        self.cost = 20.0  # llamadas upstream estimadas por score (EWMA)
+        self.counters = {"scored": 0, "errors": 0, "transitions": 0, "upstream_calls": 0,
+                         "webhooks_ok": 0, "webhooks_failed": 0}
+        self._listeners: List[Callable[[dict], Any]] = []
+        self._running: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+
+    # ---- entrada ----
+    def add_listener(self, fn: Callable[[dict], Any]) -> None:
+        """Callback en proceso para transiciones de nivel (función o corrutina)."""
+        self._listeners.append(fn)
+
+    def enqueue(self, address: str, priority: int = PRIORITY_WATCH, reason: str = "manual") -> bool:
+        if address in self._running:
+            return False
+        return self.queue.push(address, priority, reason)
+
+    def schedule(self, now: Optional[float] = None) -> int:
+        """Encola las entradas vencidas de la watchlist y los recientes cuyo snapshot está por vencer."""
+        now = now or time.time()
+        since = now - MONITOR_RECENT_HOURS * 3600
+        n = 0
+        for a in self.store.due(now):
+            p = PRIORITY_RECENT_WATCH if self.store.is_recent(a, since) else PRIORITY_WATCH
+            n += self.enqueue(a, p, "watchlist")
+        if MONITOR_PREWARM and TTL_MIN > 0:
+            stale_before = now - max(0.0, TTL_MIN - MONITOR_PREWARM_MARGIN_MIN) * 60
+            for a in self.store.recent(since):
+                ts = snapshot_saved_at(a)
+                if ts is not None and ts < stale_before:
+                    n += self.enqueue(a, PRIORITY_PREWARM, "prewarm")
+        self.store.prune_recent(since)
+        return n
+
+    # ---- ejecución ----
+    def _previous(self, address: str) -> Optional[dict]:
+        row = self.store.get(address)
+        if row and row.get("last_level"):
+            return {"level": row["last_level"], "score": row["last_score"], "webhook": row.get("webhook")}
+        snap = load_snapshot(address)
+        if snap and snap.get("risk_level"):
+            return {"level": snap["risk_level"], "score": snap.get("risk_score"),
+                    "webhook": row.get("webhook") if row else None}
+        return {"webhook": row.get("webhook")} if row else None
+
+    async def run_one(self, address: str, reason: str = "manual") -> Optional[dict]:
+        est = min(self.cost, self.budget.burst)
+        await self.budget.acquire(est)
+        prev = self._previous(address) or {}
+        token = metrics.start_trace()  # la traza cuenta las llamadas upstream reales de este score
+        try:
+            # si ya hay un scoring en vuelo para la dirección (p.ej. /risk) se comparte
+            result = await score_and_save(address)
+        except Exception:
+            self.counters["errors"] += 1
+            self.store.postpone(address, time.time() + MONITOR_RETRY_S)
+            return None
+        finally:
+            calls = sum(1 for s in metrics.end_trace(token) if s["name"].startswith("upstream."))
+            self.budget.debit(calls - est)
+            self.cost = 0.8 * self.cost + 0.2 * calls
+            self.counters["upstream_calls"] += calls
+        now = time.time()
+        self.store.record(address, result.get("risk_score"), result.get("risk_level"), now)
+        self.counters["scored"] += 1
+        if prev.get("level") and prev["level"] != result.get("risk_level"):
+            await self._notify({
+                "event": "risk_level_changed", "address": address, "reason": reason, "scored_at": now,
+                "previous_level": prev["level"], "level": result.get("risk_level"),
+                "previous_score": prev.get("score"), "score": result.get("risk_score"),
+            }, prev.get("webhook"))
+        return result
+
+    async def _notify(self, event: dict, webhook: Optional[str]) -> None:
+        self.counters["transitions"] += 1
+        for fn in self._listeners:
+            try:
+                r = fn(event)
+                if inspect.isawaitable(r):
+                    await r
+            except Exception:
+                pass
+        url = webhook or MONITOR_WEBHOOK_URL
+        if not url:
+            return
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=MONITOR_WEBHOOK_TIMEOUT_S)
+        for attempt in range(2):
+            try:
+                r = await self._http.post(url, json=event)
+                r.raise_for_status()
+                self.counters["webhooks_ok"] += 1
+                return
+            except httpx.HTTPError:
+                if attempt == 0:
+                    await asyncio.sleep(1)
+        self.counters["webhooks_failed"] += 1
+
+    async def _worker(self) -> None:
+        while True:
+            address, _, reason = await self.queue.pop()
+            self._running.add(address)
+            try:
+                await self.run_one(address, reason)
+            except Exception:
+                self.counters["errors"] += 1
+            finally:
+                self._running.discard(address)
+
+    async def _scheduler(self) -> None:
+        while True:
+            try:
+                self.schedule()
+            except Exception:
+                pass
+            await asyncio.sleep(MONITOR_TICK_S)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._scheduler())]
+        self._tasks += [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def status(self) -> dict:
+        return {"enabled": bool(self._tasks), "queued": len(self.queue),
+                "queued_by_priority": {str(k): v for k, v in sorted(self.queue.by_priority().items())},
+                "running": sorted(self._running), "budget_per_minute": self.budget_per_min,
+                "est_upstream_per_score": round(self.cost, 1), **self.counters}
+
+
+_monitor: Optional[Monitor] = None
+
+
+def get_monitor() -> Monitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = Monitor()
+    return _monitor
+
+
+def touch(address: str) -> None:
+    # registra un request interactivo: prioriza la dirección y la mantiene pre-calentada
+    # (también con MONITOR_ENABLED=0, para un monitor standalone que comparte la base)
+    try:
+        get_monitor().store.touch(address)
+    except Exception:
+        pass
+
+
+def start_monitor() -> None:
+    if MONITOR_ENABLED:
+        get_monitor().start()
+
+
+async def stop_monitor() -> None:
+    if _monitor is not None:
+        await _monitor.stop()
+
+
+# ------------------- API -------------------
+def _canonical(address: str) -> str:
+    try:
+        return parse_address(address).base58
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+
+
+@router.get("/watchlist")
+async def watchlist_list(limit: int = 1000):
+    m = get_monitor()
+    return {"entries": m.store.list(limit), "monitor": m.status()}
+
+
+@router.post("/watchlist")
+async def watchlist_add(request: Request):
+    """Body: {"address": "T..."} o {"addresses": [...]}, con `interval_minutes` y `webhook` opcionales."""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, detail="JSON inválido.")
+    body = body if isinstance(body, dict) else {"addresses": body}
+    addresses = body.get("addresses") or ([body["address"]] if body.get("address") else [])
+    if not addresses:
+        raise HTTPException(400, detail="No se recibieron direcciones.")
+    interval_s = float(body.get("interval_minutes") or MONITOR_INTERVAL_MIN) * 60
+    m = get_monitor()
+    entries = []
+    for a in map(_canonical, addresses):
+        entries.append(m.store.add(a, interval_s, body.get("webhook")))
+        m.enqueue(a, PRIORITY_WATCH, "watchlist")
+    return {"entries": entries}
+
+
+@router.delete("/watchlist/{address}")
+async def watchlist_remove(address: str):
+    if not get_monitor().store.remove(_canonical(address)):
+        raise HTTPException(404, detail="La dirección no está en la watchlist.")
+    return {"ok": True}
+
+
+@router.get("/watchlist/status")
+async def watchlist_status():
+    return get_monitor().status()
+
+
+# ------------------- CLI -------------------
+async def _run_forever() -> None:
+    from .sources.http import close_clients
+    m = get_monitor()
+    m.add_listener(lambda ev: print(f"{ev['address']}: {ev['previous_level']} -> {ev['level']}", flush=True))
+    m.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await m.stop()
+        await close_clients()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.monitor", description="Watchlists y re-scoring en segundo plano.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("run", help="monitor standalone (usar MONITOR_ENABLED=0 en el proceso web)")
+    a = sub.add_parser("add")
+    a.add_argument("addresses", nargs="+")
+    a.add_argument("--interval-minutes", type=float, default=MONITOR_INTERVAL_MIN)
+    a.add_argument("--webhook")
+    r = sub.add_parser("remove")
+    r.add_argument("addresses", nargs="+")
+    sub.add_parser("list")
+    args = p.parse_args(argv)
+
+    if args.cmd == "run":
+        try:
+            asyncio.run(_run_forever())
+        except KeyboardInterrupt:
+            pass
+        return 0
+    store = WatchlistStore()
+    if args.cmd == "add":
+        for addr in args.addresses:
+            print(store.add(parse_address(addr).base58, args.interval_minutes * 60, args.webhook))
+    elif args.cmd == "remove":
+        for addr in args.addresses:
+            store.remove(parse_address(addr).base58)
+    else:
+        for e in store.list():
+            print(e)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
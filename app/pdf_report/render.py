@@ -0,0 +1,128 @@
+import asyncio, hashlib, io, json, multiprocessing, os, time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from ..utils.cache import AsyncTTLCache
+from ..metrics import PDF_SECONDS, record_span
+
+# Render fuera del event loop: ReportLab es CPU-bound y bloquearía al resto de requests.
+PDF_POOL = os.getenv("PDF_POOL", "process").lower()  # process | thread
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+PDF_CACHE_SIZE = int(os.getenv("PDF_CACHE_SIZE", "256"))
+PDF_CACHE_TTL_S = float(os.getenv("PDF_CACHE_TTL_SECONDS", str(int(os.getenv("SNAPSHOT_TTL_MINUTES", "120")) * 60)))
+PDF_PRERENDER = os.getenv("PDF_PRERENDER", "0") not in ("0", "false", "False", "")
+# caché en disco compartida entre workers (python -m app.serve la activa); vacío = solo memoria
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "")
+PDF_DISK_PRUNE_S = 600
+
+pdf_cache = AsyncTTLCache(PDF_CACHE_SIZE, PDF_CACHE_TTL_S, name="pdf")
+_pool: Optional[Executor] = None
+_background: set = set()
+_pruned_at = 0.0
+
+
+def _executor() -> Executor:
+    global _pool
+    if _pool is None:
+        if PDF_POOL == "thread":
+            _pool = ThreadPoolExecutor(max_workers=max(1, PDF_WORKERS), thread_name_prefix="pdf")
+        else:
+            # spawn: el worker no hereda el event loop ni los threads del proceso web
+            _pool = ProcessPoolExecutor(max_workers=max(1, PDF_WORKERS),
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _import_build() -> None:
+    # warmup del worker del pool: ReportLab se importa antes del primer reporte
+    from . import build  # noqa: F401
+
+
+def render_pdf_bytes(address: str, result: dict) -> bytes:
+    # import diferido: ReportLab (~60 ms) no se carga al arrancar el proceso web
+    from .build import build_pdf
+    buf = io.BytesIO()
+    build_pdf(address, result, buf)
+    return buf.getvalue()
+
+
+def snapshot_key(address: str, result: dict) -> str:
+    raw = json.dumps(result, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{address.strip()}\n{raw}".encode("utf-8")).hexdigest()
+
+
+def _disk_read(key: str) -> Optional[bytes]:
+    path = Path(PDF_CACHE_DIR) / f"{key}.pdf"
+    try:
+        if time.time() - path.stat().st_mtime > PDF_CACHE_TTL_S:
+            return None
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def _disk_write(key: str, pdf: bytes) -> None:
+    global _pruned_at
+    d = Path(PDF_CACHE_DIR)
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = d / f"{key}.{os.getpid()}.tmp"
+        tmp.write_bytes(pdf)
+        os.replace(tmp, d / f"{key}.pdf")
+        now = time.time()
+        if now - _pruned_at > PDF_DISK_PRUNE_S:
+            _pruned_at = now
+            for path in d.glob("*.pdf"):
+                if now - path.stat().st_mtime > PDF_CACHE_TTL_S:
+                    path.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+async def render_pdf(address: str, result: dict) -> bytes:
+    """PDF en memoria, cacheado por hash del contenido del snapshot."""
+    loop = asyncio.get_running_loop()
+    key = snapshot_key(address, result)
+
+    async def load() -> bytes:
+        if PDF_CACHE_DIR:
+            pdf = _disk_read(key)
+            if pdf is not None:
+                return pdf
+        t0 = time.perf_counter()
+        try:
+            pdf = await loop.run_in_executor(_executor(), render_pdf_bytes, address, result)
+        finally:
+            dt = time.perf_counter() - t0
+            PDF_SECONDS.observe(value=dt)
+            record_span("pdf.render", t0, dt)
+        if PDF_CACHE_DIR:
+            _disk_write(key, pdf)
+        return pdf
+
+    return await pdf_cache.get_or_load(key, load)
+
+
+def warmup() -> None:
+    # arranca el pool y carga ReportLab en segundo plano: no demora el arranque del servidor,
+    # pero el primer /report ya no paga el spawn del proceso ni el import
+    fut = _executor().submit(_import_build)
+    _background.add(fut)
+    fut.add_done_callback(lambda f: (_background.discard(f), f.cancelled() or f.exception()))
+
+
+def prerender(address: str, result: dict) -> None:
+    # pre-render en segundo plano al scorear: la descarga del reporte queda instantánea
+    if not PDF_PRERENDER:
+        return
+    task = asyncio.ensure_future(render_pdf(address, result))
+    _background.add(task)
+    task.add_done_callback(lambda t: (_background.discard(t), t.cancelled() or t.exception()))
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -1,39 +1,39 @@
-from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Tuple, Set
-from decimal import Decimal, InvalidOperation
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import os
-
-from ..sources.tronscan import check_account_security, check_stablecoin_blacklist, trc20_transfers
-from ..sources.trongrid import account_overview, account_trc20_transfers, USDT_CONTRACT
-from .weights import W
-
-
-DUST_MICRO_USDT = Decimal(os.getenv("DUST_MICRO_USDT", "0.1"))
-DUST_SMALL_USDT = Decimal(os.getenv("DUST_SMALL_USDT", "1.0"))
-DUST_MIN_EVENTS = int(os.getenv("DUST_MIN_EVENTS", "3"))
-USDT_CONTRACT_UP = USDT_CONTRACT.upper()
-USDT_MAX_EVENT = Decimal("1e12")  # umbral sanitario por evento
-
-
-def fmt_amount(d: Decimal, places=2) -> str:
-    # 2 decimales + separador de miles, sin notación científica
-    q = Decimal(10) ** -places
-    try:
-        val = d.quantize(q)
-        return format(val, ",f")  # p.ej. 359,011.06
-    except Exception:
-        return "0.00"
-
-def fmt_time(ms: int | None) -> str | None:
-    if not ms:
-        return None
-    dt = datetime.fromtimestamp(ms/1000, tz=timezone.utc)
-    hour = dt.strftime("%I").lstrip("0") or "0"      # 03 -> 3
-    minute = dt.strftime("%M")                       # 05
-    ampm = dt.strftime("%p").lower()                 # am/pm
-    return f"{dt.strftime('%Y-%m-%d')}, {hour}:{minute} {ampm}"
-
-def build_basic_info(tron_account: dict) -> dict:
+import time
+
+from ..sources.trongrid import account_overview, iter_trc20_transfers, TRC20_MAX_EVENTS, TRC20_MAX_AGE_DAYS
+from ..storage.snapshots import (TTL_MIN, load_wallet_state, save_wallet_state, save_snapshot, load_snapshot,
+                                 recent_snapshots)
+from ..storage import columnar
+from ..utils.cache import AsyncTTLCache
+from ..utils.address import parse_address
+from ..metrics import STAGE_SECONDS, FANOUT_SIZE, record_span
+from .rules import rule_points, risk_level
+from .features import (Features, is_features, F_BLACKLISTED, F_FRAUD, F_BL_EVIDENCE, F_TRUNCATED,
+                       F_GRAPH_PARTIAL)
+from .present import render
+from .fanout import FanOut
+from .verdicts import account_security, stablecoin_blacklist, mirror_blacklisted
+from .graph import graph, explore, GRAPH_MAX_HOPS
+from .transfers import Transfer, TransferAnalyzer, DUST_MICRO_USDT, DUST_SMALL_USDT, COUNTERPARTY_MAX
+
+
+# Re-scoring incremental: estado por dirección (cursor + acumuladores + veredictos)
+INCREMENTAL_SCORING = os.getenv("INCREMENTAL_SCORING", "1") not in ("0", "false", "False", "")
+STATE_VERDICT_TTL_S = float(os.getenv("STATE_VERDICT_TTL_HOURS", "24")) * 3600
+STATE_VERSION = 3
+
+# single-flight por dirección (TTL 0: solo comparte el scoring en vuelo, no cachea)
+score_inflight = AsyncTTLCache(1, 0, name="score_inflight")
+# features recientes por dirección (renders de /report y /risk sin ir al snapshot)
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "10000"))
+features_cache = AsyncTTLCache(FEATURE_CACHE_SIZE, TTL_MIN * 60, name="features")
+
+
+def _account_fields(tron_account: dict) -> Tuple[Any, Any, Any]:
+    # (balance en sun, create_time ms, latest_operation_time ms) del overview de TronGrid
     def pick(d: dict) -> dict:
         if not isinstance(d, dict):
             return {}
@@ -46,211 +46,315 @@ def build_basic_info(tron_account: dict) -> dict:
         return d  # ya es objeto plano
 
     obj = pick(tron_account or {})
-    balance = obj.get("balance")
-    create_ts = obj.get("create_time") or obj.get("createTime")
-    last_op_ts = obj.get("latest_opration_time") or obj.get("latest_operation_time")
-
-    return {
-        "balance_trx_raw": balance,
-        "created_at": fmt_time(create_ts) if create_ts else None,
-        "last_operation_at": fmt_time(last_op_ts) if last_op_ts else None,
-    }
-
-def build_summary(level: str, reasons: List[Dict[str, Any]]) -> str:
-    if not reasons:
-        return "No se detectaron señales de riesgo en las verificaciones básicas."
-    top = ", ".join(sorted({r["code"] for r in reasons}))
-    return f"Nivel {level}. Señales principales: {top}."
-
-def _extract_counterparties_trc20(items: List[dict], self_addr: str) -> Tuple[Set[str], Set[str]]:
-    ins, outs = set(), set()
-    for it in items:
-        frm = (it.get("from") or it.get("transfer_from") or "").strip()
-        to = (it.get("to") or it.get("transfer_to") or "").strip()
-        if frm and frm != self_addr: ins.add(frm)  # desde otros hacia mí
-        if to and to != self_addr: outs.add(to)  # desde mí hacia otros
-    return ins, outs
-
-async def _batch_security_check(addresses: Set[str]) -> Set[str]:
-    risky = set()
-    for a in addresses:
-        try:
-            sec = await check_account_security(a)
-            if sec.get("is_black_list") or sec.get("has_fraud_transaction"):
-                risky.add(a); continue
-            bl = await check_stablecoin_blacklist(a)
-            if bl.get("total", 0) > 0:
-                risky.add(a)
-        except Exception:
-            pass
-    return risky
-
-def _is_usdt_trc20(it: dict) -> bool:
-    addr = (it.get("token_info", {}) or {}).get("address") or it.get("contract_address")
-    return (addr or "").upper() == USDT_CONTRACT_UP
-
-def _normalize_amount_usdt(it) -> Decimal:
+    return (obj.get("balance"), obj.get("create_time") or obj.get("createTime"),
+            obj.get("latest_opration_time") or obj.get("latest_operation_time"))
+
+async def _counterparty_is_risky(a: str) -> bool:
+    # el espejo local resuelve la blacklist sin ir upstream
+    if mirror_blacklisted(a):
+        return True
+    sec = await account_security(a)
+    if sec.get("is_black_list") or sec.get("has_fraud_transaction"):
+        return True
+    bl = await stablecoin_blacklist(a)
+    return bl.get("total", 0) > 0
+
+def _counterparty_fanout() -> FanOut:
+    return FanOut(_counterparty_is_risky)
+
+def _record_stage(timings: Dict[str, float], stage: str, t0: float) -> None:
+    dt = time.perf_counter() - t0
+    timings[stage] = round(dt * 1000, 1)
+    STAGE_SECONDS.observe(stage, value=dt)
+    record_span(f"stage.{stage}", t0, dt)
+
+async def _timed(timings: Dict[str, float], stage: str, aw):
+    t0 = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        _record_stage(timings, stage, t0)
+
+def _describe_error(e: BaseException) -> str:
+    resp = getattr(e, "response", None)
+    if resp is not None:
+        return f"HTTP {resp.status_code}"
+    return type(e).__name__ + (f": {e}" if str(e) else "")
+
+async def _degradable(name: str, aw, degraded: List[Dict[str, Any]]) -> dict:
+    # un chequeo directo que falla (tras reintentos) no tumba el score: queda explícito en evidence.degraded
     try:
-        val = Decimal(str(it.get("value", "0")))
-        dec = int((it.get("token_info", {}) or {}).get("decimals") or it.get("decimals") or 6)
-        amt = val / (Decimal(10) ** dec)
-        # descarta outliers imposibles
-        if amt <= 0 or amt > USDT_MAX_EVENT:
-            raise InvalidOperation("USDT outlier")
-        return amt
+        return await aw
+    except Exception as e:
+        degraded.append({"check": name, "error": _describe_error(e)})
+        return {}
+
+def _state_config() -> dict:
+    # si cambian umbrales o topes, los acumuladores guardados ya no son comparables
+    return {"v": STATE_VERSION, "dust_micro": str(DUST_MICRO_USDT), "dust_small": str(DUST_SMALL_USDT),
+            "cap": COUNTERPARTY_MAX, "max_age_days": TRC20_MAX_AGE_DAYS}
+
+def _load_state(address_b58: str):
+    try:
+        state = load_wallet_state(address_b58)
     except Exception:
-        return Decimal("0")
-
-def _aggregate_flows_trc20(items: List[dict], self_addr: str):
-    inflow = Decimal("0"); outflow = Decimal("0")
-    first_ts = None; last_ts = None
-    for it in items:
-        ts = it.get("block_timestamp") or it.get("timestamp")
-        if ts is not None:
-            first_ts = ts if not first_ts or ts < first_ts else first_ts
-            last_ts  = ts if not last_ts  or ts > last_ts  else last_ts
-
-        # *** SOLO USDT contrato oficial ***
-        if not _is_usdt_trc20(it):
-            continue
-
-        amt = _normalize_amount_usdt(it)
-        if amt == 0:
-            continue
-
-        frm = (it.get("from") or it.get("transfer_from") or "").strip()
-        to  = (it.get("to")   or it.get("transfer_to")   or "").strip()
-        if to == self_addr: inflow += amt
-        if frm == self_addr: outflow += amt
-    return inflow, outflow, first_ts, last_ts
-
-def _dust_counters_trc20_usdt(items: List[dict], self_addr: str):
-    micro_in = micro_out = small_in = small_out = 0
-    uniq_src, uniq_dst = set(), set()
-    for it in items:
-        if not _is_usdt_trc20(it):
-            continue
-
-        amt = _normalize_amount_usdt(it)
-        if amt == 0:
-            continue
-
-        frm = (it.get("from") or it.get("transfer_from") or "").strip()
-        to  = (it.get("to")   or it.get("transfer_to")   or "").strip()
-
-        if amt <= DUST_MICRO_USDT:
-            if to == self_addr: micro_in += 1; uniq_src.add(frm)
-            if frm == self_addr: micro_out += 1; uniq_dst.add(to)
-        elif amt <= DUST_SMALL_USDT:
-            if to == self_addr: small_in += 1; uniq_src.add(frm)
-            if frm == self_addr: small_out += 1; uniq_dst.add(to)
-    return {
-        "micro_in": micro_in, "micro_out": micro_out,
-        "small_in": small_in, "small_out": small_out,
-        "unique_sources": len(uniq_src), "unique_dests": len(uniq_dst),
-    }
-
-def _exposure_breakdown(risky_in_cnt, risky_out_cnt, dust_in_cnt, dust_out_cnt, dex_hits=0, cex_hits=0):
-    total = max(1, risky_in_cnt + risky_out_cnt + dust_in_cnt + dust_out_cnt + dex_hits + cex_hits)
-    expo = []
-
-    def add(cat, v):
-        if v > 0: expo.append({"category": cat, "share": round(100.0 * v / total, 1)})
-
-    add("Blacklist Indirect In", risky_in_cnt)
-    add("Blacklist Indirect Out", risky_out_cnt)
-    add("Dust In (USDT)", dust_in_cnt)
-    add("Dust Out (USDT)", dust_out_cnt)
-    if dex_hits: add("DEX", dex_hits)
-    if cex_hits: add("Exchange", cex_hits)
-    return expo
+        return None
+    if not state or state.get("config") != _state_config():
+        return None
+    if TRC20_MAX_AGE_DAYS > 0:
+        # los acumuladores no pueden restar lo que salió de la ventana: si el evento más
+        # viejo ya quedó afuera, el re-score se hace completo
+        first_ts = (state.get("analyzer") or {}).get("first_ts")
+        if first_ts and first_ts < (time.time() - TRC20_MAX_AGE_DAYS * 86400) * 1000:
+            return None
+    return state
+
+def _save_state(address_b58: str, analyzer: TransferAnalyzer, verdicts: Dict[str, list]) -> None:
+    try:
+        save_wallet_state(address_b58, {
+            "config": _state_config(),
+            "analyzer": analyzer.to_state(),
+            "verdicts": verdicts,
+        })
+    except Exception:
+        pass
+
+async def _ingest(address_b58: str, stream, analyzer: TransferAnalyzer, fan: FanOut,
+                  edge: Optional[Tuple[int, set]] = None) -> Tuple[int, int, Tuple[Optional[int], set]]:
+    """Consume un stream TRC20: analizador, fan-out, grafo y export columnar.
+
+    Devuelve (páginas, eventos, borde): el borde es (first_ts, claves ya ingeridas
+    con ese ts). Con `edge` (backfill) se saltan las transferencias del borde anterior
+    que ya se habían contado.
+    """
+    pages = fetched = 0
+    edge_ts, edge_keys = (edge[0], set(edge[1])) if edge else (None, set())
+    async for page in stream:
+        pages += 1
+        fetched += len(page)
+        records = [Transfer.from_item(it) for it in page]
+        if edge_keys:
+            records = [t for t in records if t.ts != edge_ts or t.key() not in edge_keys]
+        fan.submit_many(analyzer.feed_records(records))
+        graph.ingest(records)
+        if columnar.EXPORT_ENABLED:
+            columnar.record_transfers(address_b58, records)
+        lo = analyzer.first_ts
+        if lo != edge_ts:
+            edge_ts, edge_keys = lo, set()
+        edge_keys.update(t.key() for t in records if t.ts == lo)
+    return pages, fetched, (edge_ts, edge_keys)
+
+async def _transfers_stage(address_b58: str, timings: Dict[str, float], state: dict | None,
+                           degraded: List[Dict[str, Any]]):
+    # TRC20 -> contrapartes: la única dependencia real del pipeline.
+    # Cada página pasa una vez por el analizador fusionado y las contrapartes
+    # nuevas se envían al fan-out apenas aparecen.
+    now = time.time()
+    if state:
+        # re-score: solo transferencias desde el cursor (ascendente, así un tope
+        # de eventos deja el cursor en lo último procesado) y contrapartes nuevas
+        analyzer = TransferAnalyzer.from_state(address_b58, state["analyzer"])
+        verdicts: Dict[str, list] = state.get("verdicts") or {}
+        cursor = analyzer.last_ts
+    else:
+        analyzer = TransferAnalyzer(address_b58)
+        verdicts = {}
+        cursor = None
+    fan = _counterparty_fanout()
+    root_stamp = graph.stamp(address_b58)
+    try:
+        # veredictos sin resolver o vencidos se vuelven a consultar
+        fan.submit_many(a for a, (v, checked_at) in verdicts.items()
+                        if v is None or now - checked_at > STATE_VERDICT_TTL_S)
+
+        t0 = time.perf_counter()
+        if cursor:
+            stream = iter_trc20_transfers(address_b58, min_timestamp=cursor, order_by="block_timestamp,asc")
+        else:
+            stream = iter_trc20_transfers(address_b58)
+        pages, fetched, edge = await _ingest(address_b58, stream, analyzer, fan)
+        truncated = bool(TRC20_MAX_EVENTS) and fetched >= TRC20_MAX_EVENTS
+        if not cursor:
+            # recorrido completo (más nuevo primero): si el tope lo cortó, lo anterior queda para backfill
+            analyzer.backfill_ts, analyzer.backfill_keys = edge if truncated else (None, set())
+        elif analyzer.backfill_ts is not None:
+            # backfill hacia atrás desde el borde, con lo que quede del tope de eventos de esta corrida
+            budget = max(0, TRC20_MAX_EVENTS - fetched) if TRC20_MAX_EVENTS else 0
+            if budget or not TRC20_MAX_EVENTS:
+                stream = iter_trc20_transfers(address_b58, max_events=budget, max_timestamp=analyzer.backfill_ts)
+                p, n, edge = await _ingest(address_b58, stream, analyzer, fan,
+                                           (analyzer.backfill_ts, analyzer.backfill_keys))
+                pages += p
+                fetched += n
+                complete = not TRC20_MAX_EVENTS or n < budget
+                analyzer.backfill_ts, analyzer.backfill_keys = (None, set()) if complete else edge
+        _record_stage(timings, "trongrid_trc20", t0)
+        FANOUT_SIZE.observe(value=len(fan))
+
+        # el deadline de contrapartes corre desde acá, no desde el inicio del paginado
+        results, timed_out = await _timed(timings, "counterparties", fan.join())
+    except BaseException:
+        # error de paginado o stage cancelado (cliente desconectado, batch cancelado)
+        fan.cancel()
+        raise
+    for a, is_risky in results.items():
+        verdicts[a] = [bool(is_risky), now]
+    for a in list(timed_out) + list(fan.errors):
+        verdicts.setdefault(a, [None, now])
+
+    counterparties = analyzer.ins | analyzer.outs
+    risky = {a for a in counterparties if (verdicts.get(a) or [None])[0]}
+    # sin veredicto = pendiente, sea por deadline o por error upstream (nunca "limpia")
+    failed = {a for a in fan.errors if verdicts[a][0] is None}
+    pending = {a for a in timed_out if verdicts[a][0] is None} | failed
+    if failed:
+        errors: Dict[str, int] = {}
+        for a in failed:
+            k = _describe_error(fan.errors[a])
+            errors[k] = errors.get(k, 0) + 1
+        degraded.append({"check": "counterparties", "failed": len(failed), "errors": errors})
+    # truncado: el tope cortó esta corrida o sigue faltando historial anterior a backfill_ts
+    ingest = {"from_cursor": cursor, "pages": pages, "events": fetched,
+              "truncated": truncated or analyzer.backfill_ts is not None}
+
+    # k-hop: taint más allá de las contrapartes directas
+    taint = None
+    if GRAPH_MAX_HOPS >= 2:
+        # si el salto 1 no terminó en su deadline, el cupo del limiter ya no alcanza para el
+        # salto 2: se reporta solo la distancia 1 y el grafo queda marcado como parcial
+        hops = 1 if pending else GRAPH_MAX_HOPS
+        taint = await _timed(timings, "graph", explore(address_b58, counterparties, risky, _counterparty_is_risky,
+                                                       max_hops=hops))
+        taint["partial"] = taint["partial"] or hops < GRAPH_MAX_HOPS
+        if taint["failed"]:
+            degraded.append({"check": "graph", "failed": taint["failed"]})
+    # solo cuenta lo que perdieron la raíz o los nodos expandidos de este request, no la saturación
+    # global del índice compartido (otros requests, wallets pasadas de GRAPH_MAX_DEGREE)
+    saturated = (taint["saturated"] if taint else 0) + graph.lost_since(address_b58, root_stamp)
+    if saturated:
+        degraded.append({"check": "graph", "saturated": saturated})
+    return analyzer, verdicts, ingest, risky, pending, taint
 
 
 # ------------------- FUNCIÓN PRINCIPAL -------------------
-async def score_wallet(address_b58: str) -> dict:
-    reasons: List[Dict[str, Any]] = []
-    score = 0
-
-    # Direct flags (TRONSCAN)
-    sec = await check_account_security(address_b58)
-    if sec.get("is_black_list"):
-        reasons.append({"code": "BLACKLIST_USDT", "weight": W.BLACKLIST_USDT, "detail": "TRONSCAN: is_black_list=true"})
-        score = max(score, W.BLACKLIST_USDT)
-    if sec.get("has_fraud_transaction"):
-        reasons.append({"code": "FRAUD_FLAG", "weight": W.FRAUD_FLAG, "detail": "TRONSCAN: has_fraud_transaction"})
-        score += W.FRAUD_FLAG
-
-    # Evidencia extra (stablecoin blacklist)
-    bl = await check_stablecoin_blacklist(address_b58)
-    if bl.get("total", 0) > 0 and not any(r["code"] == "BLACKLIST_USDT" for r in reasons):
-        reasons.append({"code": "BLACKLIST_USDT_EVIDENCE", "weight": W.BLACKLIST_USDT_EVIDENCE,
-                        "detail": "stableCoin/blackList reportó coincidencia"})
-        score = max(score, W.BLACKLIST_USDT)
-
-    # Info básica y TRC20
-    acct = await account_overview(address_b58)
-    trc20 = await account_trc20_transfers(address_b58, limit=200)
-    items = trc20.get("data", []) or []
-    if not isinstance(items, list):
-        items = []
-
-    # 1-hop counterparties
-    ins, outs = _extract_counterparties_trc20(items, address_b58)
-
-    risky_in = await _batch_security_check(ins)
-    risky_out = await _batch_security_check(outs)
-
-    # Sumar puntos por contrapartes riesgosas (tope)
-    hits = len(risky_in | risky_out)
-    if hits:
-        add = min(hits * W.COUNTERPARTY_HIT, W.COUNTERPARTY_CAP)
-        reasons.append({"code": "COUNTERPARTY_HIGH", "weight": add,
-                        "detail": f"{hits} contrapartes 1-hop con señales de riesgo"})
-        score += add
-
-    # DUST (USDT)
-    dust = _dust_counters_trc20_usdt(items, address_b58)
-    dust_in  = dust["micro_in"]  + dust["small_in"]
-    dust_out = dust["micro_out"] + dust["small_out"]
-    dust_events = dust_in + dust_out
-    if dust_events >= DUST_MIN_EVENTS:
-        add = min(W.DUST_BASE + (dust_events - DUST_MIN_EVENTS) * W.DUST_PER_EVENT, W.DUST_CAP)
-        reasons.append({
-            "code": "DUST_ACTIVITY",
-            "weight": int(add),
-            "detail": f"{dust_events} eventos dust USDT (micro≤${DUST_MICRO_USDT}, small≤${DUST_SMALL_USDT}) in:{dust_in} out:{dust_out} src_uni:{dust['unique_sources']} dst_uni:{dust['unique_dests']}"
-        })
-        score += int(add)
-
-    # Flujos + first/last
-    inflow, outflow, first_ts, last_ts = _aggregate_flows_trc20(items, address_b58)
-
-    score = int(min(score, 100))
-    level = "High" if score >= 70 else ("Medium" if score >= 30 else "Low")
-
-    basic = build_basic_info(acct) if isinstance(acct, dict) else {}
-    basic.update({
-        "inflow_usdt": fmt_amount(inflow),
-        "outflow_usdt": fmt_amount(outflow),
-        "first_transfer": fmt_time(first_ts) if first_ts else None,
-        "last_transfer": fmt_time(last_ts) if last_ts else None,
-        "dust_in_events": dust_in,
-        "dust_out_events": dust_out,
-        "dust_total": dust_events,
-    })
-
-    result = {
-        "address": address_b58,
-        "risk_score": score,
-        "risk_level": level,
-        "reasons": reasons,
-        "summary": build_summary(level, reasons),
-        "basic_info": basic,
-        "evidence": {
-            "tronscan_security": sec,
-            "tronscan_blacklist": bl,
-        },
-        "exposure": _exposure_breakdown(len(risky_in), len(risky_out), dust_in, dust_out),
-    }
-
-    return result
+async def extract_features(address_b58: str, incremental: bool = INCREMENTAL_SCORING) -> Features:
+    """Etapa de features: todo el I/O upstream y los acumuladores, sin formateo."""
+    # forma canónica (acepta hex); una dirección inválida no consume cuota upstream
+    address_b58 = parse_address(address_b58).base58
+    timings: Dict[str, float] = {}
+    degraded: List[Dict[str, Any]] = []
+    t_start = time.perf_counter()
+    state = _load_state(address_b58) if incremental else None
+
+    # Grafo de dependencias: flags directos, overview y TRC20 en paralelo;
+    # el stage de contrapartes arranca apenas llega la lista de transferencias.
+    tasks = [
+        asyncio.ensure_future(_timed(timings, "tronscan_security",
+                                     _degradable("tronscan_security", account_security(address_b58), degraded))),
+        asyncio.ensure_future(_timed(timings, "tronscan_blacklist",
+                                     _degradable("tronscan_blacklist", stablecoin_blacklist(address_b58), degraded))),
+        asyncio.ensure_future(_timed(timings, "trongrid_overview",
+                                     _degradable("trongrid_overview", account_overview(address_b58), degraded))),
+        asyncio.ensure_future(_transfers_stage(address_b58, timings, state, degraded)),
+    ]
+    try:
+        sec, bl, acct, (analyzer, verdicts, ingest, risky, pending, taint) = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+
+    ins, outs = analyzer.counterparties()
+    dust = analyzer.dust()
+    flags = ((F_BLACKLISTED if sec.get("is_black_list") else 0)
+             | (F_FRAUD if sec.get("has_fraud_transaction") else 0)
+             | (F_BL_EVIDENCE if bl.get("total", 0) > 0 else 0)
+             | (F_TRUNCATED if ingest["truncated"] else 0)
+             | (F_GRAPH_PARTIAL if taint and taint["partial"] else 0))
+    dust_events = dust["micro_in"] + dust["small_in"] + dust["micro_out"] + dust["small_out"]
+    score, _ = rule_points(bool(flags & F_BLACKLISTED), bool(flags & F_FRAUD), bool(flags & F_BL_EVIDENCE),
+                           len(risky), dust_events)
+    balance, created_ms, last_op_ms = _account_fields(acct) if isinstance(acct, dict) else (None, None, None)
+    if incremental:
+        _save_state(address_b58, analyzer, verdicts)
+    _record_stage(timings, "total", t_start)
+    features = Features(
+        address=address_b58, scored_at=int(time.time() * 1000), flags=flags,
+        risk_score=score, risk_level=risk_level(score), bl_total=int(bl.get("total", 0) or 0),
+        balance=balance, created_ms=created_ms, last_op_ms=last_op_ms,
+        inflow=int(analyzer.inflow), outflow=int(analyzer.outflow),
+        first_ts=analyzer.first_ts, last_ts=analyzer.last_ts,
+        events=analyzer.events, new_events=ingest["events"], pages=ingest["pages"], from_cursor=ingest["from_cursor"],
+        counterparties=len(ins | outs), pending=len(pending), overflow=analyzer.overflow,
+        risky_in=len(risky & ins), risky_out=len(risky & outs), risky_hits=len(risky),
+        micro_in=dust["micro_in"], micro_out=dust["micro_out"], small_in=dust["small_in"], small_out=dust["small_out"],
+        uniq_src=dust["unique_sources"], uniq_dst=dust["unique_dests"],
+        tainted=taint["tainted_by_distance"] if taint is not None else None,
+        paths=tuple(tuple(p) for p in taint["paths"]) if taint is not None else (),
+        expanded=taint["expanded"] if taint else 0, checked=taint["checked"] if taint else 0,
+        failed=taint["failed"] if taint else 0,
+        degraded=tuple(degraded), timings=timings,
+    )
+    if columnar.EXPORT_ENABLED:
+        columnar.record_score(features, risky)
+    return features
+
+
+async def score_wallet(address_b58: str, incremental: bool = INCREMENTAL_SCORING) -> dict:
+    return render(await extract_features(address_b58, incremental))
+
+
+def _remaining_ttl(f: Features) -> float:
+    # segundos de vida que le quedan al snapshot del que salen los features
+    return f.scored_at / 1000 + TTL_MIN * 60 - time.time()
+
+
+def load_result(address_b58: str) -> Optional[dict]:
+    """Resultado vigente sin re-scorear: features en memoria o del snapshot, renderizados."""
+    f = features_cache.peek(address_b58)
+    if f is None:
+        snap = load_snapshot(address_b58)
+        if not is_features(snap):
+            return snap  # snapshot anterior a los features (resultado completo) o sin snapshot
+        f = Features.from_dict(snap)
+        # vence con el snapshot, no TTL_MIN después de cargarlo (_store no guarda ttl <= 0)
+        features_cache.set(address_b58, f, _remaining_ttl(f))
+    return render(f)
+
+
+def warm_features(limit: int) -> int:
+    """Precarga features_cache con los snapshots vigentes más recientes (arranque de un worker)."""
+    n = 0
+    # de la más vieja a la más nueva: las recientes quedan al frente del LRU
+    for address, payload in reversed(recent_snapshots(limit)):
+        if is_features(payload):
+            f = Features.from_dict(payload)
+            ttl = _remaining_ttl(f)
+            if ttl > 0:
+                features_cache.set(address, f, ttl)
+                n += 1
+    return n
+
+
+def render_payload(payload: dict) -> dict:
+    # historial: los snapshots con features se renderizan, los antiguos pasan tal cual
+    return render(Features.from_dict(payload)) if is_features(payload) else payload
+
+
+async def score_features(address_b58: str) -> Features:
+    """extract_features + snapshot con single-flight: llamadores concurrentes por la
+    misma dirección esperan el mismo scoring (una sola corrida upstream)."""
+    address_b58 = parse_address(address_b58).base58
+
+    async def run() -> Features:
+        features = await extract_features(address_b58)
+        save_snapshot(address_b58, features.to_dict())
+        features_cache.set(address_b58, features)
+        return features
+
+    return await score_inflight.get_or_load(address_b58, run)
+
+
+async def score_and_save(address_b58: str) -> dict:
+    return render(await score_features(address_b58))
@@ -0,0 +1,67 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "10"))
+COUNTERPARTY_DEADLINE_S = float(os.getenv("COUNTERPARTY_DEADLINE_SECONDS", "20"))
+
+
+class FanOut:
+    """Ejecuta fn(key) para muchas claves con concurrencia acotada, dedup y deadline.
+
+    Las claves se pueden enviar a medida que aparecen (`submit`); `join` espera
+    hasta que terminen todas o venza el deadline (que corre desde el join, no
+    desde la creación), y devuelve los resultados disponibles más el conjunto
+    de claves que quedaron pendientes. `cancel` corta lo que siga en curso.
+    """
+
+    def __init__(self, fn: Callable[[Any], Awaitable[Any]],
+                 concurrency: int = FANOUT_CONCURRENCY,
+                 deadline: Optional[float] = COUNTERPARTY_DEADLINE_S):
+        self._fn = fn
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._deadline = deadline
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.errors: Dict[Hashable, BaseException] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def _run(self, key):
+        async with self._sem:
+            return await self._fn(key)
+
+    def submit(self, key: Hashable) -> None:
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    def submit_many(self, keys) -> None:
+        for k in keys:
+            self.submit(k)
+
+    def cancel(self) -> None:
+        for t in self._tasks.values():
+            if not t.done():
+                t.cancel()
+
+    async def join(self) -> Tuple[Dict[Hashable, Any], Set[Hashable]]:
+        results: Dict[Hashable, Any] = {}
+        pending: Set[Hashable] = set()
+        if not self._tasks:
+            return results, pending
+        try:
+            _, still_running = await asyncio.wait(self._tasks.values(), timeout=self._deadline or None)
+        except BaseException:
+            # cancelación del llamador: no dejar tareas huérfanas consumiendo cuota upstream
+            self.cancel()
+            raise
+        for t in still_running:
+            t.cancel()
+        for key, t in self._tasks.items():
+            if t in still_running:
+                pending.add(key)
+            elif t.exception() is not None:
+                self.errors[key] = t.exception()
+            else:
+                results[key] = t.result()
+        return results, pending
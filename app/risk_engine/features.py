@@ -0,0 +1,98 @@
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+# Registro compacto por wallet: lo que produce la etapa de features y lo que se
+# persiste en el snapshot. Solo tipos simples (montos en micro-USDT, tiempos en
+# epoch ms, conteos, bitflags); el texto para API/PDF se arma en present.py.
+FEATURES_VERSION = 1
+
+# bitflags de veredictos directos y estado del scoring
+F_BLACKLISTED = 1  # TRONSCAN is_black_list
+F_FRAUD = 2  # TRONSCAN has_fraud_transaction
+F_BL_EVIDENCE = 4  # stableCoin/blackList con coincidencias
+F_TRUNCATED = 8  # TRC20 cortado por TRC20_MAX_EVENTS
+F_GRAPH_PARTIAL = 16  # k-hop incompleto (deadline o errores)
+
+
+class Features(NamedTuple):
+    address: str
+    scored_at: int = 0
+    flags: int = 0
+    # score/nivel al momento de extraer (índice del snapshot); present.py los recalcula con W vigente
+    risk_score: int = 0
+    risk_level: str = "Low"
+    bl_total: int = 0
+    balance: Optional[int] = None  # sun
+    created_ms: Optional[int] = None
+    last_op_ms: Optional[int] = None
+    inflow: int = 0
+    outflow: int = 0
+    first_ts: Optional[int] = None
+    last_ts: Optional[int] = None
+    events: int = 0
+    new_events: int = 0
+    pages: int = 0
+    from_cursor: Optional[int] = None
+    counterparties: int = 0
+    pending: int = 0
+    overflow: int = 0
+    risky_in: int = 0
+    risky_out: int = 0
+    risky_hits: int = 0
+    micro_in: int = 0
+    micro_out: int = 0
+    small_in: int = 0
+    small_out: int = 0
+    uniq_src: int = 0
+    uniq_dst: int = 0
+    # k-hop (None = no se corrió)
+    tainted: Optional[Dict[str, int]] = None
+    paths: Tuple[Tuple[str, ...], ...] = ()
+    expanded: int = 0
+    checked: int = 0
+    failed: int = 0
+    degraded: Tuple[Dict[str, Any], ...] = ()
+    timings: Optional[Dict[str, float]] = None
+
+    def has(self, flag: int) -> bool:
+        return bool(self.flags & flag)
+
+    @property
+    def dust_in(self) -> int:
+        return self.micro_in + self.small_in
+
+    @property
+    def dust_out(self) -> int:
+        return self.micro_out + self.small_out
+
+    @property
+    def multihop(self) -> int:
+        return sum(n for d, n in (self.tainted or {}).items() if int(d) >= 2)
+
+    @property
+    def taint_distance(self) -> Optional[int]:
+        return min(map(int, self.tainted)) if self.tainted else None
+
+    @property
+    def partial(self) -> bool:
+        return self.pending > 0 or self.overflow > 0 or bool(self.degraded)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # los campos en su valor por defecto no se persisten (from_dict los repone);
+        # score y nivel siempre, los leen el índice del snapshot y el monitor
+        defaults = self._field_defaults
+        return {"f": FEATURES_VERSION, **{k: v for k, v in zip(self._fields, self)
+                                          if k in _KEEP or v != defaults[k]}}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Features":
+        kw = {k: d[k] for k in cls._fields if k in d}
+        kw["paths"] = tuple(tuple(p) for p in kw.get("paths") or ())
+        kw["degraded"] = tuple(kw.get("degraded") or ())
+        return cls(**kw)
+
+
+_KEEP = frozenset(("address", "risk_score", "risk_level"))
+
+
+def is_features(payload: Optional[dict]) -> bool:
+    return bool(payload) and "f" in payload
@@ -0,0 +1,269 @@
+import asyncio
+import heapq
+import os
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..sources.trongrid import account_trc20_transfers
+from ..utils.cache import AsyncTTLCache
+from .fanout import FanOut
+from .transfers import Transfer, MICRO
+
+# Exploración multi-hop (k saltos) sobre un índice de adyacencia compartido
+GRAPH_MAX_HOPS = int(os.getenv("GRAPH_MAX_HOPS", "1"))  # 1 = solo contrapartes directas; 2+ = multi-hop
+GRAPH_HOP_FANOUT = int(os.getenv("GRAPH_HOP_FANOUT", "5"))  # vecinos por nodo y salto
+GRAPH_MIN_EDGE_USDT = Decimal(os.getenv("GRAPH_MIN_EDGE_USDT", "10"))  # poda por valor
+GRAPH_MAX_EXPANSIONS = int(os.getenv("GRAPH_MAX_EXPANSIONS", "10"))  # nodos a descargar por request
+GRAPH_DEADLINE_S = float(os.getenv("GRAPH_DEADLINE_SECONDS", "10"))
+GRAPH_PAGE_SIZE = int(os.getenv("GRAPH_PAGE_SIZE", "200"))
+GRAPH_MAX_NODES = int(os.getenv("GRAPH_MAX_NODES", "500000"))
+GRAPH_MAX_DEGREE = int(os.getenv("GRAPH_MAX_DEGREE", "2000"))
+GRAPH_MAX_TXS = int(os.getenv("GRAPH_MAX_TXS", "1000000"))  # transferencias recordadas (dedup de aristas)
+GRAPH_EXPAND_TTL_S = float(os.getenv("GRAPH_EXPAND_TTL_SECONDS", "3600"))
+GRAPH_MAX_PATHS = int(os.getenv("GRAPH_MAX_PATHS", "5"))
+
+_MIN_EDGE_MICRO = int(GRAPH_MIN_EDGE_USDT * MICRO)
+
+
+class AdjacencyIndex:
+    """Grafo no dirigido de direcciones y volumen USDT (micro) por arista.
+
+    Las direcciones se internan a ids enteros. Cada transferencia suma una sola
+    vez aunque se re-ingiera (re-scores, expansiones que se solapan con la raíz):
+    se recuerda por tx hasta `max_txs`. Lleno `max_nodes`, se desaloja el nodo
+    usado hace más tiempo (LRU) con sus aristas; lo que no entra por `max_degree`
+    se descarta. `evicted` y `dropped` miden la saturación global; `stamp(addr)`
+    permite ver si un nodo puntual perdió aristas (desalojo propio o de un vecino,
+    tope de grado) entre dos momentos.
+    """
+
+    def __init__(self, max_nodes: int = GRAPH_MAX_NODES, max_degree: int = GRAPH_MAX_DEGREE,
+                 max_txs: int = GRAPH_MAX_TXS):
+        self.max_nodes = max_nodes
+        self.max_degree = max_degree
+        self.max_txs = max_txs
+        self._ids: Dict[str, int] = {}  # orden de inserción = recencia (LRU)
+        self._addrs: List[Optional[str]] = []
+        self._adj: List[Dict[int, int]] = []
+        self._gen: List[int] = []  # generación del id: cambia cada vez que se reutiliza
+        self._lost: List[int] = []  # aristas perdidas por nodo desde que se creó
+        self._serial = 0
+        # hash(tx key) -> generaciones de los extremos al ingerirla (FIFO acotado)
+        self._seen: Dict[int, int] = {}
+        self.edges = 0
+        self.dropped = 0
+        self.evicted = 0
+        # avisado con cada dirección cuya adyacencia quedó incompleta por un desalojo
+        self.on_evict: Optional[Callable[[str], None]] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, addr: str) -> bool:
+        return addr in self._ids
+
+    def _touch(self, addr: str) -> Optional[int]:
+        i = self._ids.pop(addr, None)
+        if i is not None:
+            self._ids[addr] = i
+        return i
+
+    def _evict(self) -> int:
+        addr = next(iter(self._ids))
+        i = self._ids.pop(addr)
+        for j in self._adj[i]:
+            del self._adj[j][i]
+            self._lost[j] += 1
+            if self.on_evict is not None:
+                self.on_evict(self._addrs[j])
+        self.edges -= 2 * len(self._adj[i])
+        self._adj[i] = {}
+        self._addrs[i] = None
+        self.evicted += 1
+        if self.on_evict is not None:
+            self.on_evict(addr)
+        return i
+
+    def _id(self, addr: str) -> int:
+        i = self._touch(addr)
+        if i is None:
+            if len(self._addrs) < self.max_nodes:
+                i = len(self._addrs)
+                self._addrs.append(None)
+                self._adj.append({})
+                self._gen.append(0)
+                self._lost.append(0)
+            else:
+                i = self._evict()
+            self._serial += 1
+            self._gen[i] = self._serial
+            self._lost[i] = 0
+            self._addrs[i] = addr
+            self._ids[addr] = i
+        return i
+
+    def _link(self, a: int, b: int, w: int) -> None:
+        # simétrica: se agrega en ambos sentidos o en ninguno (el desalojo depende de eso)
+        adj_a, adj_b = self._adj[a], self._adj[b]
+        if b in adj_a:
+            adj_a[b] += w
+            adj_b[a] += w
+        elif len(adj_a) < self.max_degree and len(adj_b) < self.max_degree:
+            adj_a[b] = adj_b[a] = w
+            self.edges += 2
+        else:
+            self.dropped += 1
+            self._lost[a] += 1
+            self._lost[b] += 1
+
+    def ingest(self, records: Iterable[Transfer]) -> None:
+        seen = self._seen
+        for t in records:
+            frm, to = t.frm, t.to
+            if not frm or not to or frm == to:
+                continue
+            a = self._id(frm); b = self._id(to)
+            # ya sumada mientras ambos extremos siguen vivos (un desalojo la invalida)
+            h = hash(t.key())
+            stamp = self._gen[a] << 32 | self._gen[b]
+            if seen.get(h) == stamp:
+                continue
+            seen[h] = stamp
+            if len(seen) > self.max_txs:
+                del seen[next(iter(seen))]
+            self._link(a, b, int(t.usdt))
+
+    def neighbors(self, addr: str, limit: Optional[int] = None, min_weight: int = 0) -> List[Tuple[str, int]]:
+        i = self._touch(addr)
+        if i is None:
+            return []
+        cand = ((w, j) for j, w in self._adj[i].items() if w >= min_weight)
+        top = heapq.nlargest(limit, cand) if limit is not None else sorted(cand, reverse=True)
+        return [(self._addrs[j], w) for w, j in top]
+
+    def stamp(self, addr: str) -> Optional[Tuple[int, int]]:
+        """(generación, aristas perdidas) del nodo; None si no está en el índice."""
+        i = self._ids.get(addr)
+        return None if i is None else (self._gen[i], self._lost[i])
+
+    def lost_since(self, addr: str, before: Optional[Tuple[int, int]]) -> bool:
+        """True si el nodo perdió aristas desde `before` (o fue desalojado)."""
+        now = self.stamp(addr)
+        if now is None:
+            return before is not None
+        if before is None or now[0] != before[0]:
+            return now[1] > 0 or before is not None
+        return now[1] > before[1]
+
+    def stats(self) -> dict:
+        return {"nodes": len(self._ids), "edges": self.edges, "dropped": self.dropped,
+                "evicted": self.evicted, "txs": len(self._seen)}
+
+
+graph = AdjacencyIndex()
+# expansiones compartidas entre requests: un hub popular se descarga una vez por TTL
+_expansions = AsyncTTLCache(GRAPH_MAX_NODES, GRAPH_EXPAND_TTL_S, 60, name="graph_expansions")
+# un nodo que perdió aristas por un desalojo se vuelve a descargar en su próxima expansión
+graph.on_evict = _expansions.invalidate
+
+
+async def _expand(addr: str) -> int:
+    j = await account_trc20_transfers(addr, limit=GRAPH_PAGE_SIZE)
+    items = j.get("data") or []
+    graph.ingest([Transfer.from_item(it) for it in items])
+    return len(items)
+
+
+def _path(parent: Dict[str, Optional[str]], node: str) -> List[str]:
+    out = []
+    while node is not None:
+        out.append(node)
+        node = parent.get(node)
+    return out[::-1]
+
+
+async def explore(root: str, first_hop: Set[str], first_hop_risky: Set[str],
+                  is_risky: Callable[[str], Awaitable[bool]],
+                  max_hops: int = GRAPH_MAX_HOPS, fanout: int = GRAPH_HOP_FANOUT) -> dict:
+    """BFS acotado desde `root`: distancia de taint y caminos hacia nodos riesgosos.
+
+    El salto 1 ya viene resuelto por el chequeo de contrapartes; desde ahí solo
+    se expanden los `fanout` vecinos limpios de mayor volumen por nodo.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + GRAPH_DEADLINE_S
+    parent: Dict[str, Optional[str]] = {root: None}
+    tainted: Dict[str, int] = {}
+    for a in first_hop_risky:
+        parent[a] = root
+        tainted[a] = 1
+    clean = [a for a, _ in graph.neighbors(root, min_weight=_MIN_EDGE_MICRO) if a in first_hop and a not in tainted]
+    if not clean and not graph.neighbors(root, limit=1):
+        # raíz fuera del índice (p.ej. re-score incremental tras reinicio): sin pesos
+        clean = sorted(first_hop - first_hop_risky)
+    frontier = clean[:fanout]
+    for a in frontier:
+        parent[a] = root
+    expansions = checked = failed = 0
+    partial = False
+    # nodos expandidos en este request cuya adyacencia quedó incompleta (desalojo / tope de grado)
+    saturated: Set[str] = set()
+
+    for hop in range(2, max_hops + 1):
+        if not frontier:
+            break
+        budget = max(0, GRAPH_MAX_EXPANSIONS - expansions)
+        to_expand = frontier[:budget]
+        partial = partial or len(to_expand) < len(frontier)
+        remaining = deadline - loop.time()
+        if not to_expand or remaining <= 0:
+            partial = True
+            break
+        stamps = {a: graph.stamp(a) for a in to_expand}
+        fan = FanOut(lambda a: _expansions.get_or_load(a, lambda: _expand(a)), deadline=remaining)
+        fan.submit_many(to_expand)
+        _, pending = await fan.join()
+        partial = partial or bool(pending) or bool(fan.errors)
+        failed += len(fan.errors)
+        expansions += len(to_expand)
+
+        nxt: List[str] = []
+        for a in to_expand:
+            for b, _ in graph.neighbors(a, limit=fanout, min_weight=_MIN_EDGE_MICRO):
+                if b not in parent:
+                    parent[b] = a
+                    nxt.append(b)
+            if graph.lost_since(a, stamps[a]):
+                saturated.add(a)
+        if not nxt:
+            break
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            partial = True
+            break
+        # veredictos memoizados (cache de veredictos compartida)
+        fan = FanOut(is_risky, deadline=remaining)
+        fan.submit_many(nxt)
+        results, pending = await fan.join()
+        partial = partial or bool(pending) or bool(fan.errors)
+        failed += len(fan.errors)
+        checked += len(results)
+        for b, risky in results.items():
+            if risky:
+                tainted[b] = hop
+        frontier = [b for b in nxt if b in results and b not in tainted]
+
+    by_distance: Dict[int, int] = {}
+    for d in tainted.values():
+        by_distance[d] = by_distance.get(d, 0) + 1
+    nearest = sorted(tainted.items(), key=lambda kv: (kv[1], kv[0]))[:GRAPH_MAX_PATHS]
+    return {
+        "taint_distance": min(tainted.values()) if tainted else None,
+        "tainted_by_distance": {str(d): n for d, n in sorted(by_distance.items())},
+        "paths": [_path(parent, node) for node, _ in nearest],
+        "expanded": expansions,
+        "checked": checked,
+        "failed": failed,
+        "partial": partial,
+        "saturated": len(saturated),
+    }
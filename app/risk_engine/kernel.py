@@ -0,0 +1,88 @@
+"""Kernel vectorizado (NumPy) de las reglas de rules.py para N wallets a la vez.
+
+Re-scorea features ya guardados (batch, backtesting de pesos) sin I/O ni
+llamadas upstream. Produce exactamente lo mismo que el camino escalar
+(rule_points / risk_level / exposure_breakdown); ver bench/bench_kernel.py.
+NumPy es opcional: solo lo importa este módulo.
+"""
+from typing import Dict, List, Mapping
+
+import numpy as np
+
+from .features import F_BLACKLISTED, F_FRAUD, F_BL_EVIDENCE
+from .rules import DUST_MIN_EVENTS, EXPOSURE_CATEGORIES
+from .weights import W
+
+FEATURES = ("blacklisted", "fraud", "bl_evidence", "risky_hits", "risky_in", "risky_out",
+            "dust_in", "dust_out", "multihop")
+LEVELS = ("Low", "Medium", "High")
+
+
+def _f(features: Mapping[str, "np.ndarray"], name: str, n: int) -> np.ndarray:
+    v = features.get(name)
+    return np.zeros(n, dtype=np.int64) if v is None else np.asarray(v)
+
+
+def from_columns(cols: Mapping[str, "np.ndarray"]) -> Dict[str, np.ndarray]:
+    """Features del kernel desde columnas guardadas (bitflags + conteos), p.ej. el dataset columnar `scores`."""
+    flags = np.asarray(cols["flags"], dtype=np.int64)
+    f = {k: np.asarray(cols[k], dtype=np.int64) for k in ("risky_in", "risky_out", "risky_hits", "dust_in",
+                                                          "dust_out", "multihop")}
+    f.update(blacklisted=(flags & F_BLACKLISTED) != 0, fraud=(flags & F_FRAUD) != 0,
+             bl_evidence=(flags & F_BL_EVIDENCE) != 0)
+    return f
+
+
+def scores(features: Mapping[str, "np.ndarray"], w=W, dust_min: int = DUST_MIN_EVENTS) -> np.ndarray:
+    """risk_score (int64) por wallet; mismo orden de reglas que rule_points."""
+    n = len(features["risky_hits"])
+    bl = _f(features, "blacklisted", n).astype(bool)
+    fraud = _f(features, "fraud", n).astype(bool)
+    evidence = _f(features, "bl_evidence", n).astype(bool) & ~bl
+    hits = _f(features, "risky_hits", n)
+    dust = _f(features, "dust_in", n) + _f(features, "dust_out", n)
+
+    s = np.where(bl, max(0, w.BLACKLIST_USDT), 0).astype(np.float64)
+    s += np.where(fraud, w.FRAUD_FLAG, 0)
+    s = np.where(evidence, np.maximum(s, w.BLACKLIST_USDT), s)
+    s += np.where(hits > 0, np.minimum(hits * w.COUNTERPARTY_HIT, w.COUNTERPARTY_CAP), 0)
+    dust_add = np.trunc(np.minimum(w.DUST_BASE + (dust - dust_min) * w.DUST_PER_EVENT, w.DUST_CAP))
+    s += np.where(dust >= dust_min, dust_add, 0)
+    return np.trunc(np.minimum(s, 100)).astype(np.int64)
+
+
+def levels(score: np.ndarray, w=W) -> np.ndarray:
+    """Índice en LEVELS (0 Low, 1 Medium, 2 High)."""
+    return (score >= w.LEVEL_MEDIUM).astype(np.int8) + (score >= w.LEVEL_HIGH).astype(np.int8)
+
+
+def exposure_shares(features: Mapping[str, "np.ndarray"]) -> np.ndarray:
+    """Matriz (N, len(EXPOSURE_CATEGORIES)) de porcentajes redondeados a 1 decimal; 0 = categoría ausente."""
+    n = len(features["risky_hits"])
+    counts = np.stack([_f(features, k, n).astype(np.int64)
+                       for k in ("risky_in", "risky_out", "dust_in", "dust_out", "multihop")], axis=1)
+    total = np.maximum(1, counts.sum(axis=1))[:, None]
+    raw = 100.0 * counts / total
+    shares = np.round(raw, 1)
+    # round() de Python redondea el double exacto; np.round escala por 10 y difiere solo
+    # cuando el cociente cae justo en un .x5 (2000·v/total entero impar): esos pocos se corrigen
+    twice = counts * 2000
+    tie = (twice % total == 0) & ((twice // total) % 2 == 1)
+    if tie.any():
+        idx = np.nonzero(tie)
+        shares[idx] = [round(float(x), 1) for x in raw[idx]]
+    return shares
+
+
+def score_batch(features: Mapping[str, "np.ndarray"], w=W, dust_min: int = DUST_MIN_EVENTS) -> Dict[str, np.ndarray]:
+    s = scores(features, w, dust_min)
+    return {"risk_score": s, "risk_level": levels(s, w), "exposure": exposure_shares(features)}
+
+
+def exposure_rows(shares: np.ndarray, features: Mapping[str, "np.ndarray"]) -> List[List[dict]]:
+    # forma de `exposure` del resultado escalar (solo categorías con conteo > 0)
+    n = len(shares)
+    present = np.stack([_f(features, k, n) > 0
+                        for k in ("risky_in", "risky_out", "dust_in", "dust_out", "multihop")], axis=1)
+    return [[{"category": EXPOSURE_CATEGORIES[j], "share": float(row[j])} for j in np.nonzero(p)[0]]
+            for row, p in zip(shares.tolist(), present)]
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from .features import Features, F_BLACKLISTED, F_FRAUD, F_BL_EVIDENCE, F_TRUNCATED, F_GRAPH_PARTIAL
+from .rules import rule_points, risk_level, exposure_breakdown
+from .transfers import DUST_MICRO_USDT, DUST_SMALL_USDT, MICRO
+
+# Etapa de presentación: Features -> JSON de la API / PDF. Sin I/O; barato de
+# repetir en cada request o re-render.
+
+
+def fmt_amount(d: Decimal, places=2) -> str:
+    # 2 decimales + separador de miles, sin notación científica
+    q = Decimal(10) ** -places
+    try:
+        val = d.quantize(q)
+        return format(val, ",f")  # p.ej. 359,011.06
+    except Exception:
+        return "0.00"
+
+def fmt_time(ms: int | None) -> str | None:
+    if not ms:
+        return None
+    dt = datetime.fromtimestamp(ms/1000, tz=timezone.utc)
+    hour = dt.strftime("%I").lstrip("0") or "0"      # 03 -> 3
+    minute = dt.strftime("%M")                       # 05
+    ampm = dt.strftime("%p").lower()                 # am/pm
+    return f"{dt.strftime('%Y-%m-%d')}, {hour}:{minute} {ampm}"
+
+def build_summary(level: str, reasons: List[Dict[str, Any]]) -> str:
+    if not reasons:
+        return "No se detectaron señales de riesgo en las verificaciones básicas."
+    top = ", ".join(sorted({r["code"] for r in reasons}))
+    return f"Nivel {level}. Señales principales: {top}."
+
+
+def _details(f: Features) -> Dict[str, str]:
+    dust = f.dust_in + f.dust_out
+    return {
+        "BLACKLIST_USDT": "TRONSCAN: is_black_list=true",
+        "FRAUD_FLAG": "TRONSCAN: has_fraud_transaction",
+        "BLACKLIST_USDT_EVIDENCE": "stableCoin/blackList reportó coincidencia",
+        "COUNTERPARTY_HIGH": f"{f.risky_hits} contrapartes 1-hop con señales de riesgo",
+        "DUST_ACTIVITY": f"{dust} eventos dust USDT (micro≤${DUST_MICRO_USDT}, small≤${DUST_SMALL_USDT}) in:{f.dust_in} out:{f.dust_out} src_uni:{f.uniq_src} dst_uni:{f.uniq_dst}",
+    }
+
+
+def render(f: Features) -> dict:
+    """Resultado de la API (mismo formato que score_wallet) a partir de los features."""
+    score, points = rule_points(f.has(F_BLACKLISTED), f.has(F_FRAUD), f.has(F_BL_EVIDENCE), f.risky_hits,
+                                f.dust_in + f.dust_out)
+    details = _details(f)
+    reasons = [{"code": code, "weight": weight, "detail": details[code]} for code, weight in points]
+    level = risk_level(score)
+    result = {
+        "address": f.address,
+        "risk_score": score,
+        "risk_level": level,
+        "partial": f.partial,
+        "reasons": reasons,
+        "summary": build_summary(level, reasons),
+        "basic_info": {
+            "balance_trx_raw": f.balance,
+            "created_at": fmt_time(f.created_ms),
+            "last_operation_at": fmt_time(f.last_op_ms),
+            "inflow_usdt": fmt_amount(Decimal(f.inflow) / MICRO),
+            "outflow_usdt": fmt_amount(Decimal(f.outflow) / MICRO),
+            "first_transfer": fmt_time(f.first_ts),
+            "last_transfer": fmt_time(f.last_ts),
+            "dust_in_events": f.dust_in,
+            "dust_out_events": f.dust_out,
+            "dust_total": f.dust_in + f.dust_out,
+        },
+        # evidencia recortada a lo que usa el scoring (sin los payloads crudos de TRONSCAN)
+        "evidence": {
+            "tronscan_security": {"is_black_list": f.has(F_BLACKLISTED), "has_fraud_transaction": f.has(F_FRAUD)},
+            "tronscan_blacklist": {"total": f.bl_total},
+            "counterparties": {
+                "total": f.counterparties,
+                "checked": f.counterparties - f.pending,
+                "pending": f.pending,
+                "overflow": f.overflow,
+            },
+            "trc20": {
+                "events": f.events,
+                "pages": f.pages,
+                "new_events": f.new_events,
+                "incremental_from": f.from_cursor,
+                "truncated": f.has(F_TRUNCATED),
+            },
+            "degraded": list(f.degraded),
+        },
+        "exposure": exposure_breakdown(f.risky_in, f.risky_out, f.dust_in, f.dust_out, multihop_cnt=f.multihop),
+    }
+    if f.tainted is not None:
+        paths = [list(p) for p in f.paths]
+        result["evidence"]["graph"] = {
+            "taint_distance": f.taint_distance,
+            "tainted_by_distance": f.tainted,
+            "paths": paths,
+            "expanded": f.expanded,
+            "checked": f.checked,
+            "failed": f.failed,
+            "partial": f.has(F_GRAPH_PARTIAL),
+        }
+        for ex in result["exposure"]:
+            if ex["category"] == "Blacklist Indirect (2+ hops)":
+                ex["distance"] = min(int(d) for d in f.tainted if int(d) >= 2)
+                ex["paths"] = [p for p in paths if len(p) > 2]
+    if f.timings is not None:
+        result["timings_ms"] = f.timings
+    return result
@@ -0,0 +1,55 @@
+import os
+from typing import List, Tuple
+
+from .weights import W
+
+# Reglas de scoring sobre features ya calculados (sin I/O). Única fuente de
+# verdad del camino escalar; kernel.py replica exactamente lo mismo en lote.
+DUST_MIN_EVENTS = int(os.getenv("DUST_MIN_EVENTS", "3"))
+
+EXPOSURE_CATEGORIES = ("Blacklist Indirect In", "Blacklist Indirect Out", "Dust In (USDT)", "Dust Out (USDT)",
+                       "Blacklist Indirect (2+ hops)")
+
+
+def risk_level(score, w=W) -> str:
+    return "High" if score >= w.LEVEL_HIGH else ("Medium" if score >= w.LEVEL_MEDIUM else "Low")
+
+
+def rule_points(blacklisted: bool, fraud: bool, bl_evidence: bool, risky_hits: int, dust_events: int,
+                w=W, dust_min: int = DUST_MIN_EVENTS) -> Tuple[int, List[Tuple[str, float]]]:
+    """Aplica las reglas en orden; devuelve (score 0-100, [(código, peso)])."""
+    hits: List[Tuple[str, float]] = []
+    score = 0
+    if blacklisted:
+        hits.append(("BLACKLIST_USDT", w.BLACKLIST_USDT))
+        score = max(score, w.BLACKLIST_USDT)
+    if fraud:
+        hits.append(("FRAUD_FLAG", w.FRAUD_FLAG))
+        score += w.FRAUD_FLAG
+    if bl_evidence and not blacklisted:
+        hits.append(("BLACKLIST_USDT_EVIDENCE", w.BLACKLIST_USDT_EVIDENCE))
+        score = max(score, w.BLACKLIST_USDT)
+    if risky_hits:
+        add = min(risky_hits * w.COUNTERPARTY_HIT, w.COUNTERPARTY_CAP)
+        hits.append(("COUNTERPARTY_HIGH", add))
+        score += add
+    if dust_events >= dust_min:
+        add = int(min(w.DUST_BASE + (dust_events - dust_min) * w.DUST_PER_EVENT, w.DUST_CAP))
+        hits.append(("DUST_ACTIVITY", add))
+        score += add
+    return int(min(score, 100)), hits
+
+
+def exposure_breakdown(risky_in_cnt, risky_out_cnt, dust_in_cnt, dust_out_cnt, dex_hits=0, cex_hits=0,
+                       multihop_cnt=0):
+    total = max(1, risky_in_cnt + risky_out_cnt + dust_in_cnt + dust_out_cnt + dex_hits + cex_hits + multihop_cnt)
+    expo = []
+
+    def add(cat, v):
+        if v > 0: expo.append({"category": cat, "share": round(100.0 * v / total, 1)})
+
+    for cat, v in zip(EXPOSURE_CATEGORIES, (risky_in_cnt, risky_out_cnt, dust_in_cnt, dust_out_cnt, multihop_cnt)):
+        add(cat, v)
+    if dex_hits: add("DEX", dex_hits)
+    if cex_hits: add("Exchange", cex_hits)
+    return expo
@@ -0,0 +1,310 @@
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+import base64
+import hashlib
+import math
+import os
+
+from ..sources.trongrid import USDT_CONTRACT
+from ..utils.address import canonical_address
+
+DUST_MICRO_USDT = Decimal(os.getenv("DUST_MICRO_USDT", "0.1"))
+DUST_SMALL_USDT = Decimal(os.getenv("DUST_SMALL_USDT", "1.0"))
+USDT_CONTRACT_UP = USDT_CONTRACT.upper()
+USDT_MAX_EVENT = Decimal("1e12")  # umbral sanitario por evento
+COUNTERPARTY_MAX = int(os.getenv("COUNTERPARTY_MAX", "5000"))  # tope de contrapartes únicas a revisar
+SKETCH_BITS = 1 << 16  # bitmap de los conteos de distintos pasado el tope (8 KB)
+
+# Montos en micro-USDT (enteros): 1 USDT = 1_000_000
+MICRO = 10 ** 6
+_MAX_MICRO = int(USDT_MAX_EVENT) * MICRO
+# límites DUST: como entero (floor) para el camino rápido y Decimal para el resto
+_DUST_MICRO_LIM = DUST_MICRO_USDT * MICRO
+_DUST_SMALL_LIM = DUST_SMALL_USDT * MICRO
+_DUST_MICRO_LIM_INT = int(_DUST_MICRO_LIM)
+_DUST_SMALL_LIM_INT = int(_DUST_SMALL_LIM)
+
+
+def _micro_usdt_slow(value, dec) -> "int | Decimal":
+    # misma semántica que _normalize_amount_usdt (Decimal), expresada en micro-USDT
+    amt = Decimal(str(value)) / (Decimal(10) ** int(dec))
+    if amt <= 0 or amt > USDT_MAX_EVENT:
+        raise InvalidOperation("USDT outlier")
+    m = amt * MICRO
+    return int(m) if m == m.to_integral_value() else m
+
+
+def micro_usdt(it: dict) -> "int | Decimal":
+    """Monto USDT del evento en micro-USDT; 0 si es inválido u outlier."""
+    try:
+        value = it.get("value", "0")
+        dec = (it.get("token_info", {}) or {}).get("decimals") or it.get("decimals") or 6
+        if type(dec) is not int:
+            dec = int(dec)
+        if type(value) is str and value.isdigit():
+            v = int(value)
+        elif type(value) is int:
+            v = value
+        else:
+            return _micro_usdt_slow(value, dec)
+        if 0 <= dec <= 6:
+            m = v * 10 ** (6 - dec)
+        elif 6 < dec <= 16:
+            m, rest = divmod(v, 10 ** (dec - 6))
+            if rest:
+                return _micro_usdt_slow(value, dec)
+        else:
+            return _micro_usdt_slow(value, dec)
+        if m <= 0 or m > _MAX_MICRO:
+            return 0
+        return m
+    except Exception:
+        return 0
+
+
+def is_usdt(it: dict) -> bool:
+    addr = (it.get("token_info", {}) or {}).get("address") or it.get("contract_address")
+    return addr == USDT_CONTRACT or (addr or "").upper() == USDT_CONTRACT_UP
+
+
+class Transfer:
+    """Transferencia TRC20 normalizada una sola vez (usdt = micro-USDT, 0 si no aplica).
+
+    from/to quedan en forma base58 canónica, así las formas hex y base58 de
+    una misma cuenta se deduplican en los conjuntos de contrapartes.
+    """
+
+    __slots__ = ("ts", "frm", "to", "usdt", "tx")
+
+    def __init__(self, ts, frm: str, to: str, usdt, tx: str = ""):
+        self.ts = ts
+        self.frm = frm
+        self.to = to
+        self.usdt = usdt
+        self.tx = tx
+
+    def key(self) -> str:
+        return f"{self.tx}:{self.frm}:{self.to}:{self.usdt}"
+
+    @classmethod
+    def from_item(cls, it: dict) -> "Transfer":
+        get = it.get
+        ti = get("token_info", {}) or {}
+        contract = ti.get("address") or get("contract_address")
+        m = 0
+        if contract == USDT_CONTRACT or (contract or "").upper() == USDT_CONTRACT_UP:
+            # camino rápido: valor entero en texto y 6 decimales (USDT)
+            value = get("value", "0")
+            if type(value) is str and value.isdigit() and (ti.get("decimals") or get("decimals") or 6) in (6, "6"):
+                m = int(value)
+                if m > _MAX_MICRO:
+                    m = 0
+            else:
+                m = micro_usdt(it)
+        # base58 de 34 caracteres (lo que manda TronGrid) ya es canónico: solo hex u otras formas se convierten
+        frm = get("from") or get("transfer_from") or ""
+        if len(frm) != 34:
+            frm = canonical_address(frm)
+        to = get("to") or get("transfer_to") or ""
+        if len(to) != 34:
+            to = canonical_address(to)
+        return cls(
+            get("block_timestamp") or get("timestamp"),
+            frm,
+            to,
+            m,
+            get("transaction_id") or "",
+        )
+
+
+class DistinctCounter:
+    """Cantidad de direcciones distintas en memoria acotada.
+
+    Exacto hasta `cap` valores (un set; 0 = sin tope). Pasado el tope los vuelca a
+    un bitmap de conteo lineal de SKETCH_BITS bits con hash estable (blake2b), así el
+    estado persistido sirve entre procesos; error de ~1% hasta decenas de miles.
+    """
+
+    __slots__ = ("cap", "items", "bits")
+
+    def __init__(self, cap: int = COUNTERPARTY_MAX, items: Iterable[str] = ()):
+        self.cap = cap
+        self.items: Set[str] = set(items)
+        self.bits: Optional[bytearray] = None
+
+    def _set_bit(self, v: str) -> None:
+        i = int.from_bytes(hashlib.blake2b(v.encode(), digest_size=4).digest(), "big") % SKETCH_BITS
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def add(self, v: str) -> None:
+        if self.bits is None:
+            if v in self.items or not self.cap or len(self.items) < self.cap:
+                self.items.add(v)
+                return
+            self.bits = bytearray(SKETCH_BITS // 8)
+            for x in self.items:
+                self._set_bit(x)
+            self.items = set()
+        self._set_bit(v)
+
+    def __len__(self) -> int:
+        if self.bits is None:
+            return len(self.items)
+        zeros = SKETCH_BITS - int.from_bytes(self.bits, "big").bit_count()
+        return round(SKETCH_BITS * math.log(SKETCH_BITS / max(zeros, 1)))
+
+    def to_state(self) -> Union[List[str], str]:
+        return sorted(self.items) if self.bits is None else base64.b64encode(self.bits).decode()
+
+    @classmethod
+    def from_state(cls, state, cap: int = COUNTERPARTY_MAX) -> "DistinctCounter":
+        if isinstance(state, str):
+            c = cls(cap)
+            c.bits = bytearray(base64.b64decode(state))
+            return c
+        return cls(cap, state or ())
+
+
+class TransferAnalyzer:
+    """Análisis fusionado de transferencias TRC20 en una sola pasada.
+
+    Reemplaza los tres recorridos de core (contrapartes, DUST y flujos) y
+    produce exactamente los mismos valores. Se alimenta por páginas.
+    """
+
+    def __init__(self, self_addr: str, cap: int = COUNTERPARTY_MAX):
+        self.self_addr = self_addr
+        self.cap = cap
+        self.events = 0
+        # flujos (micro-USDT)
+        self.inflow = 0; self.outflow = 0
+        self.first_ts = None; self.last_ts = None
+        # DUST
+        self.micro_in = self.micro_out = self.small_in = self.small_out = 0
+        # orígenes/destinos DUST distintos: memoria acotada aunque sea un exchange
+        self.uniq_src = DistinctCounter(cap); self.uniq_dst = DistinctCounter(cap)
+        # contrapartes 1-hop
+        self.ins: Set[str] = set(); self.outs: Set[str] = set()
+        self.unique = 0
+        self.overflowed = DistinctCounter(cap)  # contrapartes descartadas por el tope (distintas)
+        # claves de las transferencias con ts == last_ts: al re-consultar desde
+        # el cursor (min_timestamp es inclusivo) evitan contar dos veces
+        self.at_last_ts: Set[str] = set()
+        self.duplicates = 0
+        # historial cortado por TRC20_MAX_EVENTS: lo anterior a backfill_ts falta y se
+        # completa en re-scores siguientes; backfill_keys = ya ingeridas con ts == backfill_ts
+        self.backfill_ts: Optional[int] = None
+        self.backfill_keys: Set[str] = set()
+
+    def _counterparty(self, bucket: Set[str], other: Set[str], addr: str, new: Set[str]) -> None:
+        if addr not in other:
+            if self.cap and self.unique >= self.cap:
+                self.overflowed.add(addr)
+                return
+            self.unique += 1
+            new.add(addr)
+        bucket.add(addr)
+
+    def feed(self, items: List[dict]) -> Set[str]:
+        return self.feed_records([Transfer.from_item(it) for it in items])
+
+    def feed_records(self, records: List[Transfer]) -> Set[str]:
+        # devuelve las contrapartes vistas por primera vez en este lote
+        me = self.self_addr
+        ins, outs = self.ins, self.outs
+        first_ts, last_ts = self.first_ts, self.last_ts
+        new: Set[str] = set()
+        at_last = self.at_last_ts
+        counted = 0
+        for t in records:
+            ts, frm, to, m = t.ts, t.frm, t.to, t.usdt
+            if ts is not None:
+                if last_ts and ts == last_ts:
+                    k = t.key()
+                    if k in at_last:
+                        self.duplicates += 1
+                        continue
+                    at_last.add(k)
+                elif not last_ts or ts > last_ts:
+                    at_last = {t.key()}
+                if not first_ts or ts < first_ts: first_ts = ts
+                if not last_ts or ts > last_ts: last_ts = ts
+            counted += 1
+            if frm and frm != me and frm not in ins: self._counterparty(ins, outs, frm, new)  # desde otros hacia mí
+            if to and to != me and to not in outs: self._counterparty(outs, ins, to, new)  # desde mí hacia otros
+            if not m:
+                continue
+            if to == me: self.inflow += m
+            if frm == me: self.outflow += m
+            if type(m) is int:
+                is_micro = m <= _DUST_MICRO_LIM_INT
+                is_small = not is_micro and m <= _DUST_SMALL_LIM_INT
+            else:
+                is_micro = m <= _DUST_MICRO_LIM
+                is_small = not is_micro and m <= _DUST_SMALL_LIM
+            if is_micro:
+                if to == me: self.micro_in += 1; self.uniq_src.add(frm)
+                if frm == me: self.micro_out += 1; self.uniq_dst.add(to)
+            elif is_small:
+                if to == me: self.small_in += 1; self.uniq_src.add(frm)
+                if frm == me: self.small_out += 1; self.uniq_dst.add(to)
+        self.events += counted
+        self.first_ts, self.last_ts = first_ts, last_ts
+        self.at_last_ts = at_last
+        return new
+
+    def flows(self):
+        return (Decimal(self.inflow) / MICRO, Decimal(self.outflow) / MICRO, self.first_ts, self.last_ts)
+
+    def dust(self) -> dict:
+        return {
+            "micro_in": self.micro_in, "micro_out": self.micro_out,
+            "small_in": self.small_in, "small_out": self.small_out,
+            "unique_sources": len(self.uniq_src), "unique_dests": len(self.uniq_dst),
+        }
+
+    def counterparties(self):
+        return self.ins, self.outs
+
+    @property
+    def overflow(self) -> int:
+        return len(self.overflowed)
+
+    # ------------------- estado persistible (re-scoring incremental) -------------------
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "inflow": str(self.inflow), "outflow": str(self.outflow),
+            "first_ts": self.first_ts, "last_ts": self.last_ts,
+            "micro_in": self.micro_in, "micro_out": self.micro_out,
+            "small_in": self.small_in, "small_out": self.small_out,
+            "uniq_src": self.uniq_src.to_state(), "uniq_dst": self.uniq_dst.to_state(),
+            "ins": sorted(self.ins), "outs": sorted(self.outs),
+            "overflowed": self.overflowed.to_state(),
+            "at_last_ts": sorted(self.at_last_ts),
+            "backfill_ts": self.backfill_ts, "backfill_keys": sorted(self.backfill_keys),
+        }
+
+    @classmethod
+    def from_state(cls, self_addr: str, state: Dict[str, Any], cap: int = COUNTERPARTY_MAX) -> "TransferAnalyzer":
+        a = cls(self_addr, cap)
+        a.events = int(state.get("events", 0))
+        a.inflow = _parse_micro(state.get("inflow", "0"))
+        a.outflow = _parse_micro(state.get("outflow", "0"))
+        a.first_ts = state.get("first_ts"); a.last_ts = state.get("last_ts")
+        a.micro_in = int(state.get("micro_in", 0)); a.micro_out = int(state.get("micro_out", 0))
+        a.small_in = int(state.get("small_in", 0)); a.small_out = int(state.get("small_out", 0))
+        a.uniq_src = DistinctCounter.from_state(state.get("uniq_src"), cap)
+        a.uniq_dst = DistinctCounter.from_state(state.get("uniq_dst"), cap)
+        a.ins = set(state.get("ins", ())); a.outs = set(state.get("outs", ()))
+        a.unique = len(a.ins | a.outs)
+        a.overflowed = DistinctCounter.from_state(state.get("overflowed"), cap)
+        a.at_last_ts = set(state.get("at_last_ts", ()))
+        a.backfill_ts = state.get("backfill_ts")
+        a.backfill_keys = set(state.get("backfill_keys", ()))
+        return a
+
+
+def _parse_micro(v) -> "int | Decimal":
+    s = str(v)
+    return int(s) if s.lstrip("-").isdigit() else Decimal(s)
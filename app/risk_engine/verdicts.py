@@ -0,0 +1,51 @@
+import os
+
+from ..sources.tronscan import check_account_security, check_stablecoin_blacklist
+from ..sources.blacklist_mirror import mirror
+from ..storage.snapshots import load_verdict, save_verdict
+from ..utils.cache import AsyncTTLCache
+
+# Veredictos por dirección (TRONSCAN) compartidos entre requests: las
+# contrapartes "calientes" (exchanges, hubs USDT) se consultan una vez por TTL.
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "20000"))
+VERDICT_TTL_S = float(os.getenv("VERDICT_TTL_SECONDS", "3600"))
+VERDICT_ERROR_TTL_S = float(os.getenv("VERDICT_ERROR_TTL_SECONDS", "30"))
+# L2 en la base de snapshots: con varios workers (python -m app.serve) un veredicto
+# consultado por uno lo reutilizan los demás en vez de gastar cuota upstream
+VERDICT_SHARED = os.getenv("VERDICT_SHARED", "0") not in ("0", "false", "False", "")
+
+security_cache = AsyncTTLCache(VERDICT_CACHE_SIZE, VERDICT_TTL_S, VERDICT_ERROR_TTL_S, name="tronscan_security")
+blacklist_cache = AsyncTTLCache(VERDICT_CACHE_SIZE, VERDICT_TTL_S, VERDICT_ERROR_TTL_S, name="tronscan_blacklist")
+
+
+async def _shared(kind: str, address: str, fetch) -> dict:
+    if VERDICT_SHARED:
+        hit = load_verdict(kind, address, VERDICT_TTL_S)
+        if hit is not None:
+            return hit
+    verdict = await fetch(address)
+    if VERDICT_SHARED:
+        save_verdict(kind, address, verdict)
+    return verdict
+
+
+async def account_security(address: str) -> dict:
+    return await security_cache.get_or_load(address, lambda: _shared("security", address, check_account_security))
+
+
+def mirror_blacklisted(address: str):
+    # True/False desde el espejo local; None si hay que ir upstream
+    return mirror.contains(address)
+
+
+async def stablecoin_blacklist(address: str) -> dict:
+    hit = mirror.contains(address)
+    if hit is not None:
+        return {"total": 1 if hit else 0, "source": "mirror"}
+    return await blacklist_cache.get_or_load(address, lambda: _shared("blacklist", address, check_stablecoin_blacklist))
+
+
+def cache_stats() -> dict:
+    stats = {c.name: c.stats() for c in (security_cache, blacklist_cache)}
+    stats["blacklist_mirror"] = mirror.stats()
+    return stats
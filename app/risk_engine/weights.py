@@ -8,3 +8,6 @@ class W:
     DUST_BASE = 5         # si supera el mínimo
     DUST_PER_EVENT = 1    # extra por evento
     DUST_CAP = 15         # tope de puntos por DUST
+    # cortes de nivel (score >= corte)
+    LEVEL_HIGH = 70
+    LEVEL_MEDIUM = 30
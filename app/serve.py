@@ -0,0 +1,65 @@
+# app/serve.py
+"""Servidor de producción: uvicorn con N procesos worker (prefork).
+
+Un PDF o una ráfaga de scoring ocupan un worker sin frenar al resto. El estado
+compartido vive en los backends (snapshots/estado incremental/veredictos en
+SQLite, PDFs en disco, jobs y watchlist en sus bases); las tareas de fondo
+únicas las corre el worker que tiene el lock de líder (ver main.py).
+
+Uso: python -m app.serve   (WEB_CONCURRENCY=N, HOST, PORT)
+"""
+import os
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import uvicorn
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "/tmp/tron_risk_snapshots")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(max(2, min(4, os.cpu_count() or 1)))))
+SERVE_KEEPALIVE_S = int(os.getenv("SERVE_KEEPALIVE_SECONDS", "5"))
+SERVE_LOG_LEVEL = os.getenv("SERVE_LOG_LEVEL", "info")
+SERVE_ACCESS_LOG = os.getenv("SERVE_ACCESS_LOG", "0") not in ("0", "false", "False", "")
+
+
+def _split(name: str, default: str, workers: int, integer: bool = False) -> None:
+    # los token buckets son por proceso: la cuota upstream total se reparte entre los workers
+    total = float(os.getenv(name, default))
+    share = total / workers
+    os.environ[name] = str(max(1, int(share)) if integer else share)
+
+
+def configure(workers: int) -> None:
+    """Entorno de los workers (heredado al hacer spawn)."""
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers <= 1:
+        return
+    rps = os.getenv("TRONSCAN_RPS", "15" if os.getenv("TRONSCAN_API_KEY") else "4")
+    os.environ.setdefault("TRONSCAN_BURST", str(max(1, int(float(rps)))))
+    os.environ.setdefault("TRONGRID_BURST", str(max(1, int(float(os.getenv("TRONGRID_RPS", "10"))))))
+    _split("TRONSCAN_RPS", rps, workers)
+    _split("TRONSCAN_BURST", "1", workers, integer=True)
+    _split("TRONGRID_RPS", "10", workers)
+    _split("TRONGRID_BURST", "1", workers, integer=True)
+    # estado que de otro modo quedaría por proceso
+    os.environ.setdefault("VERDICT_SHARED", "1")
+    os.environ.setdefault("PDF_CACHE_DIR", os.path.join(SNAPSHOT_DIR, "pdf"))
+
+
+def main() -> None:
+    configure(WEB_CONCURRENCY)
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=WEB_CONCURRENCY,
+        timeout_keep_alive=SERVE_KEEPALIVE_S,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        log_level=SERVE_LOG_LEVEL,
+        access_log=SERVE_ACCESS_LOG,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import asyncio, json, mmap, os, time
+from pathlib import Path
+from typing import Optional, Set
+
+from .tronscan import stablecoin_blacklist_page
+from ..utils.address import parse_address
+
+# Espejo local de la blacklist USDT: archivo ordenado de direcciones de 21 bytes
+# (0x41 + 20, ver TronAddress), memory-mapped, con un set en memoria para búsquedas O(1).
+BLACKLIST_MIRROR = os.getenv("BLACKLIST_MIRROR", "1") not in ("0", "false", "False", "")
+BLACKLIST_DIR = Path(os.getenv("BLACKLIST_MIRROR_DIR", os.getenv("SNAPSHOT_DIR", "/tmp/tron_risk_snapshots")))
+BLACKLIST_PAGE_SIZE = int(os.getenv("BLACKLIST_PAGE_SIZE", "50"))
+BLACKLIST_SYNC_MIN = float(os.getenv("BLACKLIST_SYNC_MINUTES", "30"))
+BLACKLIST_FULL_SYNC_H = float(os.getenv("BLACKLIST_FULL_SYNC_HOURS", "24"))
+BLACKLIST_MAX_AGE_MIN = float(os.getenv("BLACKLIST_MAX_AGE_MINUTES", "180"))
+BLACKLIST_RELOAD_S = float(os.getenv("BLACKLIST_RELOAD_SECONDS", "60"))
+RECORD = 21
+
+
+def _raw(address: str) -> Optional[bytes]:
+    try:
+        return parse_address(address).raw
+    except ValueError:
+        return None
+
+
+class BlacklistMirror:
+    def __init__(self, directory: Path = BLACKLIST_DIR):
+        self.dir = Path(directory)
+        self.data_path = self.dir / "usdt_blacklist.bin"
+        self.meta_path = self.dir / "usdt_blacklist.meta.json"
+        self._set: Set[bytes] = set()
+        self.synced_at = 0.0
+        self.full_synced_at = 0.0
+        self._loaded_mtime = 0.0
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._set)
+
+    def load(self) -> None:
+        try:
+            mtime = self.meta_path.stat().st_mtime
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            with open(self.data_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                entries: Set[bytes] = set()
+                if size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        entries = {mm[i:i + RECORD] for i in range(0, size - size % RECORD, RECORD)}
+        except Exception:
+            return
+        self._set = entries
+        self.synced_at = float(meta.get("synced_at", 0))
+        self.full_synced_at = float(meta.get("full_synced_at", 0))
+        self._loaded_mtime = mtime
+
+    def reload_if_changed(self) -> bool:
+        # workers que no sincronizan: releen el archivo cuando otro proceso lo reescribió
+        try:
+            changed = self.meta_path.stat().st_mtime != self._loaded_mtime
+        except OSError:
+            return False
+        if changed:
+            self.load()
+        return changed
+
+    def _write(self, entries: Set[bytes], full: bool) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.data_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(sorted(entries)))
+        os.replace(tmp, self.data_path)
+        now = time.time()
+        meta = {"synced_at": now, "full_synced_at": now if full else self.full_synced_at, "count": len(entries)}
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.meta_path)
+        self._loaded_mtime = self.meta_path.stat().st_mtime
+        self._set = entries
+        self.synced_at = meta["synced_at"]
+        self.full_synced_at = meta["full_synced_at"]
+
+    @property
+    def fresh(self) -> bool:
+        return bool(self.synced_at) and time.time() - self.synced_at <= BLACKLIST_MAX_AGE_MIN * 60
+
+    def contains(self, address: str) -> Optional[bool]:
+        """True/False si el espejo está al día; None si está vencido o la dirección no decodifica."""
+        if not BLACKLIST_MIRROR or not self.fresh:
+            return None
+        raw = _raw(address)
+        if raw is None:
+            return None
+        return raw in self._set
+
+    async def sync(self, full: bool = False) -> int:
+        """Descarga la blacklist paginada. En modo incremental se detiene en la
+        primera página sin direcciones nuevas; el full sync detecta bajas."""
+        async with self._lock:
+            full = full or not self.full_synced_at
+            entries: Set[bytes] = set() if full else set(self._set)
+            start = 0
+            while True:
+                j = await stablecoin_blacklist_page(start, BLACKLIST_PAGE_SIZE)
+                data = j.get("data") or []
+                new = 0
+                for e in data:
+                    raw = _raw(str(e.get("blackAddress") or ""))
+                    if raw is not None and raw not in entries:
+                        entries.add(raw); new += 1
+                start += len(data)
+                total = int(j.get("total") or 0)
+                if not data or len(data) < BLACKLIST_PAGE_SIZE or (total and start >= total):
+                    break
+                if not full and new == 0:
+                    break
+            self._write(entries, full)
+            return len(entries)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._set), "synced_at": self.synced_at, "fresh": self.fresh}
+
+
+mirror = BlacklistMirror()
+_sync_task: Optional[asyncio.Task] = None
+
+
+async def _sync_loop() -> None:
+    while True:
+        try:
+            full = time.time() - mirror.full_synced_at > BLACKLIST_FULL_SYNC_H * 3600
+            await mirror.sync(full=full)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        await asyncio.sleep(BLACKLIST_SYNC_MIN * 60)
+
+
+async def _reload_loop() -> None:
+    while True:
+        await asyncio.sleep(BLACKLIST_RELOAD_S)
+        try:
+            mirror.reload_if_changed()
+        except Exception:
+            pass
+
+
+def start_mirror_sync(sync: bool = True) -> None:
+    """sync=False: solo relee el espejo que mantiene otro proceso (workers no líderes)."""
+    global _sync_task
+    if BLACKLIST_MIRROR and _sync_task is None:
+        _sync_task = asyncio.ensure_future(_sync_loop() if sync else _reload_loop())
+
+
+async def stop_mirror_sync() -> None:
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except BaseException:
+            pass
+        _sync_task = None
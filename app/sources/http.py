@@ -0,0 +1,112 @@
+import asyncio, os, time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..metrics import observe_upstream, record_span, UPSTREAM_RETRIES, UPSTREAM_HEDGES, UPSTREAM_REJECTED
+from .resilience import (CircuitOpenError, RETRY_MAX, backoff, breaker_for, hedge_delay, hedged, is_retryable,
+                         latency_for, retry_after)
+
+# Un AsyncClient por host upstream: mantiene el pool keep-alive entre requests
+# en lugar de abrir TCP+TLS en cada llamada.
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") not in ("0", "false", "False", "")
+
+try:  # HTTP/2 requiere el extra httpx[http2] (paquete h2)
+    import h2  # noqa: F401
+    _HAS_H2 = True
+except ImportError:
+    _HAS_H2 = False
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _new_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=HTTP2_ENABLED and _HAS_H2,
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_client(base_url: str) -> httpx.AsyncClient:
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = _new_client(base_url)
+        _clients[base_url] = client
+    return client
+
+
+async def close_clients(base_url: Optional[str] = None) -> None:
+    targets = [base_url] if base_url else list(_clients)
+    for url in targets:
+        client = _clients.pop(url, None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+
+async def _attempt(client: httpx.AsyncClient, path: str, endpoint: str, limiter, kw: dict) -> httpx.Response:
+    if limiter is not None:
+        await limiter.acquire()
+    t0 = time.perf_counter()
+    status: Any = "error"
+    try:
+        r = await client.get(path, **kw)
+        status = r.status_code
+        return r
+    except asyncio.CancelledError:
+        # perdedor de un hedge (o request cancelado): no es un error del upstream
+        status = "cancelled"
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        observe_upstream(endpoint, dt, status)
+        record_span(f"upstream.{endpoint}", t0, dt, status=status)
+        if isinstance(status, int) and status < 400:
+            latency_for(endpoint).add(dt)
+
+
+async def get_json(base_url: str, path: str, *, endpoint: str, limiter=None, **kw) -> Any:
+    """GET upstream con rate limit, reintentos (backoff con jitter / Retry-After),
+    circuit breaker por host y hedging opcional. Los errores finales se propagan."""
+    client = get_client(base_url)
+    breaker = breaker_for(base_url)
+    attempt = 0
+    while True:
+        try:
+            breaker.check()
+        except CircuitOpenError:
+            UPSTREAM_REJECTED.inc(endpoint)
+            raise
+        r: Optional[httpx.Response] = None
+        exc: Optional[Exception] = None
+        try:
+            r = await hedged(lambda: _attempt(client, path, endpoint, limiter, kw), hedge_delay(endpoint),
+                             lambda: UPSTREAM_HEDGES.inc(endpoint))
+        except httpx.TransportError as e:
+            exc = e
+        # 429 y 4xx: el host responde, no cuenta como caída
+        if exc is None and r.status_code < 500:
+            breaker.success()
+        else:
+            breaker.failure()
+        if attempt < RETRY_MAX and is_retryable(exc, r):
+            delay = retry_after(r) if r is not None else None
+            await asyncio.sleep(backoff(attempt) if delay is None else delay)
+            attempt += 1
+            UPSTREAM_RETRIES.inc(endpoint)
+            continue
+        if exc is not None:
+            raise exc
+        r.raise_for_status()
+        return r.json()
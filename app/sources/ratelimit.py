@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Limitador token-bucket: `rate` tokens/segundo con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst if burst is not None else rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:  # sin límite
+            return
+        # el lock mantiene el orden de llegada mientras se espera el refill
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+    def debit(self, tokens: float) -> None:
+        """Ajusta el saldo sin esperar (negativo = devolución); un saldo negativo demora los próximos acquire."""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.burst, self._tokens - tokens)
@@ -0,0 +1,171 @@
+import asyncio
+import email.utils
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# Reintentos: backoff exponencial con jitter completo; Retry-After manda si viene
+RETRY_MAX = int(os.getenv("UPSTREAM_RETRIES", "3"))
+RETRY_BASE_S = float(os.getenv("UPSTREAM_RETRY_BASE_SECONDS", "0.25"))
+RETRY_MAX_BACKOFF_S = float(os.getenv("UPSTREAM_RETRY_MAX_BACKOFF_SECONDS", "8"))
+RETRY_AFTER_MAX_S = float(os.getenv("UPSTREAM_RETRY_AFTER_MAX_SECONDS", "30"))
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Circuit breaker por host: N fallas seguidas lo abren; tras el cooldown deja pasar una sonda
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# Hedging: si una llamada supera el p95 observado se lanza una segunda y gana la primera
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") not in ("0", "false", "False", "")
+HEDGE_MIN_S = float(os.getenv("HEDGE_MIN_SECONDS", "0.2"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """El upstream está marcado caído: se falla rápido sin llamarlo."""
+
+
+def retry_after(r: httpx.Response) -> Optional[float]:
+    v = r.headers.get("retry-after")
+    if not v:
+        return None
+    try:
+        secs = float(v)
+    except ValueError:
+        try:
+            secs = email.utils.parsedate_to_datetime(v).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(0.0, secs), RETRY_AFTER_MAX_S)
+
+
+def backoff(attempt: int) -> float:
+    # attempt 0 = primer reintento
+    return random.uniform(0, min(RETRY_MAX_BACKOFF_S, RETRY_BASE_S * (2 ** attempt)))
+
+
+def is_retryable(exc: Optional[BaseException], r: Optional[httpx.Response]) -> bool:
+    if exc is not None:
+        return isinstance(exc, httpx.TransportError)
+    return r is not None and r.status_code in RETRY_STATUSES
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET_S):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self.opened = 0  # veces que se abrió
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def check(self) -> None:
+        state = self.state
+        if state == "closed":
+            return
+        now = time.monotonic()
+        # una sola sonda a la vez; si la sonda se perdió (cancelada) se permite otra tras el cooldown
+        if state == "half_open" and (self._probe_at is None or now - self._probe_at >= self.reset_after):
+            self._probe_at = now
+            return
+        raise CircuitOpenError(f"Circuito abierto para {self.name}")
+
+    def success(self) -> None:
+        self._consecutive = 0
+        self._opened_at = None
+        self._probe_at = None
+
+    def failure(self) -> None:
+        self._consecutive += 1
+        if self._probe_at is not None or self._consecutive >= self.failures:
+            if self._opened_at is None or self._probe_at is not None:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+            self._probe_at = None
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self._consecutive, "opened": self.opened}
+
+
+class LatencyTracker:
+    """Ventana de latencias recientes por endpoint para estimar el p95."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        s = sorted(self._samples)
+        return s[min(len(s) - 1, int(len(s) * 0.95))]
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: Optional[float],
+                 on_hedge: Optional[Callable[[], None]] = None) -> T:
+    """Ejecuta `call`; si no terminó tras `delay` s lanza una segunda copia y
+    devuelve la primera que termine bien (o el error si fallan ambas)."""
+    if delay is None:
+        return await call()
+    first = asyncio.ensure_future(call())
+    racers = {first}
+    try:
+        done, _ = await asyncio.wait(racers, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            racers.add(asyncio.ensure_future(call()))
+        while True:
+            done, racers = await asyncio.wait(racers, return_when=asyncio.FIRST_COMPLETED)
+            ok = [t for t in done if t.exception() is None]
+            if ok or not racers:
+                return (ok or list(done))[0].result()
+    finally:
+        for t in racers:
+            t.cancel()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latency: Dict[str, LatencyTracker] = {}
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    b = _breakers.get(host)
+    if b is None:
+        b = _breakers[host] = CircuitBreaker(host)
+    return b
+
+
+def latency_for(endpoint: str) -> LatencyTracker:
+    t = _latency.get(endpoint)
+    if t is None:
+        t = _latency[endpoint] = LatencyTracker()
+    return t
+
+
+def hedge_delay(endpoint: str) -> Optional[float]:
+    if not HEDGE_ENABLED:
+        return None
+    p95 = latency_for(endpoint).p95()
+    return None if p95 is None else max(HEDGE_MIN_S, p95)
+
+
+def stats() -> dict:
+    return {"breakers": {h: b.stats() for h, b in _breakers.items()},
+            "p95_ms": {e: round(p * 1000, 1) for e, t in _latency.items() if (p := t.p95()) is not None}}
@@ -1,41 +1,88 @@
-import httpx
+import asyncio
+import os
+import time
+from typing import AsyncIterator, List, Optional
 
-TRONGRID = "https://api.trongrid.io"
+from .http import get_json
+from .ratelimit import TokenBucket
+
+TRONGRID = (os.getenv("TRONGRID_BASE") or "https://api.trongrid.io").rstrip("/")
 USDT_CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
 
+TRONGRID_RPS = float(os.getenv("TRONGRID_RPS", "10"))
+limiter = TokenBucket(TRONGRID_RPS, int(os.getenv("TRONGRID_BURST", str(max(1, int(TRONGRID_RPS))))))
+
+# Paginado TRC20: tamaño de página (máx. 200 en TronGrid) y topes de ingesta
+TRC20_PAGE_SIZE = int(os.getenv("TRC20_PAGE_SIZE", "200"))
+TRC20_MAX_EVENTS = int(os.getenv("TRC20_MAX_EVENTS", "20000"))  # 0 = sin tope
+TRC20_MAX_AGE_DAYS = float(os.getenv("TRC20_MAX_AGE_DAYS", "0"))  # 0 = todo el historial
+
 
 async def account_overview(address_b58: str) -> dict:
-    url = f"{TRONGRID}/v1/accounts/{address_b58}"
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        return r.json()
+    return await get_json(TRONGRID, f"/v1/accounts/{address_b58}", endpoint="trongrid_overview", limiter=limiter)
 
 
 async def account_transactions(address_b58: str, limit=50, fingerprint=None) -> dict:
     params = {"limit": limit}
     if fingerprint:
         params["fingerprint"] = fingerprint
-    url = f"{TRONGRID}/v1/accounts/{address_b58}/transactions"
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.get(url, params=params)
-        r.raise_for_status()
-        return r.json()
+    return await get_json(TRONGRID, f"/v1/accounts/{address_b58}/transactions", endpoint="trongrid_transactions",
+                          limiter=limiter, params=params)
 
 
-async def account_trc20_transfers(address_b58: str, limit=200, min_timestamp=None, max_timestamp=None) -> dict:
+async def account_trc20_transfers(address_b58: str, limit=200, min_timestamp=None, max_timestamp=None,
+                                  fingerprint=None, order_by=None) -> dict:
     params = {"limit": limit}
+    if fingerprint: params["fingerprint"] = fingerprint
+    if order_by: params["order_by"] = order_by
     if min_timestamp is not None: params["min_timestamp"] = min_timestamp
     if max_timestamp is not None: params["max_timestamp"] = max_timestamp
-    url = f"{TRONGRID}/v1/accounts/{address_b58}/transactions/trc20"
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.get(url, params=params)
-        r.raise_for_status()
-        j = r.json() or {}
-        data = j.get("data")
+    j = await get_json(TRONGRID, f"/v1/accounts/{address_b58}/transactions/trc20", endpoint="trongrid_trc20",
+                       limiter=limiter, params=params) or {}
+    data = j.get("data")
+    if not isinstance(data, list):
+        data = j.get("token_transfers")
         if not isinstance(data, list):
-            data = j.get("token_transfers")
-            if not isinstance(data, list):
-                data = []
-        j["data"] = data
-        return j
+            data = []
+    j["data"] = data
+    return j
+
+
+async def iter_trc20_transfers(address_b58: str, page_size: int = TRC20_PAGE_SIZE,
+                               max_events: int = TRC20_MAX_EVENTS,
+                               max_age_days: float = TRC20_MAX_AGE_DAYS,
+                               min_timestamp: Optional[int] = None,
+                               order_by: Optional[str] = None,
+                               max_timestamp: Optional[int] = None) -> AsyncIterator[List[dict]]:
+    """Recorre todas las páginas TRC20 (via `meta.fingerprint`), una lista por página.
+
+    Backpressure: a lo sumo se pide una página por adelantado mientras el
+    consumidor procesa la actual; si el consumidor deja de iterar, la
+    descarga pendiente se cancela.
+    """
+    if max_age_days and max_age_days > 0:
+        cutoff = int((time.time() - max_age_days * 86400) * 1000)
+        min_timestamp = max(min_timestamp or 0, cutoff)
+    seen = 0
+    nxt = asyncio.ensure_future(account_trc20_transfers(
+        address_b58, limit=page_size, min_timestamp=min_timestamp, max_timestamp=max_timestamp, order_by=order_by))
+    try:
+        while nxt is not None:
+            j = await nxt
+            nxt = None
+            page = j.get("data") or []
+            if max_events and seen + len(page) >= max_events:
+                page = page[:max_events - seen]
+                fingerprint = None
+            else:
+                fingerprint = (j.get("meta") or {}).get("fingerprint")
+            seen += len(page)
+            if fingerprint and page:
+                nxt = asyncio.ensure_future(account_trc20_transfers(
+                    address_b58, limit=page_size, min_timestamp=min_timestamp, max_timestamp=max_timestamp,
+                    fingerprint=fingerprint, order_by=order_by))
+            if page:
+                yield page
+    finally:
+        if nxt is not None:
+            nxt.cancel()
@@ -1,8 +1,17 @@
-import os, httpx
+import os
 
-TRONSCAN_BASE = "https://apilist.tronscanapi.com"
+from .http import get_json
+from .ratelimit import TokenBucket
+
+TRONSCAN_BASE = (os.getenv("TRONSCAN_BASE") or "https://apilist.tronscanapi.com").rstrip("/")
 USDT_CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
 
+# Cuota de TRONSCAN: más holgada con API key. 0 desactiva el límite.
+_DEFAULT_RPS = "15" if os.getenv("TRONSCAN_API_KEY") else "4"
+TRONSCAN_RPS = float(os.getenv("TRONSCAN_RPS", _DEFAULT_RPS))
+TRONSCAN_BURST = int(os.getenv("TRONSCAN_BURST", str(max(1, int(TRONSCAN_RPS)))))
+limiter = TokenBucket(TRONSCAN_RPS, TRONSCAN_BURST)
+
 def _headers():
     key = os.getenv("TRONSCAN_API_KEY", "")
     h = {}
@@ -11,26 +20,24 @@ def _headers():
     return h
 
 async def check_account_security(address: str) -> dict:
-    url = f"{TRONSCAN_BASE}/api/security/account/data"
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.get(url, params={"address": address}, headers=_headers())
-        r.raise_for_status()
-        return r.json()
+    return await get_json(TRONSCAN_BASE, "/api/security/account/data", endpoint="tronscan_security",
+                          limiter=limiter, params={"address": address}, headers=_headers())
 
 
 async def check_stablecoin_blacklist(address: str) -> dict:
-    url = f"{TRONSCAN_BASE}/api/stableCoin/blackList"
     params = {"blackAddress": address, "start": 0, "limit": 1, "sort": 2, "direction": 2}
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.get(url, params=params, headers=_headers())
-        r.raise_for_status()
-        return r.json()
+    return await get_json(TRONSCAN_BASE, "/api/stableCoin/blackList", endpoint="tronscan_blacklist",
+                          limiter=limiter, params=params, headers=_headers())
+
+
+async def stablecoin_blacklist_page(start=0, limit=50) -> dict:
+    # listado completo (paginado) de la blacklist de stablecoins
+    params = {"start": start, "limit": limit, "sort": 2, "direction": 2}
+    return await get_json(TRONSCAN_BASE, "/api/stableCoin/blackList", endpoint="tronscan_blacklist_page",
+                          limiter=limiter, params=params, headers=_headers())
 
 
 async def trc20_transfers(address: str, start=0, limit=200) -> dict:
-    url = f"{TRONSCAN_BASE}/api/transfer/trc20"
     params = {"address": address, "trc20Id": USDT_CONTRACT, "start": start, "limit": limit, "reverse": "true"}
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.get(url, params=params, headers=_headers())
-        r.raise_for_status()
-        return r.json()
+    return await get_json(TRONSCAN_BASE, "/api/transfer/trc20", endpoint="tronscan_trc20",
+                          limiter=limiter, params=params, headers=_headers())
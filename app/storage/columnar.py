@@ -0,0 +1,312 @@
+import importlib.util, json, os, shutil, threading, time, uuid
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .snapshots import SNAPSHOT_DIR, SNAPSHOT_BACKEND, iter_snapshots
+from ..risk_engine.features import Features, F_BLACKLISTED, F_FRAUD, F_BL_EVIDENCE
+from ..risk_engine.rules import rule_points
+
+# Export columnar (Parquet, particionado por fecha) de scores y transferencias
+# normalizadas, para analítica sobre toda la flota sin abrir los snapshots JSON.
+# pyarrow es opcional: sin él el export queda apagado y las consultas dan error.
+COLUMNAR_DIR = Path(os.getenv("COLUMNAR_DIR", str(SNAPSHOT_DIR / "columnar")))
+COLUMNAR_EXPORT = os.getenv("COLUMNAR_EXPORT", "0") not in ("0", "false", "False", "")
+COLUMNAR_TRANSFERS = os.getenv("COLUMNAR_TRANSFERS", "1") not in ("0", "false", "False", "")
+COLUMNAR_FLUSH_ROWS = int(os.getenv("COLUMNAR_FLUSH_ROWS", "50000"))
+COLUMNAR_FLUSH_S = float(os.getenv("COLUMNAR_FLUSH_SECONDS", "60"))
+
+MICRO = 10 ** 6
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+EXPORT_ENABLED = COLUMNAR_EXPORT and HAS_ARROW
+
+SCORES = "scores"
+TRANSFERS = "transfers"
+
+
+class ColumnarUnavailable(RuntimeError):
+    """pyarrow no está instalado."""
+
+
+_arrow = None
+
+
+def arrow():
+    # import diferido: pyarrow pesa en el arranque y solo se usa si hay export/consultas
+    global _arrow
+    if _arrow is None:
+        if not HAS_ARROW:
+            raise ColumnarUnavailable("El export columnar requiere pyarrow (pip install pyarrow).")
+        import pyarrow as pa, pyarrow.compute as pc, pyarrow.dataset as ds
+        _arrow = (pa, pc, ds)
+    return _arrow
+
+
+def _schemas() -> Dict[str, "object"]:
+    pa = arrow()[0]
+    return {
+        SCORES: pa.schema([
+            ("date", pa.string()),
+            ("address", pa.string()),
+            ("scored_at", pa.int64()),  # epoch ms
+            ("risk_score", pa.int16()),
+            ("risk_level", pa.string()),
+            ("partial", pa.bool_()),
+            ("reasons", pa.list_(pa.string())),
+            ("events", pa.int32()),
+            ("counterparties", pa.int32()),
+            ("pending", pa.int32()),
+            ("risky", pa.list_(pa.string())),  # contrapartes riesgosas; null si no se conocen (backfill)
+            ("dust_in", pa.int32()),
+            ("dust_out", pa.int32()),
+            ("inflow", pa.int64()),  # micro-USDT
+            ("outflow", pa.int64()),
+            # features para re-scorear con el kernel (null en snapshots anteriores a los features)
+            ("flags", pa.int32()),
+            ("risky_in", pa.int32()),
+            ("risky_out", pa.int32()),
+            ("risky_hits", pa.int32()),
+            ("multihop", pa.int32()),
+        ]),
+        TRANSFERS: pa.schema([
+            ("date", pa.string()),
+            ("wallet", pa.string()),  # dirección scoreada que trajo la transferencia
+            ("ts", pa.int64()),
+            ("frm", pa.string()),
+            ("to", pa.string()),
+            ("usdt", pa.int64()),  # micro-USDT, 0 si no es USDT
+            ("tx", pa.string()),
+        ]),
+    }
+
+
+def _date(ms) -> str:
+    return datetime.fromtimestamp((ms or 0) / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _micro(text) -> int:
+    # "1,234.56" (basic_info) -> micro-USDT
+    try:
+        return int(Decimal(str(text or "0").replace(",", "")) * MICRO)
+    except InvalidOperation:
+        return 0
+
+
+def score_row(payload, scored_at_ms: Optional[int] = None, risky: Optional[Iterable[str]] = None) -> tuple:
+    """Fila de `scores` desde un registro Features (o su dict persistido) o,
+    para snapshots anteriores, desde el resultado completo de la API."""
+    if isinstance(payload, dict) and "f" not in payload:
+        return _legacy_score_row(payload, scored_at_ms, risky)
+    f = Features.from_dict(payload) if isinstance(payload, dict) else payload
+    ts = int(scored_at_ms if scored_at_ms is not None else f.scored_at)
+    _, points = rule_points(f.has(F_BLACKLISTED), f.has(F_FRAUD), f.has(F_BL_EVIDENCE), f.risky_hits,
+                            f.dust_in + f.dust_out)
+    return (
+        _date(ts), f.address, ts, f.risk_score, f.risk_level,
+        f.partial, [code for code, _ in points],
+        f.events, f.counterparties, f.pending, sorted(risky) if risky is not None else None,
+        f.dust_in, f.dust_out, int(f.inflow), int(f.outflow),
+        f.flags, f.risky_in, f.risky_out, f.risky_hits, f.multihop,
+    )
+
+
+def _legacy_score_row(result: dict, scored_at_ms: int, risky: Optional[Iterable[str]] = None) -> tuple:
+    ev = result.get("evidence") or {}
+    cp = ev.get("counterparties") or {}
+    basic = result.get("basic_info") or {}
+    return (
+        _date(scored_at_ms), result.get("address", ""), int(scored_at_ms),
+        result.get("risk_score"), result.get("risk_level"), bool(result.get("partial")),
+        [r.get("code") for r in result.get("reasons") or ()],
+        (ev.get("trc20") or {}).get("events"), cp.get("total"), cp.get("pending"),
+        sorted(risky) if risky is not None else None,
+        basic.get("dust_in_events"), basic.get("dust_out_events"),
+        _micro(basic.get("inflow_usdt")), _micro(basic.get("outflow_usdt")),
+        None, None, None, None, None,
+    )
+
+
+def transfer_rows(wallet: str, records) -> List[tuple]:
+    # usdt fraccionario (Decimal, raro) se trunca a micro-USDT entero
+    return [(_date(t.ts), wallet, t.ts, t.frm, t.to, int(t.usdt), t.tx) for t in records]
+
+
+def write_rows(name: str, rows: List[tuple], root: Path = COLUMNAR_DIR) -> int:
+    """Escribe filas (tuplas en el orden del schema) como un archivo Parquet
+    por partición date=YYYY-MM-DD; nombres únicos, así varios procesos pueden
+    escribir en el mismo dataset."""
+    if not rows:
+        return 0
+    pa, _, ds = arrow()
+    schema = _schemas()[name]
+    cols = list(zip(*rows))
+    table = pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(cols, schema)], schema=schema)
+    ds.write_dataset(
+        table, str(Path(root) / name), format="parquet", partitioning=["date"], partitioning_flavor="hive",
+        basename_template=f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore")
+    return len(rows)
+
+
+def read(name: str, columns: Optional[List[str]] = None, start: Optional[str] = None, end: Optional[str] = None,
+         filter=None, root: Path = COLUMNAR_DIR):
+    """Tabla Arrow con las columnas pedidas; start/end (YYYY-MM-DD, inclusivos)
+    podan particiones sin abrir sus archivos. None si el dataset no existe."""
+    pa, _, ds = arrow()
+    path = Path(root) / name
+    if not path.exists():
+        return None
+    dataset = ds.dataset(str(path), format="parquet", schema=_schemas()[name],
+                         partitioning=ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive"))
+    expr = filter
+    for cond in ((ds.field("date") >= start) if start else None, (ds.field("date") <= end) if end else None):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def compact(name: str, root: Path = COLUMNAR_DIR, min_files: int = 2) -> int:
+    """Une los archivos chicos de cada partición en uno solo. Devuelve particiones compactadas.
+
+    No usar con escritores activos sobre la misma partición (típicamente: días anteriores)."""
+    pa, _, ds = arrow()
+    import pyarrow.parquet as pq
+    done = 0
+    today = f"date={_date(time.time() * 1000)}"
+    for part in sorted((Path(root) / name).glob("date=*")):
+        files = sorted(part.glob("*.parquet"))
+        if len(files) < min_files or part.name == today:
+            continue
+        schema = _schemas()[name]
+        table = ds.dataset([str(f) for f in files], format="parquet",
+                           schema=pa.schema([f for f in schema if f.name != "date"])).to_table()
+        tmp = part / f".compact-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(table, str(tmp))
+        os.replace(tmp, part / f"part-{int(time.time() * 1000)}-compact-0.parquet")
+        for f in files:
+            f.unlink(missing_ok=True)
+        done += 1
+    return done
+
+
+# ------------------- export en vivo (desde score_wallet) -------------------
+class ColumnarSink:
+    """Buffer de filas por dataset; un hilo lo vuelca a Parquet cada
+    COLUMNAR_FLUSH_SECONDS o al llegar a COLUMNAR_FLUSH_ROWS."""
+
+    def __init__(self, root: Path = COLUMNAR_DIR, flush_rows: int = COLUMNAR_FLUSH_ROWS):
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self._lock = threading.Lock()
+        self._buf: Dict[str, List[tuple]] = {SCORES: [], TRANSFERS: []}
+        self._full = threading.Event()
+        self.written = {SCORES: 0, TRANSFERS: 0}
+        self.errors = 0
+
+    def add(self, name: str, rows: List[tuple]) -> None:
+        with self._lock:
+            buf = self._buf[name]
+            buf.extend(rows)
+            if len(buf) >= self.flush_rows:
+                self._full.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._buf = self._buf, {SCORES: [], TRANSFERS: []}
+            self._full.clear()
+        n = 0
+        for name, rows in pending.items():
+            try:
+                n += write_rows(name, rows, self.root)
+                self.written[name] += len(rows)
+            except Exception:
+                self.errors += 1
+        return n
+
+    def buffered(self) -> Dict[str, int]:
+        with self._lock:
+            return {k: len(v) for k, v in self._buf.items()}
+
+
+sink = ColumnarSink()
+
+
+def record_score(features, risky: Optional[Iterable[str]] = None) -> None:
+    sink.add(SCORES, [score_row(features, None, risky)])
+
+
+def record_transfers(wallet: str, records) -> None:
+    if COLUMNAR_TRANSFERS:
+        sink.add(TRANSFERS, transfer_rows(wallet, records))
+
+
+_exporter: Optional[threading.Thread] = None
+_exporter_stop = threading.Event()
+
+
+def _export_loop():
+    while not _exporter_stop.is_set():
+        sink._full.wait(COLUMNAR_FLUSH_S)
+        sink.flush()
+
+
+def start_exporter() -> None:
+    global _exporter
+    if _exporter is not None or not EXPORT_ENABLED:
+        return
+    _exporter_stop.clear()
+    _exporter = threading.Thread(target=_export_loop, name="columnar-exporter", daemon=True)
+    _exporter.start()
+
+
+def stop_exporter() -> None:
+    global _exporter
+    if _exporter is None:
+        return
+    _exporter_stop.set()
+    sink._full.set()
+    _exporter.join(timeout=30)
+    _exporter = None
+    sink.flush()
+
+
+# ------------------- backfill desde el almacén de snapshots -------------------
+def _cursor_path(root: Path) -> Path:
+    return Path(root) / "_export_cursor.json"
+
+
+def export_snapshots(root: Path = COLUMNAR_DIR, chunk: int = 5000) -> int:
+    """Exporta al dataset `scores` los snapshots guardados desde la última
+    corrida (cursor por backend en COLUMNAR_DIR). Sin contrapartes riesgosas:
+    los snapshots no las guardan."""
+    arrow()
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    path = _cursor_path(root)
+    try:
+        cursors = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cursors = {}
+    after = cursors.get(SNAPSHOT_BACKEND, 0)
+    total = 0
+    while True:
+        batch = iter_snapshots(after, chunk)
+        if not batch:
+            break
+        rows = [score_row({**payload, "address": payload.get("address") or address}, int(created_at * 1000))
+                for _, address, created_at, payload in batch if payload]
+        total += write_rows(SCORES, rows, root)
+        after = batch[-1][0]
+        cursors[SNAPSHOT_BACKEND] = after
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cursors), encoding="utf-8")
+        os.replace(tmp, path)
+    return total
+
+
+def reset(root: Path = COLUMNAR_DIR) -> None:
+    # borra datasets y cursor (re-export completo)
+    for name in (SCORES, TRANSFERS):
+        shutil.rmtree(Path(root) / name, ignore_errors=True)
+    _cursor_path(root).unlink(missing_ok=True)
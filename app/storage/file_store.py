@@ -0,0 +1,170 @@
+import os, json, hashlib, time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+
+class FileSnapshotStore:
+    """Backend original: un JSON por dirección (sin historial)."""
+
+    def __init__(self, directory: Path, ttl_min: int, history_days: float = 0):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_min = ttl_min
+        self.history_days = history_days
+
+    def _fname(self, address: str) -> Path:
+        # archivo solo por hash para evitar problemas con caracteres
+        h = hashlib.sha256(address.strip().encode("utf-8")).hexdigest()
+        return self.dir / f"{h}.json"
+
+    def save(self, address: str, payload: dict) -> str:
+        path = self._fname(address)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        os.replace(tmp, path)  # atómico
+        return str(path)
+
+    def save_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        n = 0
+        for address, payload in items:
+            self.save(address, payload); n += 1
+        return n
+
+    def _is_fresh(self, path: Path) -> bool:
+        if self.ttl_min <= 0:
+            return True
+        try:
+            age = time.time() - path.stat().st_mtime
+            return age <= self.ttl_min * 60
+        except FileNotFoundError:
+            return False
+
+    def load(self, address: str) -> Optional[dict]:
+        path = self._fname(address)
+        if not path.exists():
+            return None
+        if not self._is_fresh(path):
+            try: path.unlink(missing_ok=True)
+            except Exception: pass
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def saved_at(self, address: str) -> Optional[float]:
+        try:
+            return self._fname(address).stat().st_mtime
+        except OSError:
+            return None
+
+    def history(self, address: str, limit: int = 20) -> List[dict]:
+        path = self._fname(address)
+        snap = self.load(address)
+        if snap is None:
+            return []
+        return [{"created_at": path.stat().st_mtime, "result": snap}]
+
+    def iter_since(self, after: float, limit: int = 1000) -> List[Tuple[float, str, float, dict]]:
+        # sin ids: el cursor es el mtime (ms) del archivo
+        files = []
+        for path in self.dir.glob("*.json"):
+            try:
+                m = path.stat().st_mtime
+            except OSError:
+                continue
+            if m * 1000 > after:
+                files.append((m, path))
+        out = []
+        for m, path in sorted(files)[:limit]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+            except Exception:
+                continue
+            out.append((m * 1000, payload.get("address", ""), m, payload))
+        return out
+
+    def recent(self, limit: int = 1000) -> List[Tuple[str, dict]]:
+        files = []
+        for path in self.dir.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        out = []
+        for _, path in sorted(files, reverse=True):
+            if len(out) >= limit:
+                break
+            if not self._is_fresh(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+            except Exception:
+                continue
+            out.append((payload.get("address", ""), payload))
+        return out
+
+    def clear(self, address: str) -> None:
+        path = self._fname(address)
+        try:
+            path.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def _state_fname(self, address: str) -> Path:
+        return self._fname(address).with_suffix(".state")
+
+    def load_state(self, address: str) -> Optional[dict]:
+        try:
+            with open(self._state_fname(address), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def save_state(self, address: str, state: dict) -> None:
+        path = self._state_fname(address)
+        tmp = path.with_suffix(".state.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        os.replace(tmp, path)
+
+    def clear_state(self, address: str) -> None:
+        try:
+            self._state_fname(address).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    # sin tabla de veredictos: cada proceso usa solo su caché en memoria
+    def load_verdict(self, kind: str, address: str, max_age_s: float) -> Optional[dict]:
+        return None
+
+    def save_verdict(self, kind: str, address: str, payload: dict) -> None:
+        pass
+
+    def sweep(self) -> int:
+        # borra los JSON vencidos (antes solo se borraban al leerlos). El estado incremental
+        # (cursor + acumuladores) vive history_days como wallet_state en SQLite: sobrevive al
+        # snapshot para que el re-score siguiente siga siendo incremental
+        removed = 0
+        for path in self.dir.glob("*.json"):
+            if not self._is_fresh(path):
+                try:
+                    path.unlink(missing_ok=True); removed += 1
+                except Exception:
+                    pass
+        if self.history_days > 0:
+            cutoff = time.time() - self.history_days * 86400
+            for path in self.dir.glob("*.state"):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink(missing_ok=True); removed += 1
+                except Exception:
+                    pass
+        return removed
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,111 @@
+import json, os, sqlite3, threading, time, uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BATCH_DB = Path(os.getenv("BATCH_DB", str(Path(os.getenv("SNAPSHOT_DIR", "/tmp/tron_risk_snapshots")) / "jobs.sqlite3")))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    seq INTEGER,
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS ix_batch_items_seq ON batch_items(job_id, seq);
+"""
+
+
+class JobStore:
+    """Jobs de scoring por lotes en SQLite: cada ítem terminado queda
+    persistido con un número de secuencia, así un job se puede reanudar
+    tras un crash y su salida se puede re-emitir en orden de finalización."""
+
+    def __init__(self, path: Path = BATCH_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def create_job(self, addresses: List[str]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("INSERT INTO batch_jobs(id, created_at, updated_at, status, total) VALUES (?,?,?,?,?)",
+                                   (job_id, now, now, "pending", len(addresses)))
+                self._conn.executemany("INSERT INTO batch_items(job_id, idx, address) VALUES (?,?,?)",
+                                       [(job_id, i, a) for i, a in enumerate(addresses)])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT id, created_at, updated_at, status, total FROM batch_jobs WHERE id=?",
+                                     (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM batch_items WHERE job_id=? GROUP BY status", (job_id,)).fetchall())
+        return {
+            "job_id": row[0], "created_at": row[1], "updated_at": row[2], "status": row[3], "total": row[4],
+            "done": counts.get("done", 0), "errors": counts.get("error", 0),
+        }
+
+    def list_jobs(self, limit: int = 50) -> List[dict]:
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(
+                "SELECT id FROM batch_jobs ORDER BY created_at DESC LIMIT ?", (int(limit),)).fetchall()]
+        return [j for j in (self.get_job(i) for i in ids) if j]
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE batch_jobs SET status=?, updated_at=? WHERE id=?", (status, time.time(), job_id))
+
+    def heartbeat(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE batch_jobs SET updated_at=? WHERE id=?", (time.time(), job_id))
+
+    def pending_items(self, job_id: str) -> List[Tuple[int, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, address FROM batch_items WHERE job_id=? AND status='pending' ORDER BY idx",
+                (job_id,)).fetchall()
+
+    def finish_item(self, job_id: str, idx: int, result: Optional[dict], error: Optional[str]) -> None:
+        status = "error" if error is not None else "done"
+        payload = json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str) if result is not None else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batch_items SET status=?, result=?, error=?, "
+                "seq=(SELECT COALESCE(MAX(seq), 0) + 1 FROM batch_items WHERE job_id=?) "
+                "WHERE job_id=? AND idx=?", (status, payload, error, job_id, job_id, idx))
+
+    def items_since(self, job_id: str, seq: int, limit: int = 500) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, idx, address, status, result, error FROM batch_items "
+                "WHERE job_id=? AND seq>? ORDER BY seq LIMIT ?", (job_id, int(seq), int(limit))).fetchall()
+        return [{"seq": s, "index": i, "address": a, "status": st,
+                 "result": json.loads(r) if r else None, "error": e} for s, i, a, st, r, e in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
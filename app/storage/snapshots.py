@@ -1,51 +1,93 @@
-import os, json, hashlib, time
+import os, threading
 from pathlib import Path
-from typing import Any, Optional
+from typing import Iterable, List, Optional, Tuple
+
+from .file_store import FileSnapshotStore
+from .sqlite_store import SQLiteSnapshotStore
 
 SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "/tmp/tron_risk_snapshots"))
 SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 TTL_MIN = int(os.getenv("SNAPSHOT_TTL_MINUTES", "120"))  # 2h por defecto
+SNAPSHOT_BACKEND = os.getenv("SNAPSHOT_BACKEND", "sqlite").lower()  # sqlite | file
+SNAPSHOT_DB = Path(os.getenv("SNAPSHOT_DB", str(SNAPSHOT_DIR / "snapshots.sqlite3")))
+HISTORY_DAYS = float(os.getenv("SNAPSHOT_HISTORY_DAYS", "30"))
+SWEEP_INTERVAL_S = float(os.getenv("SNAPSHOT_SWEEP_SECONDS", "600"))
+
+def _make_store():
+    if SNAPSHOT_BACKEND == "file":
+        return FileSnapshotStore(SNAPSHOT_DIR, TTL_MIN, HISTORY_DAYS)
+    return SQLiteSnapshotStore(SNAPSHOT_DB, TTL_MIN, HISTORY_DAYS)
 
-def _fname(address: str) -> Path:
-    # archivo solo por hash para evitar problemas con caracteres
-    h = hashlib.sha256(address.strip().encode("utf-8")).hexdigest()
-    return SNAPSHOT_DIR / f"{h}.json"
+store = _make_store()
 
 def save_snapshot(address: str, payload: dict) -> str:
-    path = _fname(address)
-    tmp = path.with_suffix(".tmp")
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=str)
-    os.replace(tmp, path)  # atómico
-    return str(path)
-
-def _is_fresh(path: Path) -> bool:
-    if TTL_MIN <= 0:
-        return True
-    try:
-        age = time.time() - path.stat().st_mtime
-        return age <= TTL_MIN * 60
-    except FileNotFoundError:
-        return False
+    return store.save(address, payload)
+
+def save_snapshots(items: Iterable[Tuple[str, dict]]) -> int:
+    return store.save_many(items)
 
 def load_snapshot(address: str) -> Optional[dict]:
-    path = _fname(address)
-    if not path.exists():
-        return None
-    if not _is_fresh(path):
-        try: path.unlink(missing_ok=True)
-        except Exception: pass
-        return None
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
+    return store.load(address)
+
+def snapshot_saved_at(address: str) -> Optional[float]:
+    # epoch del snapshot vigente más reciente (None si no hay)
+    return store.saved_at(address)
+
+def snapshot_history(address: str, limit: int = 20) -> List[dict]:
+    return store.history(address, limit)
+
+def iter_snapshots(after: float = 0, limit: int = 1000) -> List[Tuple[float, str, float, dict]]:
+    # recorrido incremental del almacén completo (export columnar)
+    return store.iter_since(after, limit)
+
+def recent_snapshots(limit: int = 1000) -> List[Tuple[str, dict]]:
+    # (address, payload) vigentes, de la más reciente a la más vieja
+    return store.recent(limit)
 
 def clear_snapshot(address: str) -> None:
-    path = _fname(address)
-    try:
-        path.unlink(missing_ok=True)
-    except Exception:
-        pass
+    store.clear(address)
+
+# Estado incremental por dirección (cursor + acumuladores + veredictos)
+def load_wallet_state(address: str) -> Optional[dict]:
+    return store.load_state(address)
+
+def save_wallet_state(address: str, state: dict) -> None:
+    store.save_state(address, state)
+
+def clear_wallet_state(address: str) -> None:
+    store.clear_state(address)
+
+# Veredictos de contrapartes compartidos entre procesos (workers de app.serve)
+def load_verdict(kind: str, address: str, max_age_s: float) -> Optional[dict]:
+    return store.load_verdict(kind, address, max_age_s)
+
+def save_verdict(kind: str, address: str, payload: dict) -> None:
+    store.save_verdict(kind, address, payload)
+
+# ------------------- sweeper en segundo plano -------------------
+_sweeper: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+
+def _sweep_loop():
+    while not _sweeper_stop.wait(SWEEP_INTERVAL_S):
+        try:
+            store.sweep()
+        except Exception:
+            pass
+
+def start_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None or SWEEP_INTERVAL_S <= 0:
+        return
+    _sweeper_stop.clear()
+    _sweeper = threading.Thread(target=_sweep_loop, name="snapshot-sweeper", daemon=True)
+    _sweeper.start()
+
+def stop_sweeper() -> None:
+    global _sweeper
+    if _sweeper is None:
+        return
+    _sweeper_stop.set()
+    _sweeper.join(timeout=5)
+    _sweeper = None
@@ -0,0 +1,177 @@
+import json, sqlite3, threading, time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    address TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    risk_score INTEGER,
+    risk_level TEXT,
+    cleared INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_addr_ts ON snapshots(address, created_at);
+CREATE INDEX IF NOT EXISTS ix_snapshots_ts ON snapshots(created_at);
+CREATE TABLE IF NOT EXISTS wallet_state (
+    address TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS verdicts (
+    kind TEXT NOT NULL,
+    address TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (kind, address)
+);
+"""
+
+
+def _dumps(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class SQLiteSnapshotStore:
+    """Snapshots en un único archivo SQLite, indexados por (address, created_at).
+
+    Cada save agrega una fila: se conserva el historial de scores por dirección.
+    La frescura (TTL) se resuelve en la consulta; el sweeper solo aplica la
+    retención del historial.
+    """
+
+    def __init__(self, path: Path, ttl_min: int, history_days: float):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_min = ttl_min
+        self.history_days = history_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _row(self, address: str, payload: dict, ts: float):
+        return (address.strip(), ts, payload.get("risk_score"), payload.get("risk_level"), _dumps(payload))
+
+    def save(self, address: str, payload: dict) -> str:
+        self.save_many([(address, payload)])
+        return str(self.path)
+
+    def save_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        now = time.time()
+        rows = [self._row(a, p, now) for a, p in items]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO snapshots(address, created_at, risk_score, risk_level, payload) VALUES (?,?,?,?,?)",
+                    rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def load(self, address: str) -> Optional[dict]:
+        min_ts = time.time() - self.ttl_min * 60 if self.ttl_min > 0 else 0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM snapshots WHERE address=? AND cleared=0 AND created_at>=? "
+                "ORDER BY created_at DESC, id DESC LIMIT 1", (address.strip(), min_ts)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return None
+
+    def saved_at(self, address: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(created_at) FROM snapshots WHERE address=? AND cleared=0",
+                                     (address.strip(),)).fetchone()
+        return row[0] if row else None
+
+    def history(self, address: str, limit: int = 20) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT created_at, payload FROM snapshots WHERE address=? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?", (address.strip(), int(limit))).fetchall()
+        return [{"created_at": ts, "result": json.loads(p)} for ts, p in rows]
+
+    def iter_since(self, after: float, limit: int = 1000) -> List[Tuple[float, str, float, dict]]:
+        # (cursor, address, created_at, payload) en orden de inserción; cursor = id de fila
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, address, created_at, payload FROM snapshots WHERE id>? ORDER BY id LIMIT ?",
+                (int(after), int(limit))).fetchall()
+        return [(i, a, ts, json.loads(p)) for i, a, ts, p in rows]
+
+    def recent(self, limit: int = 1000) -> List[Tuple[str, dict]]:
+        # snapshot vigente de las direcciones scoreadas más recientemente (warmup de caches)
+        min_ts = time.time() - self.ttl_min * 60 if self.ttl_min > 0 else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT address, payload FROM snapshots WHERE id IN (SELECT MAX(id) FROM snapshots "
+                "WHERE cleared=0 AND created_at>=? GROUP BY address) ORDER BY id DESC LIMIT ?",
+                (min_ts, int(limit))).fetchall()
+        return [(a, json.loads(p)) for a, p in rows]
+
+    def clear(self, address: str) -> None:
+        # invalida el snapshot vigente sin perder el historial
+        with self._lock:
+            self._conn.execute("UPDATE snapshots SET cleared=1 WHERE address=? AND cleared=0", (address.strip(),))
+
+    def load_state(self, address: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM wallet_state WHERE address=?", (address.strip(),)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return None
+
+    def save_state(self, address: str, state: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO wallet_state(address, updated_at, state) VALUES (?,?,?) "
+                "ON CONFLICT(address) DO UPDATE SET updated_at=excluded.updated_at, state=excluded.state",
+                (address.strip(), time.time(), _dumps(state)))
+
+    def clear_state(self, address: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM wallet_state WHERE address=?", (address.strip(),))
+
+    def load_verdict(self, kind: str, address: str, max_age_s: float) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM verdicts WHERE kind=? AND address=? AND checked_at>=?",
+                                     (kind, address, time.time() - max_age_s)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_verdict(self, kind: str, address: str, payload: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO verdicts(kind, address, checked_at, payload) VALUES (?,?,?,?) "
+                "ON CONFLICT(kind, address) DO UPDATE SET checked_at=excluded.checked_at, payload=excluded.payload",
+                (kind, address, time.time(), _dumps(payload)))
+
+    def sweep(self) -> int:
+        if self.history_days <= 0:
+            return 0
+        cutoff = time.time() - self.history_days * 86400
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM snapshots WHERE created_at<?", (cutoff,))
+            removed = cur.rowcount or 0
+            cur = self._conn.execute("DELETE FROM wallet_state WHERE updated_at<?", (cutoff,))
+            removed += cur.rowcount or 0
+            # los veredictos compartidos viven VERDICT_TTL_SECONDS; un día de margen alcanza
+            cur = self._conn.execute("DELETE FROM verdicts WHERE checked_at<?", (time.time() - 86400,))
+        return removed + (cur.rowcount or 0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
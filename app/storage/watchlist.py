@@ -0,0 +1,108 @@
+import os, sqlite3, threading, time
+from pathlib import Path
+from typing import List, Optional
+
+WATCHLIST_DB = Path(os.getenv("WATCHLIST_DB", str(Path(os.getenv("SNAPSHOT_DIR", "/tmp/tron_risk_snapshots")) / "watchlist.sqlite3")))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    address TEXT PRIMARY KEY,
+    added_at REAL NOT NULL,
+    interval_s REAL NOT NULL,
+    webhook TEXT,
+    last_score INTEGER,
+    last_level TEXT,
+    last_scored_at REAL,
+    next_due REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_watchlist_due ON watchlist(next_due);
+CREATE TABLE IF NOT EXISTS recent_requests (
+    address TEXT PRIMARY KEY,
+    requested_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS ix_recent_ts ON recent_requests(requested_at);
+"""
+
+_COLS = ("address", "added_at", "interval_s", "webhook", "last_score", "last_level", "last_scored_at", "next_due")
+
+
+class WatchlistStore:
+    """Watchlists y requests recientes en SQLite; compartido entre el proceso
+    web y un monitor standalone (`python -m app.monitor run`)."""
+
+    def __init__(self, path: Path = WATCHLIST_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, address: str, interval_s: float, webhook: Optional[str] = None) -> dict:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watchlist(address, added_at, interval_s, webhook, next_due) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(address) DO UPDATE SET interval_s=excluded.interval_s, webhook=excluded.webhook",
+                (address, now, float(interval_s), webhook, now))
+        return self.get(address)
+
+    def remove(self, address: str) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM watchlist WHERE address=?", (address,)).rowcount > 0
+
+    def get(self, address: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLS)} FROM watchlist WHERE address=?", (address,)).fetchone()
+        return dict(zip(_COLS, row)) if row else None
+
+    def list(self, limit: int = 1000) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(_COLS)} FROM watchlist ORDER BY added_at LIMIT ?",
+                                      (int(limit),)).fetchall()
+        return [dict(zip(_COLS, r)) for r in rows]
+
+    def due(self, now: Optional[float] = None, limit: int = 500) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT address FROM watchlist WHERE next_due<=? ORDER BY next_due LIMIT ?",
+                (now or time.time(), int(limit))).fetchall()]
+
+    def record(self, address: str, score: Optional[int], level: Optional[str], scored_at: float) -> None:
+        # reprograma según el intervalo de la entrada (si sigue en la watchlist)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE watchlist SET last_score=?, last_level=?, last_scored_at=?, next_due=?+interval_s WHERE address=?",
+                (score, level, scored_at, scored_at, address))
+
+    def postpone(self, address: str, until: float) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE watchlist SET next_due=? WHERE address=?", (until, address))
+
+    def touch(self, address: str, ts: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO recent_requests(address, requested_at) VALUES (?,?) "
+                "ON CONFLICT(address) DO UPDATE SET requested_at=excluded.requested_at, hits=hits+1",
+                (address, ts or time.time()))
+
+    def recent(self, since: float, limit: int = 500) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT address FROM recent_requests WHERE requested_at>=? ORDER BY requested_at DESC LIMIT ?",
+                (since, int(limit))).fetchall()]
+
+    def is_recent(self, address: str, since: float) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM recent_requests WHERE address=? AND requested_at>=?",
+                                      (address, since)).fetchone() is not None
+
+    def prune_recent(self, before: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM recent_requests WHERE requested_at<?", (before,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,14 +1,28 @@
-import hashlib, base58
+import hashlib, base58, os
+from functools import lru_cache
+from typing import Iterable, List, Optional
+from weakref import WeakValueDictionary
 
+ADDRESS_CACHE_SIZE = int(os.getenv("ADDRESS_CACHE_SIZE", "200000"))
+_HEX = set("0123456789abcdef")
+
+
+def _checksum(body: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(body).digest()).digest()[:4]
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
 def tron_base58_to_hex(addr_b58: str) -> str:
     raw = base58.b58decode(addr_b58)
     body, checksum = raw[:-4], raw[-4:]
-    if hashlib.sha256(hashlib.sha256(body).digest()).digest()[:4] != checksum:
+    if _checksum(body) != checksum:
         raise ValueError("TRON address checksum inválido")
     if body[0] != 0x41:
         raise ValueError("Prefijo TRON inválido (0x41)")
     return body.hex()
 
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
 def tron_hex_to_base58(hex_addr: str) -> str:
     hex_addr = hex_addr.lower()
     if hex_addr.startswith("0x"):
@@ -16,5 +30,105 @@ def tron_hex_to_base58(hex_addr: str) -> str:
     body = bytes.fromhex(hex_addr)
     if not body.startswith(b'\x41'):
         body = b'\x41' + body[-20:]
-    checksum = hashlib.sha256(hashlib.sha256(body).digest()).digest()[:4]
-    return base58.b58encode(body + checksum).decode()
+    return base58.b58encode(body + _checksum(body)).decode()
+
+
+class TronAddress:
+    """Dirección TRON canónica: 21 bytes (0x41 + 20) internados, con base58/hex cacheados.
+
+    Dos formas de la misma cuenta (base58 o hex) producen el mismo objeto.
+    """
+
+    __slots__ = ("raw", "_b58", "__weakref__")
+    _interned: "WeakValueDictionary[bytes, TronAddress]" = WeakValueDictionary()
+
+    def __new__(cls, raw: bytes):
+        obj = cls._interned.get(raw)
+        if obj is None:
+            if len(raw) != 21 or raw[0] != 0x41:
+                raise ValueError("Dirección TRON inválida (se esperan 21 bytes con prefijo 0x41)")
+            obj = super().__new__(cls)
+            obj.raw = raw
+            obj._b58 = None
+            cls._interned[raw] = obj
+        return obj
+
+    @property
+    def base58(self) -> str:
+        if self._b58 is None:
+            self._b58 = base58.b58encode(self.raw + _checksum(self.raw)).decode()
+        return self._b58
+
+    @property
+    def hex(self) -> str:
+        return self.raw.hex()
+
+    def __str__(self) -> str:
+        return self.base58
+
+    def __repr__(self) -> str:
+        return f"TronAddress({self.base58!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TronAddress) and other.raw == self.raw
+
+    def __hash__(self) -> int:
+        return hash(self.raw)
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def _parse_raw(text: str) -> bytes:
+    # validación con checksum cacheada; acepta base58 (T...) o hex (41..., 0x41..., 20 bytes)
+    s = text.lower()
+    if s.startswith("0x"):
+        s = s[2:]
+    if len(s) in (40, 42) and set(s) <= _HEX:
+        body = bytes.fromhex(s)
+        return body if len(body) == 21 else b"\x41" + body
+    return bytes.fromhex(tron_base58_to_hex(text))
+
+
+def parse_address(text: str) -> TronAddress:
+    """TronAddress desde base58 o hex; ValueError si no es válida."""
+    try:
+        return TronAddress(_parse_raw((text or "").strip()))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Dirección TRON inválida: {e}") from None
+
+
+def is_valid_address(text: str) -> bool:
+    try:
+        parse_address(text)
+        return True
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def canonical_address(text: str) -> str:
+    """Forma base58 canónica; si el texto no es una dirección válida se devuelve tal cual (sin espacios)."""
+    s = (text or "").strip()
+    if not s or len(s) == 34:
+        # 34 caracteres: base58 válido ya es canónico y uno inválido se devuelve igual
+        return s
+    try:
+        return parse_address(s).base58
+    except ValueError:
+        return s
+
+
+def try_parse_address(text: str) -> Optional[TronAddress]:
+    try:
+        return parse_address(text)
+    except ValueError:
+        return None
+
+
+def to_hex_many(addresses: Iterable[str]) -> List[Optional[str]]:
+    return [a.hex if a else None for a in map(try_parse_address, addresses)]
+
+
+def to_base58_many(addresses: Iterable[str]) -> List[Optional[str]]:
+    return [a.base58 if a else None for a in map(try_parse_address, addresses)]
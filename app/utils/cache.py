@@ -0,0 +1,105 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncTTLCache:
+    """Cache en memoria con TTL + LRU para resultados de llamadas async.
+
+    - Los errores se cachean con un TTL corto (`error_ttl`, 0 = no cachear).
+    - Las búsquedas concurrentes de la misma clave comparten una sola llamada
+      en vuelo; cancelar a un llamador no cancela la llamada compartida.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, error_ttl: float = 0.0, name: str = ""):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.error_ttl = float(error_ttl)
+        # clave -> (expira_en, ok, valor_o_excepción)
+        self._data: "OrderedDict[Hashable, Tuple[float, bool, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors_cached = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Hashable):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _store(self, key: Hashable, ok: bool, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, ok, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _on_done(self, key: Hashable, fut: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        if exc is None:
+            self._store(key, True, fut.result(), self.ttl)
+        elif isinstance(exc, Exception):
+            self.errors_cached += 1 if self.error_ttl > 0 else 0
+            self._store(key, False, exc, self.error_ttl)
+
+    def peek(self, key: Hashable) -> Any:
+        entry = self._lookup(key)
+        return entry[2] if entry and entry[1] else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        # ttl explícito: p.ej. la vida que le queda a un snapshot cargado de disco
+        self._store(key, True, value, self.ttl if ttl is None else min(ttl, self.ttl))
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            if entry[1]:
+                return entry[2]
+            raise entry[2]
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.misses += 1
+            fut = asyncio.ensure_future(loader())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f, k=key: self._on_done(k, f))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(fut)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors_cached": self.errors_cached,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
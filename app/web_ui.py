@@ -1,10 +1,16 @@
+from functools import lru_cache
+
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
-from starlette.templating import Jinja2Templates
 
-templates = Jinja2Templates(directory="app/templates")
 router = APIRouter()
 
+@lru_cache(maxsize=1)
+def templates():
+    # Jinja2 se importa con la primera visita a la UI, no al arrancar la API
+    from starlette.templating import Jinja2Templates
+    return Jinja2Templates(directory="app/templates")
+
 @router.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
\ No newline at end of file
+    return templates().TemplateResponse(request, "index.html")
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""Kernel vectorizado vs. reglas escalares: paridad exacta y tiempos.
+
+Compara score, nivel y exposure fila por fila (con los pesos actuales y con
+pesos alternativos fraccionarios) y mide ambos caminos.
+
+Uso: python -m bench.bench_kernel [N_WALLETS ...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.risk_engine.kernel import LEVELS, exposure_rows, score_batch
+from app.risk_engine.rules import exposure_breakdown, risk_level, rule_points
+from app.risk_engine.weights import W
+
+
+class AltW(W):
+    # backtest: pesos fraccionarios para ejercitar los truncamientos de int()
+    FRAUD_FLAG = 17.5
+    COUNTERPARTY_HIT = 7.25
+    COUNTERPARTY_CAP = 40
+    DUST_BASE = 4.5
+    DUST_PER_EVENT = 0.75
+    DUST_CAP = 20
+    LEVEL_HIGH = 60
+    LEVEL_MEDIUM = 25
+
+
+def synthetic_features(n: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    risky_in = rng.poisson(0.4, n) * (rng.random(n) < 0.3)
+    risky_out = rng.poisson(0.4, n) * (rng.random(n) < 0.3)
+    f = {
+        "blacklisted": rng.random(n) < 0.01,
+        "fraud": rng.random(n) < 0.03,
+        "bl_evidence": rng.random(n) < 0.02,
+        "risky_in": risky_in,
+        "risky_out": risky_out,
+        # contrapartes en ambas direcciones cuentan una vez en hits
+        "risky_hits": np.maximum(risky_in + risky_out - rng.binomial(np.minimum(risky_in, risky_out), 0.5), 0),
+        "dust_in": rng.geometric(0.2, n) * (rng.random(n) < 0.4),
+        "dust_out": rng.geometric(0.5, n) * (rng.random(n) < 0.1),
+        "multihop": rng.poisson(0.5, n) * (rng.random(n) < 0.2),
+    }
+    # casos borde de redondeo (round() de Python vs np.round en .x5): 3/2000, 1/80, 7/400
+    for i, (a, b) in enumerate(((3, 1997), (1, 79), (7, 393), (0, 0))):
+        if i < n:
+            f["dust_in"][i], f["dust_out"][i] = a, b
+            f["risky_in"][i] = f["risky_out"][i] = f["multihop"][i] = f["risky_hits"][i] = 0
+    return f
+
+
+def scalar(f: dict, w=W):
+    out = []
+    for i in range(len(f["risky_hits"])):
+        score, _ = rule_points(bool(f["blacklisted"][i]), bool(f["fraud"][i]), bool(f["bl_evidence"][i]),
+                               int(f["risky_hits"][i]), int(f["dust_in"][i] + f["dust_out"][i]), w)
+        expo = exposure_breakdown(int(f["risky_in"][i]), int(f["risky_out"][i]), int(f["dust_in"][i]),
+                                  int(f["dust_out"][i]), multihop_cnt=int(f["multihop"][i]))
+        out.append((score, risk_level(score, w), expo))
+    return out
+
+
+def vectorized(f: dict, w=W):
+    r = score_batch(f, w)
+    return r, exposure_rows(r["exposure"], f)
+
+
+def check(f: dict, w=W) -> None:
+    r, expo = vectorized(f, w)
+    scores, lv = r["risk_score"].tolist(), r["risk_level"].tolist()
+    for i, (score, level, ex) in enumerate(scalar(f, w)):
+        got = (scores[i], LEVELS[lv[i]], expo[i])
+        assert got == (score, level, ex), f"fila {i}: kernel={got} escalar={(score, level, ex)}"
+
+
+def _best(fn, *args, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(sizes):
+    print(f"{'wallets':>10} {'escalar (ms)':>14} {'kernel (ms)':>13} {'speedup':>8}")
+    for n in sizes:
+        f = synthetic_features(n)
+        for w in (W, AltW):
+            check(f, w)
+        t_old = _best(scalar, f, repeat=1)
+        t_new = _best(lambda: score_batch(f))
+        print(f"{n:>10} {t_old * 1000:>14.1f} {t_new * 1000:>13.1f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
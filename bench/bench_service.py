@@ -0,0 +1,236 @@
+"""Benchmark del servicio completo contra el stand-in local de upstream.
+
+Mide score_wallet, /risk, /report y batch por forma de wallet (tiny ->
+exchange): throughput, latencias p50/p95/p99 y llamadas upstream por score.
+
+Uso:
+  python -m bench.bench_service
+  python -m bench.bench_service --scenarios score,risk --shapes tiny,medium --concurrency 16 --json out.json
+  python -m bench.bench_service --upstream http://127.0.0.1:9100   # stand-in ya levantado (python -m bench.upstream)
+
+Por defecto se desactivan los rate limiters locales, el scoring incremental y
+el espejo de blacklist, y las caches se vacían entre escenarios, para que
+cada corrida mida scoring en frío y sea comparable con la anterior.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import math
+import os
+import socket
+import sys
+import subprocess
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from bench.upstream import SHAPES, Profile, wallet
+
+SCENARIOS = ("score", "risk", "report", "batch")
+DEFAULT_REQUESTS = {"tiny": 50, "small": 30, "medium": 10, "large": 4, "exchange": 2}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_upstream(profile: Profile) -> str:
+    """Levanta el stand-in en un proceso aparte (no compite por el GIL con el servicio) y devuelve la URL."""
+    port = _free_port()
+    cmd = [sys.executable, "-m", "bench.upstream", "--port", str(port),
+           "--tronscan-ms", str(profile.tronscan_ms), "--trongrid-ms", str(profile.trongrid_ms),
+           "--sigma", str(profile.sigma), "--error-rate", str(profile.error_rate),
+           "--rate-429", str(profile.rate_429), "--retry-after", str(profile.retry_after)]
+    if profile.seed is not None:
+        cmd += ["--seed", str(profile.seed)]
+    proc = subprocess.Popen(cmd)
+    atexit.register(proc.terminate)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 15
+    while True:
+        try:
+            httpx.get(f"{url}/__stats", timeout=1)
+            return url
+        except httpx.HTTPError:
+            if proc.poll() is not None or time.time() > deadline:
+                raise RuntimeError("el stand-in de upstream no arrancó")
+            time.sleep(0.1)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def drive(fn: Callable[[str], Awaitable[Optional[float]]], addresses: List[str], concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    queue = iter(addresses)
+
+    async def worker():
+        for a in queue:
+            t0 = time.perf_counter()
+            try:
+                own = await fn(a)
+                latencies.append(own if own is not None else time.perf_counter() - t0)
+            except Exception as e:
+                k = type(e).__name__
+                errors[k] = errors.get(k, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "n": len(addresses), "ok": len(latencies), "errors": errors, "wall_s": round(wall, 3),
+        "throughput": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def _upstream_calls(url: str) -> Dict[str, int]:
+    return httpx.get(f"{url}/__stats", timeout=10).json()["calls"]
+
+
+def _reset_caches() -> None:
+    from app.risk_engine.verdicts import security_cache, blacklist_cache
+    from app.risk_engine.graph import _expansions
+    from app.pdf_report.render import pdf_cache
+    for c in (security_cache, blacklist_cache, _expansions, pdf_cache):
+        c.clear()
+
+
+async def run(args, upstream_url: str) -> List[dict]:
+    # imports tardíos: app lee la configuración (bases upstream, límites) del entorno al importarse
+    from app.main import app
+    from app.risk_engine.core import score_wallet
+    from app.pdf_report.render import shutdown_pool
+    from app.sources.http import close_clients
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=600)
+
+    async def do_score(a):
+        await score_wallet(a)
+
+    async def do_get(path):
+        r = await client.get(path)
+        r.raise_for_status()
+
+    async def do_batch(addresses: List[str]) -> dict:
+        # un job con todas las direcciones; la latencia por ítem es la del score dentro del job
+        lat: List[float] = []
+        t0 = time.perf_counter()
+        body = "\n".join(addresses)
+        async with client.stream("POST", "/risk/batch", content=body, headers={"content-type": "text/plain"}) as r:
+            async for line in r.aiter_lines():
+                row = json.loads(line) if line else {}
+                if row.get("status") == "done" and "result" in row:
+                    lat.append(row["result"]["timings_ms"]["total"] / 1000)
+        wall = time.perf_counter() - t0
+        lat.sort()
+        return {"n": len(addresses), "ok": len(lat), "errors": {"item": len(addresses) - len(lat)} if len(lat) < len(addresses) else {},
+                "wall_s": round(wall, 3), "throughput": round(len(lat) / wall, 2) if wall else 0.0,
+                "p50_ms": round(percentile(lat, 50) * 1000, 1), "p95_ms": round(percentile(lat, 95) * 1000, 1),
+                "p99_ms": round(percentile(lat, 99) * 1000, 1)}
+
+    fns = {
+        "score": do_score,
+        "risk": lambda a: do_get(f"/risk/{a}"),
+        "report": lambda a: do_get(f"/report/{a}"),
+    }
+    rows = []
+    try:
+        for si, scenario in enumerate(args.scenarios):
+            if scenario != "batch":
+                # calentamiento fuera de la medición (pool de PDF, imports, conexiones)
+                await fns[scenario](wallet("tiny", 10_000_000 + si))
+            for shape in args.shapes:
+                n = args.requests or DEFAULT_REQUESTS.get(shape, 10)
+                addresses = [wallet(shape, si * 100_000 + i) for i in range(n)]
+                if not args.warm:
+                    _reset_caches()
+                before = _upstream_calls(upstream_url)
+                if scenario == "batch":
+                    stats = await do_batch(addresses)
+                else:
+                    stats = await drive(fns[scenario], addresses, args.concurrency)
+                after = _upstream_calls(upstream_url)
+                calls = {k: after.get(k, 0) - before.get(k, 0) for k in after if after.get(k, 0) != before.get(k, 0)}
+                total = sum(calls.values())
+                row = {"scenario": scenario, "shape": shape, "events": SHAPES[shape], "concurrency": args.concurrency,
+                       **stats, "upstream_calls": calls,
+                       "upstream_per_score": round(total / stats["ok"], 1) if stats["ok"] else None}
+                rows.append(row)
+                _print_row(row)
+    finally:
+        await client.aclose()
+        shutdown_pool()
+        await close_clients()
+    return rows
+
+
+_HEADER = f"{'escenario':<8} {'forma':<9} {'n':>4} {'ok':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'upstream/score':>15}"
+
+
+def _print_row(r: dict) -> None:
+    per = "-" if r["upstream_per_score"] is None else f"{r['upstream_per_score']:.1f}"
+    print(f"{r['scenario']:<8} {r['shape']:<9} {r['n']:>4} {r['ok']:>4} {r['throughput']:>8.2f} "
+          f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {per:>15}"
+          + (f"  errores={r['errors']}" if r["errors"] else ""), flush=True)
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.bench_service", description=__doc__.splitlines()[0])
+    p.add_argument("--scenarios", default=",".join(SCENARIOS))
+    p.add_argument("--shapes", default="tiny,small,medium,large")
+    p.add_argument("--requests", type=int, default=0, help="requests por forma (0 = valor por forma)")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--warm", action="store_true", help="no vaciar caches entre escenarios")
+    p.add_argument("--upstream", help="URL de un stand-in ya levantado (por defecto se levanta uno en proceso)")
+    p.add_argument("--tronscan-ms", type=float, default=60.0)
+    p.add_argument("--trongrid-ms", type=float, default=40.0)
+    p.add_argument("--sigma", type=float, default=0.5)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-429", type=float, default=0.0)
+    p.add_argument("--retry-after", type=float, default=0.5)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", help="escribe los resultados en este archivo (para comparar corridas)")
+    args = p.parse_args(argv)
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    args.shapes = [s for s in args.shapes.split(",") if s]
+    bad = [s for s in args.scenarios if s not in SCENARIOS] + [s for s in args.shapes if s not in SHAPES]
+    if bad:
+        p.error(f"desconocido: {', '.join(bad)}")
+
+    url = args.upstream or start_upstream(Profile(args.tronscan_ms, args.trongrid_ms, args.sigma,
+                                                  args.error_rate, args.rate_429, args.retry_after, args.seed))
+    os.environ["TRONSCAN_BASE"] = url
+    os.environ["TRONGRID_BASE"] = url
+    work = tempfile.mkdtemp(prefix="tron_risk_bench_")
+    for k, v in {"TRONSCAN_RPS": "0", "TRONGRID_RPS": "0", "INCREMENTAL_SCORING": "0", "BLACKLIST_MIRROR": "0",
+                 "SNAPSHOT_DIR": work, "SNAPSHOT_DB": os.path.join(work, "snapshots.sqlite3"),
+                 "BATCH_DB": os.path.join(work, "jobs.sqlite3"), "BATCH_CONCURRENCY": str(args.concurrency)}.items():
+        os.environ.setdefault(k, v)
+
+    print(f"upstream={url} concurrencia={args.concurrency} tronscan~{args.tronscan_ms}ms trongrid~{args.trongrid_ms}ms "
+          f"429={args.rate_429} 5xx={args.error_rate}", file=sys.stderr)
+    print(_HEADER)
+    rows = asyncio.run(run(args, url))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items()}, "results": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Presupuesto de arranque en frío: import de app.main y tiempo hasta listo.
+
+Mide en procesos nuevos (como una instancia recién escalada):
+  - import de app.main con bytecode precompilado (mediana de N corridas),
+    verificando que ReportLab y Jinja2 no se carguen al arrancar; sin .pyc
+    como referencia;
+  - `python -m app.serve` con 1 y 2 workers: ms hasta el primer 200 de /health
+    y hasta que todos los workers respondieron /stats (con un solo líder).
+Sale con código 1 si algo supera el presupuesto.
+
+Uso: python -m bench.bench_startup [--runs N] [--workers 1 2]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "900"))
+READY_BUDGET_MS = float(os.getenv("STARTUP_READY_BUDGET_MS", "2500"))
+LAZY = ("reportlab", "jinja2", "pyarrow", "numpy")
+
+_IMPORT = ("import sys, time; t = time.perf_counter(); import app.main; "
+           "print((time.perf_counter() - t) * 1000, *[m for m in %r if m in sys.modules])" % (LAZY,))
+
+
+def _env(tmp: str, **extra) -> dict:
+    # sin red ni tareas de fondo: se mide el arranque propio, no el upstream
+    env = {**os.environ, "SNAPSHOT_DIR": tmp, "BLACKLIST_MIRROR": "0", "MONITOR_ENABLED": "0",
+           "COLUMNAR_EXPORT": "0", "SERVE_LOG_LEVEL": "warning"}
+    env.update(extra)
+    return env
+
+
+def measure_import(runs: int, tmp: str, pyc: bool) -> tuple:
+    times, loaded = [], set()
+    for i in range(runs):
+        extra = {} if pyc else {"PYTHONDONTWRITEBYTECODE": "1", "PYTHONPYCACHEPREFIX": os.path.join(tmp, f"pyc{i}")}
+        out = subprocess.run([sys.executable, "-c", _IMPORT], env=_env(tmp, **extra), capture_output=True,
+                             text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        loaded.update(out[1:])
+    return statistics.median(times), sorted(loaded)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port: int, path: str):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", path)
+        r = conn.getresponse()
+        return r.status, r.read()
+    finally:
+        conn.close()
+
+
+def measure_ready(workers: int, tmp: str, timeout: float = 30.0) -> dict:
+    port = _free_port()
+    env = _env(tmp, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY=str(workers))
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "app.serve"], env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    first = None
+    seen: dict = {}
+    try:
+        while time.perf_counter() - t0 < timeout and len(seen) < workers:
+            try:
+                if first is None and _get(port, "/health")[0] == 200:
+                    first = time.perf_counter() - t0
+                if first is not None:
+                    # una conexión nueva por request: puede caer en cualquier worker
+                    w = json.loads(_get(port, "/stats")[1])["worker"]
+                    seen[w["pid"]] = w
+            except OSError:
+                time.sleep(0.01)
+        all_ready = time.perf_counter() - t0 if len(seen) == workers else None
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {"workers": workers, "first_ms": first and first * 1000, "all_ms": all_ready and all_ready * 1000,
+            "leaders": sum(1 for w in seen.values() if w["leader"]),
+            "warmup_ms": max((w["warmup_ms"] or 0) for w in seen.values()) if seen else None}
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    args = p.parse_args(argv)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for pyc in (True, False):
+            ms, loaded = measure_import(args.runs, tmp, pyc)
+            # sin .pyc es solo referencia: el build precompila (render.yaml)
+            over = pyc and ms > IMPORT_BUDGET_MS or loaded
+            ok &= not over
+            label = "import app.main" + ("" if pyc else " (sin .pyc)")
+            print(f"{label:<28} {ms:>8.0f} ms  presupuesto {IMPORT_BUDGET_MS:.0f} ms"
+                  f"{'  cargó: ' + ', '.join(loaded) if loaded else ''}{'  EXCEDIDO' if over else ''}")
+        for n in args.workers:
+            r = measure_ready(n, tmp)
+            over = r["all_ms"] is None or r["all_ms"] > READY_BUDGET_MS or r["leaders"] != 1
+            ok &= not over
+            first = f"{r['first_ms']:.0f}" if r["first_ms"] else "-"
+            every = f"{r['all_ms']:.0f}" if r["all_ms"] else "-"
+            print(f"app.serve workers={n:<10} primer 200 {first:>6} ms, todos listos {every:>6} ms  "
+                  f"presupuesto {READY_BUDGET_MS:.0f} ms  warmup {r['warmup_ms']} ms  líderes {r['leaders']}"
+                  f"{'  EXCEDIDO' if over else ''}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Micro-benchmark: analizador fusionado vs. los tres recorridos originales de core.
+
+Los tres recorridos (contrapartes, flujos y DUST en Decimal) se conservan acá
+como oráculo de paridad del analizador fusionado.
+
+Uso: python -m bench.bench_transfers [N_EVENTOS ...]
+"""
+import hashlib
+import random
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from typing import List, Set, Tuple
+
+from app.risk_engine.transfers import (TransferAnalyzer, USDT_CONTRACT, USDT_CONTRACT_UP, USDT_MAX_EVENT,
+                                       DUST_MICRO_USDT, DUST_SMALL_USDT)
+from app.utils import address
+
+
+def _addr(seed: str) -> str:
+    # direcciones reales (checksum válido): el costo de canonicalizar es parte de lo medido
+    return address.TronAddress(b"\x41" + hashlib.sha256(seed.encode()).digest()[:20]).base58
+
+
+SELF = _addr("self")
+OTHER_TOKEN = _addr("other-token")
+
+
+# ------------------- referencia: los tres recorridos originales -------------------
+def _extract_counterparties_trc20(items: List[dict], self_addr: str) -> Tuple[Set[str], Set[str]]:
+    ins, outs = set(), set()
+    for it in items:
+        frm = (it.get("from") or it.get("transfer_from") or "").strip()
+        to = (it.get("to") or it.get("transfer_to") or "").strip()
+        if frm and frm != self_addr: ins.add(frm)  # desde otros hacia mí
+        if to and to != self_addr: outs.add(to)  # desde mí hacia otros
+    return ins, outs
+
+
+def _is_usdt_trc20(it: dict) -> bool:
+    addr = (it.get("token_info", {}) or {}).get("address") or it.get("contract_address")
+    return (addr or "").upper() == USDT_CONTRACT_UP
+
+
+def _normalize_amount_usdt(it) -> Decimal:
+    try:
+        val = Decimal(str(it.get("value", "0")))
+        dec = int((it.get("token_info", {}) or {}).get("decimals") or it.get("decimals") or 6)
+        amt = val / (Decimal(10) ** dec)
+        # descarta outliers imposibles
+        if amt <= 0 or amt > USDT_MAX_EVENT:
+            raise InvalidOperation("USDT outlier")
+        return amt
+    except Exception:
+        return Decimal("0")
+
+
+def _aggregate_flows_trc20(items: List[dict], self_addr: str):
+    inflow = Decimal("0"); outflow = Decimal("0")
+    first_ts = None; last_ts = None
+    for it in items:
+        ts = it.get("block_timestamp") or it.get("timestamp")
+        if ts is not None:
+            first_ts = ts if not first_ts or ts < first_ts else first_ts
+            last_ts  = ts if not last_ts  or ts > last_ts  else last_ts
+
+        # *** SOLO USDT contrato oficial ***
+        if not _is_usdt_trc20(it):
+            continue
+
+        amt = _normalize_amount_usdt(it)
+        if amt == 0:
+            continue
+
+        frm = (it.get("from") or it.get("transfer_from") or "").strip()
+        to  = (it.get("to")   or it.get("transfer_to")   or "").strip()
+        if to == self_addr: inflow += amt
+        if frm == self_addr: outflow += amt
+    return inflow, outflow, first_ts, last_ts
+
+
+def _dust_counters_trc20_usdt(items: List[dict], self_addr: str):
+    micro_in = micro_out = small_in = small_out = 0
+    uniq_src, uniq_dst = set(), set()
+    for it in items:
+        if not _is_usdt_trc20(it):
+            continue
+
+        amt = _normalize_amount_usdt(it)
+        if amt == 0:
+            continue
+
+        frm = (it.get("from") or it.get("transfer_from") or "").strip()
+        to  = (it.get("to")   or it.get("transfer_to")   or "").strip()
+
+        if amt <= DUST_MICRO_USDT:
+            if to == self_addr: micro_in += 1; uniq_src.add(frm)
+            if frm == self_addr: micro_out += 1; uniq_dst.add(to)
+        elif amt <= DUST_SMALL_USDT:
+            if to == self_addr: small_in += 1; uniq_src.add(frm)
+            if frm == self_addr: small_out += 1; uniq_dst.add(to)
+    return {
+        "micro_in": micro_in, "micro_out": micro_out,
+        "small_in": small_in, "small_out": small_out,
+        "unique_sources": len(uniq_src), "unique_dests": len(uniq_dst),
+    }
+
+
+def synthetic_transfers(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    peers = [_addr(f"peer:{i}") for i in range(max(1, n // 8))]
+    values = ["50000", "900000", "1000000", "25000000", "123456789", "0", "-5", "1e6", "abc"]
+    items = []
+    for i in range(n):
+        peer = rnd.choice(peers)
+        frm, to = (peer, SELF) if rnd.random() < 0.5 else (SELF, peer)
+        token = USDT_CONTRACT if rnd.random() < 0.9 else OTHER_TOKEN
+        value = rnd.choice(values) if rnd.random() < 0.3 else str(rnd.randrange(1, 10 ** 11))
+        items.append({
+            "transaction_id": f"{i:064x}",
+            "block_timestamp": 1_600_000_000_000 + rnd.randrange(10 ** 10),
+            "from": frm, "to": to, "value": value, "type": "Transfer",
+            "token_info": {"address": token, "decimals": 6, "symbol": "USDT", "name": "Tether USD"},
+        })
+    return items
+
+
+def three_pass(items):
+    ins, outs = _extract_counterparties_trc20(items, SELF)
+    dust = _dust_counters_trc20_usdt(items, SELF)
+    flows = _aggregate_flows_trc20(items, SELF)
+    return ins, outs, dust, flows
+
+
+def fused(items):
+    a = TransferAnalyzer(SELF, cap=0)
+    a.feed(items)
+    ins, outs = a.counterparties()
+    return ins, outs, a.dust(), a.flows()
+
+
+def _best(fn, items, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _cold(fn, items) -> float:
+    # caches de direcciones vacías, como el primer score de un worker recién arrancado
+    address._parse_raw.cache_clear()
+    address.tron_base58_to_hex.cache_clear()
+    t0 = time.perf_counter()
+    fn(items)
+    return time.perf_counter() - t0
+
+
+def main(sizes):
+    print(f"{'eventos':>10} {'3 pasadas (ms)':>16} {'fusionado frío':>16} {'fusionado (ms)':>16} {'speedup':>8}")
+    for n in sizes:
+        items = synthetic_transfers(n)
+        t_cold = _cold(fused, items)
+        assert three_pass(items) == fused(items), "el analizador fusionado difiere de core"
+        t_old = _best(three_pass, items)
+        t_new = _best(fused, items)
+        print(f"{n:>10} {t_old * 1000:>16.1f} {t_cold * 1000:>16.1f} {t_new * 1000:>16.1f} {t_old / t_new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
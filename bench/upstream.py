@@ -0,0 +1,287 @@
+"""Stand-in local de TRONSCAN y TronGrid para benchmarks y pruebas de carga.
+
+Sirve todos los endpoints que usa app/sources con datos sintéticos
+deterministas (o fixtures grabados), latencia log-normal configurable e
+inyección de errores 5xx / 429 con Retry-After.
+
+Uso:
+  python -m bench.upstream --port 9100 --tronscan-ms 120 --trongrid-ms 80 --rate-429 0.02
+  TRONSCAN_BASE=http://127.0.0.1:9100 TRONGRID_BASE=http://127.0.0.1:9100 uvicorn app.main:app
+
+Las direcciones de `wallet(shape, i)` codifican su forma (cantidad de
+transferencias) en el segundo byte, así el servidor no necesita estado
+compartido con quien genera la carga.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.utils.address import TronAddress, parse_address
+
+USDT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+OTHER_TOKEN = "TXLAQ63Xg1NAzckPwKHvzw7CSEmLMEqcdj"
+
+# forma -> transferencias TRC20 en el historial
+SHAPES: Dict[str, int] = {"tiny": 10, "small": 150, "medium": 2000, "large": 20000, "exchange": 100000}
+_SHAPE_TAG = {name: 0xB0 + i for i, name in enumerate(SHAPES)}
+_TAG_SHAPE = {v: k for k, v in _SHAPE_TAG.items()}
+_PEER_TAG = 0xA0
+PEER_POOL = 50000
+PEER_EVENTS = (5, 40)  # historial de contrapartes (expansiones del grafo)
+T0 = 1_760_000_000_000  # ms, transferencia más reciente
+
+
+def _addr(tag: int, seed: str) -> str:
+    return TronAddress(b"\x41" + bytes([tag]) + hashlib.sha256(seed.encode()).digest()[:19]).base58
+
+
+def wallet(shape: str, i: int) -> str:
+    return _addr(_SHAPE_TAG[shape], f"{shape}:{i}")
+
+
+@lru_cache(maxsize=PEER_POOL)
+def peer(k: int) -> str:
+    return _addr(_PEER_TAG, f"peer:{k}")
+
+
+def _digest(address: str) -> bytes:
+    return hashlib.sha256(address.encode()).digest()
+
+
+def flags(address: str) -> Tuple[bool, bool]:
+    # ~1.2% en blacklist, ~1.2% con fraude
+    h = _digest(address)
+    return h[0] < 3, h[1] < 3
+
+
+def history_len(address: str) -> int:
+    try:
+        raw = parse_address(address).raw
+    except ValueError:
+        return 0
+    shape = _TAG_SHAPE.get(raw[1])
+    if shape:
+        return SHAPES[shape]
+    lo, hi = PEER_EVENTS
+    return lo + _digest(address)[2] % (hi - lo + 1)
+
+
+def _gap_ms(address: str) -> int:
+    # separación entre eventos: historiales grandes son más densos
+    n = max(1, history_len(address))
+    return max(1000, (365 * 86400 * 1000) // n)
+
+
+def event(address: str, i: int) -> dict:
+    """Evento i (0 = más reciente) del historial sintético de `address`."""
+    rnd = random.Random(f"{address}:{i}")
+    # contrapartes con sesgo a hubs: pocas direcciones concentran muchas transferencias
+    other = peer(int(PEER_POOL * rnd.random() ** 3))
+    frm, to = (other, address) if rnd.random() < 0.5 else (address, other)
+    r = rnd.random()
+    if r < 0.08:
+        value = rnd.randrange(1, 100_000)  # dust micro
+    elif r < 0.15:
+        value = rnd.randrange(100_000, 1_000_000)
+    else:
+        value = int(10 ** rnd.uniform(6, 11))
+    token = USDT if rnd.random() < 0.92 else OTHER_TOKEN
+    return {
+        "transaction_id": hashlib.sha256(f"{address}:{i}".encode()).hexdigest(),
+        "block_timestamp": T0 - i * _gap_ms(address),
+        "from": frm, "to": to, "value": str(value), "type": "Transfer",
+        "token_info": {"address": token, "decimals": 6, "symbol": "USDT", "name": "Tether USD"},
+    }
+
+
+@lru_cache(maxsize=1)
+def blacklist() -> List[str]:
+    return [a for a in map(peer, range(PEER_POOL)) if flags(a)[0]]
+
+
+# ------------------- latencia y fallas -------------------
+@dataclass
+class Profile:
+    tronscan_ms: float = 120.0  # mediana
+    trongrid_ms: float = 80.0
+    sigma: float = 0.5  # dispersión log-normal (cola)
+    error_rate: float = 0.0  # 5xx
+    rate_429: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+
+class Upstream:
+    def __init__(self, profile: Profile, fixtures: Optional[Path] = None, record: bool = False,
+                 real_tronscan: str = "https://apilist.tronscanapi.com", real_trongrid: str = "https://api.trongrid.io"):
+        self.profile = profile
+        self.fixtures = fixtures
+        self.record = record
+        self.real = {"api": real_tronscan, "v1": real_trongrid}
+        self.counts: Dict[str, int] = {}
+        self.rnd = random.Random(profile.seed)
+
+    def reset(self) -> None:
+        self.counts.clear()
+
+    def _latency(self, median_ms: float) -> float:
+        if median_ms <= 0:
+            return 0.0
+        return median_ms / 1000 * math.exp(self.rnd.gauss(0, self.profile.sigma))
+
+    def _fixture_path(self, request: Request) -> Optional[Path]:
+        if self.fixtures is None:
+            return None
+        q = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        key = hashlib.sha1(f"{request.url.path}?{q}".encode()).hexdigest()
+        return self.fixtures / f"{key}.json"
+
+    async def _recorded(self, request: Request) -> Optional[dict]:
+        path = self._fixture_path(request)
+        if path is None:
+            return None
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))
+        if not self.record:
+            return None
+        import httpx
+        base = self.real["api" if request.url.path.startswith("/api/") else "v1"]
+        async with httpx.AsyncClient(base_url=base, timeout=30) as c:
+            r = await c.get(request.url.path, params=request.query_params.multi_items(),
+                            headers={k: v for k, v in request.headers.items() if k.lower() == "tron-pro-api-key"})
+            r.raise_for_status()
+            body = r.json()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(body), encoding="utf-8")
+        return body
+
+    async def serve(self, endpoint: str, request: Request, build) -> JSONResponse:
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        p = self.profile
+        await asyncio.sleep(self._latency(p.tronscan_ms if endpoint.startswith("tronscan") else p.trongrid_ms))
+        r = self.rnd.random()
+        if r < p.rate_429:
+            return JSONResponse({"Error": "rate limited"}, status_code=429,
+                                headers={"Retry-After": f"{p.retry_after:g}"})
+        if r < p.rate_429 + p.error_rate:
+            return JSONResponse({"Error": "upstream error"}, status_code=503)
+        body = await self._recorded(request)
+        return JSONResponse(body if body is not None else build())
+
+
+def create_app(upstream: Upstream) -> FastAPI:
+    app = FastAPI(title="TRON upstream stand-in")
+    app.state.upstream = upstream
+
+    @app.get("/api/security/account/data")
+    async def security(request: Request, address: str = ""):
+        def build():
+            bl, fraud = flags(address)
+            return {"is_black_list": bl, "has_fraud_transaction": fraud, "fraud_token_creator": False,
+                    "send_ad_by_memo": False}
+        return await upstream.serve("tronscan_security", request, build)
+
+    @app.get("/api/stableCoin/blackList")
+    async def stable_blacklist(request: Request, blackAddress: str = "", start: int = 0, limit: int = 50):
+        def build():
+            if blackAddress:
+                hit = flags(blackAddress)[0]
+                return {"total": int(hit), "data": [{"blackAddress": blackAddress, "tokenName": "USDT"}] if hit else []}
+            rows = blacklist()
+            return {"total": len(rows),
+                    "data": [{"blackAddress": a, "tokenName": "USDT"} for a in rows[start:start + limit]]}
+        name = "tronscan_blacklist" if blackAddress else "tronscan_blacklist_page"
+        return await upstream.serve(name, request, build)
+
+    @app.get("/api/transfer/trc20")
+    async def tronscan_trc20(request: Request, address: str = "", start: int = 0, limit: int = 200):
+        def build():
+            n = history_len(address)
+            rows = [event(address, i) for i in range(start, min(n, start + limit))]
+            return {"total": n, "data": [{**e, "from_address": e["from"], "to_address": e["to"]} for e in rows]}
+        return await upstream.serve("tronscan_trc20", request, build)
+
+    @app.get("/v1/accounts/{address}")
+    async def account(address: str, request: Request):
+        def build():
+            n = history_len(address)
+            return {"data": [{"address": address, "balance": n * 1_000_000,
+                              "create_time": T0 - 400 * 86400 * 1000,
+                              "latest_opration_time": T0}], "success": True, "meta": {}}
+        return await upstream.serve("trongrid_overview", request, build)
+
+    @app.get("/v1/accounts/{address}/transactions")
+    async def transactions(address: str, request: Request, limit: int = 50):
+        return await upstream.serve("trongrid_transactions", request,
+                                    lambda: {"data": [], "success": True, "meta": {}})
+
+    @app.get("/v1/accounts/{address}/transactions/trc20")
+    async def trc20(address: str, request: Request, limit: int = 200, fingerprint: str = "",
+                    min_timestamp: Optional[int] = None, max_timestamp: Optional[int] = None, order_by: str = ""):
+        def build():
+            n = history_len(address)
+            gap = _gap_ms(address)
+            # índices válidos según la ventana de tiempo (ts(i) = T0 - i*gap)
+            hi = n - 1 if min_timestamp is None else min(n - 1, (T0 - int(min_timestamp)) // gap)
+            lo = 0 if max_timestamp is None else max(0, -(-(T0 - int(max_timestamp)) // gap))
+            asc = order_by.endswith(",asc")
+            pos = int(fingerprint or 0)
+            idx = range(hi - pos, max(lo - 1, hi - pos - limit), -1) if asc else range(lo + pos, min(hi + 1, lo + pos + limit))
+            data = [event(address, i) for i in idx]
+            meta = {"page_size": len(data)}
+            if data and pos + len(data) <= hi - lo:
+                meta["fingerprint"] = str(pos + len(data))
+            return {"data": data, "success": True, "meta": meta}
+        return await upstream.serve("trongrid_trc20", request, build)
+
+    @app.get("/__stats")
+    async def stats():
+        return {"calls": dict(upstream.counts), "total": sum(upstream.counts.values()),
+                "profile": asdict(upstream.profile)}
+
+    @app.post("/__reset")
+    async def reset():
+        upstream.reset()
+        return {"ok": True}
+
+    @app.post("/__profile")
+    async def set_profile(request: Request):
+        for k, v in (await request.json()).items():
+            if hasattr(upstream.profile, k):
+                setattr(upstream.profile, k, v)
+        return asdict(upstream.profile)
+
+    return app
+
+
+def main(argv=None) -> None:
+    import uvicorn
+    p = argparse.ArgumentParser(prog="python -m bench.upstream", description=__doc__.splitlines()[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=9100)
+    p.add_argument("--tronscan-ms", type=float, default=120.0, help="latencia mediana TRONSCAN")
+    p.add_argument("--trongrid-ms", type=float, default=80.0, help="latencia mediana TronGrid")
+    p.add_argument("--sigma", type=float, default=0.5, help="dispersión log-normal de la latencia")
+    p.add_argument("--error-rate", type=float, default=0.0, help="fracción de respuestas 503")
+    p.add_argument("--rate-429", type=float, default=0.0, help="fracción de respuestas 429")
+    p.add_argument("--retry-after", type=float, default=1.0)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--fixtures", type=Path, help="directorio de respuestas grabadas (se sirven si existen)")
+    p.add_argument("--record", action="store_true", help="con --fixtures: graba desde las APIs reales lo que falte")
+    a = p.parse_args(argv)
+    profile = Profile(a.tronscan_ms, a.trongrid_ms, a.sigma, a.error_rate, a.rate_429, a.retry_after, a.seed)
+    uvicorn.run(create_app(Upstream(profile, a.fixtures, a.record)), host=a.host, port=a.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
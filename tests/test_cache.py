@@ -0,0 +1,138 @@
+"""AsyncTTLCache: TTL, LRU, errores cacheados, single-flight y cancelación."""
+import asyncio
+import types
+
+import pytest
+
+from app.utils import cache as cache_mod
+from app.utils.cache import AsyncTTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # reloj manual solo para el módulo de la cache (el event loop sigue con el real)
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _loader(calls: list, value=None, exc=None, wait: float = 0):
+    async def load():
+        calls.append(1)
+        if wait:
+            await asyncio.sleep(wait)
+        if exc is not None:
+            raise exc
+        return value
+    return load
+
+
+def test_ttl_expiry(clock):
+    c = AsyncTTLCache(10, ttl=60)
+    c.set("a", 1)
+    clock[0] += 59
+    assert c.peek("a") == 1
+    clock[0] += 2
+    assert c.peek("a") is None
+    assert len(c) == 0
+
+
+def test_set_with_shorter_ttl(clock):
+    c = AsyncTTLCache(10, ttl=60)
+    c.set("a", 1, ttl=5)
+    c.set("b", 2, ttl=0)  # ya vencido: no se guarda
+    c.set("c", 3, ttl=600)  # nunca más que el TTL de la cache
+    assert c.peek("b") is None
+    clock[0] += 6
+    assert c.peek("a") is None and c.peek("c") == 3
+    clock[0] += 60
+    assert c.peek("c") is None
+
+
+def test_lru_eviction():
+    c = AsyncTTLCache(2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.peek("a") == 1  # "a" pasa a ser la más reciente
+    c.set("c", 3)
+    assert c.peek("b") is None
+    assert (c.peek("a"), c.peek("c")) == (1, 3)
+    assert c.stats()["evictions"] == 1
+
+
+def test_error_ttl(clock):
+    c = AsyncTTLCache(10, ttl=60, error_ttl=5)
+    calls: list = []
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await c.get_or_load("a", _loader(calls, exc=ValueError("boom")))
+        assert len(calls) == 1  # el error quedó cacheado
+        clock[0] += 6
+        assert await c.get_or_load("a", _loader(calls, value=7)) == 7
+        assert len(calls) == 2
+
+    asyncio.run(run())
+    assert c.stats()["errors_cached"] == 1
+
+
+def test_errors_not_cached_without_error_ttl():
+    c = AsyncTTLCache(10, ttl=60)
+    calls: list = []
+
+    async def run():
+        with pytest.raises(ValueError):
+            await c.get_or_load("a", _loader(calls, exc=ValueError("boom")))
+        assert await c.get_or_load("a", _loader(calls, value=7)) == 7
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_single_flight():
+    c = AsyncTTLCache(10, ttl=60)
+    calls: list = []
+
+    async def run():
+        load = _loader(calls, value="v", wait=0.02)
+        return await asyncio.gather(*(c.get_or_load("a", load) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["v"] * 5
+    assert len(calls) == 1
+    s = c.stats()
+    assert (s["misses"], s["coalesced"], s["inflight"]) == (1, 4, 0)
+
+
+def test_cancelled_waiter_keeps_shared_call():
+    c = AsyncTTLCache(10, ttl=60)
+    calls: list = []
+
+    async def run():
+        load = _loader(calls, value="v", wait=0.05)
+        first = asyncio.ensure_future(c.get_or_load("a", load))
+        second = asyncio.ensure_future(c.get_or_load("a", load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "v"
+
+    asyncio.run(run())
+    assert len(calls) == 1
+    assert c.peek("a") == "v"  # la llamada compartida terminó y quedó cacheada
+
+
+def test_ttl_zero_only_coalesces():
+    # score_inflight: TTL 0 comparte la llamada en vuelo pero no cachea el resultado
+    c = AsyncTTLCache(1, ttl=0)
+    calls: list = []
+
+    async def run():
+        load = _loader(calls, value=1, wait=0.01)
+        await asyncio.gather(c.get_or_load("a", load), c.get_or_load("a", load))
+        await c.get_or_load("a", load)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert len(c) == 0
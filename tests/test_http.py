@@ -0,0 +1,147 @@
+"""get_json: reintentos, Retry-After y circuit breaker contra un upstream falso (httpx.MockTransport)."""
+import asyncio
+import itertools
+import time
+import types
+
+import httpx
+import pytest
+
+from app.risk_engine.core import _degradable
+from app.sources import http as http_mod
+from app.sources import resilience
+from app.sources.resilience import CircuitBreaker, CircuitOpenError
+
+_hosts = itertools.count()
+
+
+class Upstream:
+    """Responde en orden la lista de respuestas (la última se repite) y cuenta llamadas."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        r = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # sin esperas reales: registra los delays pedidos (backoff fijo en 0.5 para distinguirlo de Retry-After)
+    delays: list = []
+
+    async def fake_sleep(s):
+        delays.append(s)
+
+    monkeypatch.setattr(http_mod, "asyncio", types.SimpleNamespace(sleep=fake_sleep,
+                                                                   CancelledError=asyncio.CancelledError))
+    monkeypatch.setattr(http_mod, "backoff", lambda attempt: 0.5)
+    return delays
+
+
+@pytest.fixture
+def host():
+    # host propio por test: cliente y breaker no se comparten entre tests
+    base = f"http://upstream-{next(_hosts)}.test"
+    yield base
+    http_mod._clients.pop(base, None)
+    resilience._breakers.pop(base, None)
+
+
+def _serve(base: str, upstream: Upstream) -> None:
+    http_mod._clients[base] = httpx.AsyncClient(base_url=base, transport=httpx.MockTransport(upstream))
+
+
+def _get(base: str):
+    return asyncio.run(http_mod.get_json(base, "/x", endpoint="test"))
+
+
+def test_429_honours_retry_after(host, sleeps):
+    up = Upstream(httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200, json={"ok": 1}))
+    _serve(host, up)
+    assert _get(host) == {"ok": 1}
+    assert up.calls == 2
+    assert sleeps == [2.0]
+    assert resilience.breaker_for(host).state == "closed"  # un 429 no cuenta como caída
+
+
+def test_5xx_retried_up_to_retry_max(host, sleeps, monkeypatch):
+    monkeypatch.setattr(http_mod, "RETRY_MAX", 2)
+    up = Upstream(httpx.Response(503))
+    _serve(host, up)
+    with pytest.raises(httpx.HTTPStatusError):
+        _get(host)
+    assert up.calls == 3  # intento + RETRY_MAX reintentos
+    assert sleeps == [0.5, 0.5]
+
+
+def test_5xx_then_success(host, sleeps):
+    up = Upstream(httpx.Response(502), httpx.ConnectError("reset"), httpx.Response(200, json=[1]))
+    _serve(host, up)
+    assert _get(host) == [1]
+    assert up.calls == 3
+
+
+def test_4xx_not_retried(host, sleeps):
+    up = Upstream(httpx.Response(404))
+    _serve(host, up)
+    with pytest.raises(httpx.HTTPStatusError):
+        _get(host)
+    assert up.calls == 1
+    assert sleeps == []
+    assert resilience.breaker_for(host).state == "closed"
+
+
+def test_breaker_opens_and_fails_fast(host, sleeps, monkeypatch):
+    monkeypatch.setattr(http_mod, "RETRY_MAX", 0)
+    resilience._breakers[host] = CircuitBreaker(host, failures=3, reset_after=30)
+    up = Upstream(httpx.Response(500))
+    _serve(host, up)
+    for _ in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            _get(host)
+    assert resilience.breaker_for(host).state == "open"
+    with pytest.raises(CircuitOpenError):
+        _get(host)
+    assert up.calls == 3  # abierto: no llega al upstream
+
+
+def test_breaker_half_open_probe(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience, "time", types.SimpleNamespace(monotonic=lambda: now[0], time=time.time))
+    b = CircuitBreaker("h", failures=2, reset_after=10)
+    b.failure(); b.failure()
+    assert b.state == "open"
+    with pytest.raises(CircuitOpenError):
+        b.check()
+    now[0] += 10
+    assert b.state == "half_open"
+    b.check()  # una sola sonda
+    with pytest.raises(CircuitOpenError):
+        b.check()
+    b.failure()  # la sonda falla: vuelve a abrir
+    assert b.state == "open" and b.opened == 2
+    now[0] += 10
+    b.check()
+    b.success()  # la sonda anda: cierra
+    assert b.state == "closed"
+    b.check()
+
+
+def test_circuit_open_becomes_degraded_entry(host, sleeps):
+    b = resilience._breakers[host] = CircuitBreaker(host, failures=1, reset_after=30)
+    b.failure()
+    up = Upstream(httpx.Response(200, json={}))
+    _serve(host, up)
+    degraded: list = []
+    out = asyncio.run(_degradable("tronscan_security", http_mod.get_json(host, "/x", endpoint="test"), degraded))
+    assert out == {}
+    assert len(degraded) == 1
+    assert degraded[0]["check"] == "tronscan_security"
+    assert degraded[0]["error"].startswith("CircuitOpenError")
+    assert up.calls == 0
@@ -0,0 +1,142 @@
+"""Re-score incremental (estado → páginas nuevas) y backfill vs. un recorrido completo."""
+import asyncio
+import hashlib
+import json
+import random
+
+import pytest
+
+from app.risk_engine import core
+from app.risk_engine.features import F_TRUNCATED
+from app.sources.trongrid import USDT_CONTRACT
+from app.utils.address import TronAddress
+
+
+def _addr(seed: str) -> str:
+    return TronAddress(b"\x41" + hashlib.sha256(seed.encode()).digest()[:20]).base58
+
+
+ME = _addr("wallet")
+PEERS = [_addr(f"peer:{i}") for i in range(40)]
+RISKY = set(PEERS[:3])
+PAGE = 25
+
+
+class Chain:
+    """Historial TRC20 falso que respeta lo que usa core: min/max_timestamp (inclusivos),
+    orden asc/desc, max_events y páginas de PAGE eventos."""
+
+    def __init__(self, seed: int = 3):
+        self.rnd = random.Random(seed)
+        self.items: list = []
+        self.ts = 1_700_000_000_000
+
+    def grow(self, n: int) -> None:
+        for _ in range(n):
+            # varios eventos por timestamp: ejercita el dedup en los bordes (cursor y backfill)
+            if self.rnd.random() < 0.6:
+                self.ts += self.rnd.choice((1000, 60_000))
+            peer = self.rnd.choice(PEERS)
+            frm, to = (peer, ME) if self.rnd.random() < 0.5 else (ME, peer)
+            value = self.rnd.choice(("50000", "900000", str(self.rnd.randrange(1, 10 ** 10))))
+            self.items.append({
+                "transaction_id": f"{len(self.items):064x}", "block_timestamp": self.ts,
+                "from": frm, "to": to, "value": value, "type": "Transfer",
+                "token_info": {"address": USDT_CONTRACT, "decimals": 6},
+            })
+
+    async def iter(self, address, max_events=None, min_timestamp=None, order_by=None, max_timestamp=None, **_):
+        if max_events is None:
+            max_events = core.TRC20_MAX_EVENTS
+        rows = [it for it in self.items
+                if (min_timestamp is None or it["block_timestamp"] >= min_timestamp)
+                and (max_timestamp is None or it["block_timestamp"] <= max_timestamp)]
+        asc = order_by == "block_timestamp,asc"
+        rows.sort(key=lambda it: it["block_timestamp"], reverse=not asc)
+        if max_events:
+            rows = rows[:max_events]
+        for i in range(0, len(rows), PAGE):
+            yield rows[i:i + PAGE]
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    c = Chain()
+    states: dict = {}
+
+    async def empty(address):
+        return {}
+
+    async def is_risky(a):
+        return a in RISKY
+
+    monkeypatch.setattr(core, "iter_trc20_transfers", c.iter)
+    monkeypatch.setattr(core, "account_security", empty)
+    monkeypatch.setattr(core, "stablecoin_blacklist", empty)
+    monkeypatch.setattr(core, "account_overview", empty)
+    monkeypatch.setattr(core, "_counterparty_is_risky", is_risky)
+    monkeypatch.setattr(core, "GRAPH_MAX_HOPS", 1)
+    monkeypatch.setattr(core.columnar, "EXPORT_ENABLED", False)
+    # persistencia del estado como JSON, igual que los backends
+    monkeypatch.setattr(core, "load_wallet_state", lambda a: json.loads(states[a]) if a in states else None)
+    monkeypatch.setattr(core, "save_wallet_state", lambda a, s: states.__setitem__(a, json.dumps(s)))
+    c.states = states
+    return c
+
+
+# lo que depende de la corrida y no del historial
+_RUN_FIELDS = {"scored_at", "new_events", "pages", "from_cursor", "timings"}
+
+
+def _comparable(f) -> dict:
+    return {k: v for k, v in f._asdict().items() if k not in _RUN_FIELDS}
+
+
+def _score(incremental: bool):
+    return asyncio.run(core.extract_features(ME, incremental=incremental))
+
+
+def test_incremental_matches_full_scan(chain, monkeypatch):
+    monkeypatch.setattr(core, "TRC20_MAX_EVENTS", 0)
+    chain.grow(120)
+    first = _score(incremental=True)
+    assert first.events == 120 and first.from_cursor is None
+    for n in (37, 1, 80):
+        chain.grow(n)
+        inc = _score(incremental=True)
+        assert inc.from_cursor is not None  # salió del estado guardado
+        assert _comparable(inc) == _comparable(_score(incremental=False))
+    assert inc.events == 238
+    assert inc.risky_hits == len(RISKY)
+
+
+def test_backfill_completes_truncated_history(chain, monkeypatch):
+    monkeypatch.setattr(core, "TRC20_MAX_EVENTS", 60)
+    chain.grow(200)
+    f = _score(incremental=True)
+    assert f.has(F_TRUNCATED) and f.events == 60
+    runs = 1
+    while f.has(F_TRUNCATED):
+        # entre corridas también llegan eventos nuevos
+        chain.grow(5)
+        f = _score(incremental=True)
+        runs += 1
+        assert runs < 20, "el backfill no avanza"
+    assert f.events == len(chain.items)
+    assert runs > 2
+    assert json.loads(chain.states[ME])["analyzer"]["backfill_ts"] is None
+
+    monkeypatch.setattr(core, "TRC20_MAX_EVENTS", 0)
+    full = _score(incremental=False)
+    assert not full.has(F_TRUNCATED)
+    assert _comparable(f) == _comparable(full)
+
+
+def test_full_scan_under_cap_is_not_truncated(chain, monkeypatch):
+    monkeypatch.setattr(core, "TRC20_MAX_EVENTS", 500)
+    chain.grow(150)
+    f = _score(incremental=True)
+    assert not f.has(F_TRUNCATED)
+    assert json.loads(chain.states[ME])["analyzer"]["backfill_ts"] is None
+    chain.grow(10)
+    assert not _score(incremental=True).has(F_TRUNCATED)
@@ -0,0 +1,109 @@
+"""Paridad del kernel vectorizado (kernel.py) con las reglas escalares (rules.py)."""
+import itertools
+
+import pytest
+
+np = pytest.importorskip("numpy")  # opcional: no está en requirements.txt
+
+from app.risk_engine.kernel import LEVELS, exposure_rows, levels, score_batch
+from app.risk_engine.rules import exposure_breakdown, risk_level, rule_points
+from app.risk_engine.weights import W
+
+
+class AltW(W):
+    # pesos fraccionarios: ejercitan los truncamientos de int() y otros cortes de nivel
+    FRAUD_FLAG = 17.5
+    COUNTERPARTY_HIT = 7.25
+    COUNTERPARTY_CAP = 40
+    DUST_BASE = 4.5
+    DUST_PER_EVENT = 0.75
+    DUST_CAP = 20
+    LEVEL_HIGH = 60
+    LEVEL_MEDIUM = 25
+
+
+WEIGHTS = [pytest.param(W, id="W"), pytest.param(AltW, id="AltW")]
+
+
+def _grid() -> dict:
+    # todas las combinaciones chicas de flags, hits y DUST: cubren los scores alrededor de los cortes
+    rows = list(itertools.product((0, 1), (0, 1), (0, 1), range(6), range(0, 31), range(0, 3)))
+    cols = list(zip(*rows))
+    hits = np.array(cols[3])
+    return {
+        "blacklisted": np.array(cols[0], dtype=bool),
+        "fraud": np.array(cols[1], dtype=bool),
+        "bl_evidence": np.array(cols[2], dtype=bool),
+        "risky_hits": hits,
+        "risky_in": hits,
+        "risky_out": hits // 2,
+        "dust_in": np.array(cols[4]),
+        "dust_out": np.array(cols[5]),
+        "multihop": hits % 3,
+    }
+
+
+def _random(n: int = 5000, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    risky_in = rng.poisson(0.4, n) * (rng.random(n) < 0.3)
+    risky_out = rng.poisson(0.4, n) * (rng.random(n) < 0.3)
+    f = {
+        "blacklisted": rng.random(n) < 0.01,
+        "fraud": rng.random(n) < 0.03,
+        "bl_evidence": rng.random(n) < 0.02,
+        "risky_in": risky_in,
+        "risky_out": risky_out,
+        "risky_hits": np.maximum(risky_in + risky_out - rng.binomial(np.minimum(risky_in, risky_out), 0.5), 0),
+        "dust_in": rng.geometric(0.2, n) * (rng.random(n) < 0.4),
+        "dust_out": rng.geometric(0.5, n) * (rng.random(n) < 0.1),
+        "multihop": rng.poisson(0.5, n) * (rng.random(n) < 0.2),
+    }
+    # bordes de redondeo del exposure (round() de Python vs np.round en .x5)
+    for i, (a, b) in enumerate(((3, 1997), (1, 79), (7, 393), (0, 0))):
+        f["dust_in"][i], f["dust_out"][i] = a, b
+        f["risky_in"][i] = f["risky_out"][i] = f["multihop"][i] = f["risky_hits"][i] = 0
+    return f
+
+
+def _scalar(f: dict, w) -> list:
+    out = []
+    for i in range(len(f["risky_hits"])):
+        score, _ = rule_points(bool(f["blacklisted"][i]), bool(f["fraud"][i]), bool(f["bl_evidence"][i]),
+                               int(f["risky_hits"][i]), int(f["dust_in"][i] + f["dust_out"][i]), w)
+        expo = exposure_breakdown(int(f["risky_in"][i]), int(f["risky_out"][i]), int(f["dust_in"][i]),
+                                  int(f["dust_out"][i]), multihop_cnt=int(f["multihop"][i]))
+        out.append((score, risk_level(score, w), expo))
+    return out
+
+
+def _assert_parity(f: dict, w) -> list:
+    r = score_batch(f, w)
+    expo = exposure_rows(r["exposure"], f)
+    scores, lv = r["risk_score"].tolist(), r["risk_level"].tolist()
+    expected = _scalar(f, w)
+    for i, (score, level, ex) in enumerate(expected):
+        assert (scores[i], LEVELS[lv[i]], expo[i]) == (score, level, ex), f"fila {i}"
+    return [score for score, _, _ in expected]
+
+
+@pytest.mark.parametrize("w", WEIGHTS)
+def test_grid_matches_rules(w):
+    seen = set(_assert_parity(_grid(), w))
+    # la grilla pasa por los dos cortes de nivel y sus vecinos inmediatos
+    for cut in (w.LEVEL_MEDIUM, w.LEVEL_HIGH):
+        assert {cut - 1, cut} <= seen, f"sin scores alrededor de {cut}"
+
+
+@pytest.mark.parametrize("w", WEIGHTS)
+def test_random_matches_rules(w):
+    _assert_parity(_random(), w)
+
+
+@pytest.mark.parametrize("w", WEIGHTS)
+def test_level_boundaries(w):
+    score = np.arange(0, 101)
+    got = [LEVELS[i] for i in levels(score, w).tolist()]
+    assert got == [risk_level(s, w) for s in range(101)]
+    for cut, below, at in ((w.LEVEL_MEDIUM, "Low", "Medium"), (w.LEVEL_HIGH, "Medium", "High")):
+        lv = levels(np.array([cut - 1, cut, cut + 1]), w).tolist()
+        assert [LEVELS[i] for i in lv] == [below, at, at]